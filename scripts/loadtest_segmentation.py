@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Load-test a segmentation server through HTTPBackend (throughput and batch latency)."""
+
+import argparse
+import time
+
+import numpy as np
+
+from vectalab.segmentation import DEFAULT_GENERATOR_ARGS, HTTPBackend
+from vectalab.segmentation_server import ComponentsBackend, start_server
+
+
+def make_images(count, size, seed=0):
+    """Blocky random images (a few hundred flat regions each)."""
+    rng = np.random.default_rng(seed)
+    blocks = rng.integers(0, 256, (count, size // 16, size // 16, 3), dtype=np.uint8)
+    return [np.kron(b, np.ones((16, 16, 1), dtype=np.uint8)) for b in blocks]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--url', default=None,
+                        help="Server to test; default: an in-process components server")
+    parser.add_argument('--images', type=int, default=32)
+    parser.add_argument('--size', type=int, default=512)
+    parser.add_argument('--batch-size', type=int, default=4)
+    parser.add_argument('--in-flight', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--image-format', choices=['png', 'webp'], default='png')
+    parser.add_argument('--delay', type=float, default=0.05,
+                        help="In-process server: emulated model latency per image (s)")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        server = start_server(ComponentsBackend(delay=args.delay))
+        url = server.url
+
+    images = make_images(args.images, args.size)
+    print(f"{args.images} images of {args.size}x{args.size}, batches of {args.batch_size}, {url}")
+    try:
+        for in_flight in args.in_flight:
+            with HTTPBackend(url, batch_size=args.batch_size, max_in_flight=in_flight,
+                             image_format=args.image_format) as backend:
+                latencies = []
+
+                def timed(batch):
+                    start = time.perf_counter()
+                    masks = backend._post(batch, DEFAULT_GENERATOR_ARGS)
+                    latencies.append(time.perf_counter() - start)
+                    return masks
+
+                start = time.perf_counter()
+                futures = [backend._executor.submit(timed, images[i:i + args.batch_size])
+                           for i in range(0, len(images), args.batch_size)]
+                masks = sum(len(m) for f in futures for m in f.result())
+                elapsed = time.perf_counter() - start
+
+            p50, p95 = np.percentile(latencies, [50, 95]) * 1000
+            print(f"in flight {in_flight:3d}: {len(images) / elapsed:7.1f} images/s, "
+                  f"batch latency p50 {p50:7.1f} ms, p95 {p95:7.1f} ms, {masks} masks")
+    finally:
+        if server is not None:
+            server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
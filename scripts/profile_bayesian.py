@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""Micro-benchmarks for the Bayesian renderer (regularizers, rendering, memory)."""
+
+import argparse
+import multiprocessing
+import resource
+import time
+
+import numpy as np
+import torch
+
+from vectalab.bayesian import BayesianVectorRenderer
+
+
+# Per-path / per-point loop versions of the regularizers, kept for comparison
+# (tests/test_bayesian.py also checks the tensor versions against them)
+
+def loop_complexity(model):
+    total = torch.tensor(0.0)
+    for i in range(model.num_paths):
+        diffs = model.points[i, 1:] - model.points[i, :-1]
+        total = total + torch.sum(torch.sqrt(torch.sum(diffs ** 2, dim=-1) + 1e-8))
+    return total / (np.sqrt(model.width ** 2 + model.height ** 2) * model.num_paths)
+
+
+def loop_corner(model):
+    total = torch.tensor(0.0)
+    for i in range(model.num_paths):
+        pts = model.points[i]
+        for j in range(1, len(pts) - 1):
+            v1 = pts[j] - pts[j - 1]
+            v2 = pts[j + 1] - pts[j]
+            cos_angle = torch.sum(v1 / (torch.norm(v1) + 1e-8) * v2 / (torch.norm(v2) + 1e-8))
+            total = total + ((1 - cos_angle) / 2) ** 2
+    return total / (model.num_paths * model.num_segments)
+
+
+def loop_smoothness(model):
+    total = torch.tensor(0.0)
+    for i in range(model.num_paths):
+        pts = model.points[i]
+        for j in range(1, len(pts) - 1):
+            total = total + torch.sum((pts[j - 1] - 2 * pts[j] + pts[j + 1]) ** 2)
+    return total / (model.num_paths * model.num_segments)
+
+
+def time_backward(loss_fn, model, repeats):
+    """Mean seconds for one forward + backward of loss_fn."""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        model.zero_grad()
+        loss_fn().backward()
+    return (time.perf_counter() - start) / repeats
+
+
+def build_model(size, num_paths, num_segments):
+    np.random.seed(0)
+    image = (np.random.rand(size, size, 3) * 255).astype(np.uint8)
+    init_paths = [
+        {'points': np.random.uniform(0, size, (12, 2)), 'color': [128, 128, 128]}
+        for _ in range(num_paths)
+    ]
+    return BayesianVectorRenderer(image, init_paths=init_paths, num_segments=num_segments)
+
+
+def rss_kb(field):
+    """Current (VmRSS) or peak (VmHWM) resident set size in kB."""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+    raise RuntimeError(f"{field} not in /proc/self/status")
+
+
+def measure_peak_memory(size, num_paths, num_segments, memory_budget, results):
+    """Peak RSS increase (bytes) and seconds of one render forward + backward."""
+    model = build_model(size, num_paths, num_segments)
+    model.memory_budget = memory_budget
+    try:
+        # Reset the peak to the current RSS (Linux)
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        baseline = rss_kb('VmRSS')
+        peak_rss = lambda: rss_kb('VmHWM')
+    except (OSError, RuntimeError):
+        baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak_rss = lambda: resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    model.render_antialiased().mean().backward()
+    elapsed = time.perf_counter() - start
+    peak = peak_rss()
+    estimate = model.renderer.estimate_graph_bytes(model.points, model.sigma_aa).sum().item()
+    results.put(((peak - baseline) * 1024, elapsed, estimate))
+
+
+def peak_memory(size, num_paths, num_segments, memory_budget):
+    """Run measure_peak_memory in a fresh process (freed memory stays resident)."""
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=measure_peak_memory,
+                              args=(size, num_paths, num_segments, memory_budget, results))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=int, default=64)
+    parser.add_argument('--paths', type=int, default=128)
+    parser.add_argument('--segments', type=int, default=8)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--memory-budget', type=float, default=None,
+                        help="Also compare peak memory with a render graph budget (MB)")
+    args = parser.parse_args()
+
+    if args.memory_budget is not None:
+        budget = int(args.memory_budget * 2 ** 20)
+        full, full_time, estimate = peak_memory(args.size, args.paths, args.segments, None)
+        checkpointed, checkpointed_time, _ = peak_memory(args.size, args.paths, args.segments, budget)
+        print(f"Estimated render graph:     {estimate / 2 ** 20:8.1f} MB")
+        print(f"Peak memory (full graph):   {full / 2 ** 20:8.1f} MB, {full_time:.2f} s")
+        print(f"Peak memory (checkpointed): {checkpointed / 2 ** 20:8.1f} MB, {checkpointed_time:.2f} s "
+              f"(budget {args.memory_budget:.0f} MB)")
+
+    model = build_model(args.size, args.paths, args.segments)
+
+    def loop_regularizers():
+        return loop_complexity(model) + loop_corner(model) + loop_smoothness(model)
+
+    def tensor_regularizers():
+        return model.complexity_penalty() + model.corner_penalty() + model.smoothness_penalty()
+
+    loop_time = time_backward(loop_regularizers, model, args.repeats)
+    tensor_time = time_backward(tensor_regularizers, model, args.repeats)
+    render_time = time_backward(lambda: model.render_antialiased().mean(), model, args.repeats)
+
+    print(f"{args.paths} paths x {args.segments} segments, {args.size}x{args.size} canvas")
+    print(f"Regularizers (loop):   {loop_time * 1000:8.1f} ms / iteration")
+    print(f"Regularizers (tensor): {tensor_time * 1000:8.1f} ms / iteration "
+          f"({loop_time / tensor_time:.0f}x)")
+    print(f"Render:                {render_time * 1000:8.1f} ms / iteration")
+
+
+if __name__ == '__main__':
+    main()
@@ -82,7 +82,7 @@ def vectorize_image_sam(image_path, output_path, model_type="vit_b", device="cpu
     
     print("Converting to SVG...")
     for i, mask_data in enumerate(masks):
-        mask = mask_data['segmentation']
+        mask = mask_data['segmentation'].to_dense()
         color = get_average_color(image, mask)
         polygons = mask_to_polygon(mask)
         
@@ -0,0 +1,620 @@
+"""
+Tests for the differentiable Bézier renderer used by the Bayesian vectorizer.
+"""
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from vectalab.bayesian import (
+    BayesianVectorRenderer,
+    DifferentiableBezierRenderer,
+    EarlyStopping,
+    RegionExtractor,
+    build_pyramid,
+    fit_bezier_path,
+    flatten_path_data,
+    optimize_vectorization,
+    refine_svg,
+    split_iterations,
+    svg_to_init_paths,
+)
+# Per-path / per-point loop versions of the regularizers
+from scripts.profile_bayesian import loop_complexity, loop_corner, loop_smoothness
+
+
+def loop_winding(renderer, path_points, sigma=1.0):
+    """Reference implementation: one full-frame pass per polyline segment."""
+    n_points = path_points.shape[0]
+    winding = torch.zeros(renderer.height, renderer.width)
+    for j in range(n_points):
+        p0 = path_points[j]
+        p1 = path_points[(j + 1) % n_points]
+        dy = p1[1] - p0[1]
+        if torch.abs(dy) < 1e-6:
+            continue
+        t_cross = (renderer.grid_y - p0[1]) / (dy + 1e-8)
+        x_cross = p0[0] + t_cross * (p1[0] - p0[0])
+        valid_t = torch.sigmoid(t_cross * 20) * torch.sigmoid((1 - t_cross) * 20)
+        crosses_right = torch.sigmoid((x_cross - renderer.grid_x) / sigma)
+        winding = winding + crosses_right * valid_t * torch.sign(dy)
+    return winding
+
+
+def loop_render(model, sigma):
+    """Reference implementation: one RGBA render and "over" step per path."""
+    _, order = torch.sort(model.z_order)
+    canvas = torch.ones(model.height, model.width, 3)
+    for idx in order:
+        color = torch.sigmoid(model.colors[idx])
+        rgba = model.renderer.render_filled_path(model.points[idx], color, sigma)
+        alpha = rgba[..., 3:4]
+        canvas = canvas * (1 - alpha) + rgba[..., :3] * alpha
+    return canvas
+
+
+@pytest.fixture
+def model():
+    """Bayesian renderer with irregular (non-smooth) random paths."""
+    np.random.seed(0)
+    image = np.full((32, 32, 3), 255, dtype=np.uint8)
+    image[8:24, 8:24] = [200, 30, 30]
+    init_paths = [
+        {'points': np.random.uniform(0, 32, (10, 2)), 'color': [200, 30, 30]}
+        for _ in range(20)
+    ]
+    return BayesianVectorRenderer(image, init_paths=init_paths, num_segments=4)
+
+
+@pytest.fixture
+def square_image():
+    image = np.full((32, 32, 3), 255, dtype=np.uint8)
+    image[8:24, 8:24] = [200, 30, 30]
+    return image
+
+
+def run_optimization(image, **kwargs):
+    np.random.seed(0)
+    torch.manual_seed(0)
+    options = dict(num_paths=4, num_segments=2, num_iterations=8, topology_interval=3, verbose=False)
+    options.update(kwargs)
+    return optimize_vectorization(image, **options)
+
+
+@pytest.fixture
+def renderer():
+    return DifferentiableBezierRenderer(48, 40)
+
+
+@pytest.fixture
+def path_points(renderer):
+    """Densely sampled closed Bézier path (ellipse-like) inside the canvas."""
+    angles = torch.linspace(0, 2 * np.pi, 13)[:-1]
+    control = torch.stack([24 + 12 * torch.cos(angles), 20 + 9 * torch.sin(angles)], dim=1)
+    control = torch.cat([control, control[:1]])
+    return renderer.sample_bezier_path(control, samples_per_segment=32)
+
+
+class TestWindingNumber:
+    """Batched soft winding number matches the per-segment loop."""
+
+    @pytest.mark.parametrize("sigma", [0.5, 2.0])
+    def test_matches_loop(self, renderer, path_points, sigma):
+        expected = loop_winding(renderer, path_points, sigma)
+        actual = renderer.compute_winding_number(path_points, sigma)
+        assert torch.allclose(actual, expected, atol=1e-5)
+
+    def test_gradients_match_loop(self, renderer, path_points):
+        points_a = path_points.detach().clone().requires_grad_()
+        points_b = path_points.detach().clone().requires_grad_()
+        weights = torch.rand(renderer.height, renderer.width, generator=torch.Generator().manual_seed(0))
+
+        (loop_winding(renderer, points_a, 1.0) * weights).sum().backward()
+        (renderer.compute_winding_number(points_b, 1.0) * weights).sum().backward()
+        assert torch.allclose(points_a.grad, points_b.grad, atol=1e-4)
+
+    def test_memory_budget_does_not_change_result(self, renderer, path_points):
+        expected = renderer.compute_winding_number(path_points, 1.0)
+        renderer.max_elements = renderer.width  # one (segment, row) pair per chunk
+        assert torch.allclose(renderer.compute_winding_number(path_points, 1.0), expected, atol=1e-5)
+
+    def test_bbox_variant(self, renderer, path_points):
+        full = renderer.compute_winding_number(path_points, 1.0)
+        window, (x0, y0, x1, y1) = renderer.compute_winding_number_bbox(path_points, 1.0)
+
+        assert window.shape == (y1 - y0, x1 - x0)
+        assert torch.allclose(window, full[y0:y1, x0:x1], atol=1e-5)
+
+        outside = torch.ones_like(full, dtype=torch.bool)
+        outside[y0:y1, x0:x1] = False
+        assert full[outside].abs().max() < 1e-3
+
+    def test_bbox_off_canvas(self, renderer, path_points):
+        window, _ = renderer.compute_winding_number_bbox(path_points + 500, 1.0)
+        assert window.numel() == 0
+
+    @pytest.mark.parametrize("max_elements", [1 << 24, 64])
+    def test_culled_batch_matches_bbox(self, path_points, max_elements):
+        renderer = DifferentiableBezierRenderer(128, 40)  # wide enough to cull
+        # Small paths (culled to their boxes) and one clipped by the canvas edge
+        center = torch.tensor([24.0, 20.0])
+        small = (path_points - center) * 0.25
+        batch = torch.stack([small + torch.tensor([8.0, 8.0]), small + torch.tensor([38.0, 30.0]),
+                             small + torch.tensor([127.0, 2.0])])
+        renderer.max_elements = max_elements
+        margin = renderer.bbox_margin(1.0)
+        culled = renderer.compute_winding_numbers(batch, 1.0, margin)
+
+        for i in range(batch.shape[0]):
+            window, (x0, y0, x1, y1) = renderer.compute_winding_number_bbox(batch[i], 1.0, margin=margin)
+            assert torch.allclose(culled[i, y0:y1, x0:x1], window, atol=1e-5)
+            outside = torch.ones_like(culled[i], dtype=torch.bool)
+            outside[y0:y1, x0:x1] = False
+            assert not culled[i][outside].any()
+
+    def test_culled_gradients_match_full(self, path_points):
+        renderer = DifferentiableBezierRenderer(128, 40)
+        batch = torch.stack([(path_points - 20) * 0.25 + 10, (path_points - 20) * 0.25 + 30])
+        points_a = batch.detach().clone().requires_grad_()
+        points_b = batch.detach().clone().requires_grad_()
+        margin = renderer.bbox_margin(1.0)
+        # Weight the boxes only: outside them culling drops sigmoid tails
+        weights = torch.zeros(2, renderer.height, renderer.width)
+        for i in range(2):
+            x0, y0, x1, y1 = renderer.path_bbox(batch[i], margin)
+            weights[i, y0:y1, x0:x1] = torch.rand(y1 - y0, x1 - x0, generator=torch.Generator().manual_seed(i))
+
+        (renderer.compute_winding_numbers(points_a, 1.0) * weights).sum().backward()
+        (renderer.compute_winding_numbers(points_b, 1.0, margin) * weights).sum().backward()
+        assert torch.allclose(points_a.grad, points_b.grad, atol=1e-3)
+
+    def test_render_filled_path_window(self, renderer, path_points):
+        angles = torch.linspace(0, 2 * np.pi, 13)[:-1]
+        control = torch.stack([10 + 3 * torch.cos(angles), 10 + 2 * torch.sin(angles)], dim=1)
+        control = torch.cat([control, control[:1]])
+        rgba = renderer.render_filled_path(control, torch.tensor([1.0, 0.0, 0.0]), sigma=1.0)
+        winding = renderer.compute_winding_number(renderer.sample_bezier_path(control, 32), 1.0)
+
+        assert torch.allclose(rgba[..., 3], renderer.winding_to_alpha(winding), atol=1e-3)
+        x0, y0, x1, y1 = renderer.path_bbox(renderer.sample_bezier_path(control, 32),
+                                             renderer.bbox_margin(1.0))
+        assert rgba[:y0, :, 3].eq(0).all() and rgba[y1:, :, 3].eq(0).all()
+        assert rgba[:, :x0, 3].eq(0).all() and rgba[:, x1:, 3].eq(0).all()
+
+
+class TestBatchedRender:
+    """Batched rasterization and closed-form compositing."""
+
+    def test_sample_bezier_paths(self, renderer, model):
+        batched = renderer.sample_bezier_paths(model.points, samples_per_segment=8)
+        for i in (0, 5):
+            single = renderer.sample_bezier_path(model.points[i], samples_per_segment=8)
+            assert torch.allclose(batched[i], single)
+
+    def test_matches_sequential_compositing(self, model):
+        with torch.no_grad():
+            model.z_order.copy_(torch.randperm(model.num_paths, generator=torch.Generator().manual_seed(1)).float())
+        expected = loop_render(model, 1.0)
+        actual = model.render_antialiased(sigma=1.0)
+        assert torch.allclose(actual, expected, atol=1e-5)
+
+    @pytest.mark.parametrize("group_size", [1, 3, 64])
+    def test_group_size_does_not_change_result(self, model, group_size):
+        expected = model.render_antialiased(sigma=1.0)
+        actual = model.render_antialiased(sigma=1.0, group_size=group_size)
+        assert torch.allclose(actual, expected, atol=1e-5)
+
+    def test_gradients_match_sequential(self, model):
+        target = torch.rand(model.height, model.width, 3, generator=torch.Generator().manual_seed(0))
+
+        ((loop_render(model, 1.0) - target) ** 2).sum().backward()
+        expected = model.points.grad.clone(), model.colors.grad.clone()
+        model.zero_grad()
+
+        ((model.render_antialiased(sigma=1.0, group_size=4) - target) ** 2).sum().backward()
+        assert torch.allclose(model.points.grad, expected[0], rtol=1e-3, atol=1e-4)
+        assert torch.allclose(model.colors.grad, expected[1], rtol=1e-3, atol=1e-4)
+
+
+class TestCoverage:
+    """Per-path coverage maps and error attribution."""
+
+    @pytest.mark.parametrize("group_size", [None, 3])
+    def test_coverage_reconstructs_render(self, model, group_size):
+        rendered, coverage = model.render_antialiased(sigma=1.0, group_size=group_size, return_coverage=True)
+
+        assert coverage.shape == (model.num_paths, model.height, model.width)
+        background = 1 - coverage.sum(dim=0)
+        assert background.min() > -1e-5
+
+        colors = torch.sigmoid(model.colors).detach()
+        expected = background.unsqueeze(-1) + torch.einsum('phw,pc->hwc', coverage, colors)
+        assert torch.allclose(rendered.detach(), expected, atol=1e-4)
+
+    def test_group_size_does_not_change_coverage(self, model):
+        _, expected = model.render_antialiased(sigma=1.0, return_coverage=True)
+        _, actual = model.render_antialiased(sigma=1.0, group_size=2, return_coverage=True)
+        assert torch.allclose(actual, expected, atol=1e-5)
+
+    def test_path_errors(self, model):
+        rendered, coverage = model.render_antialiased(sigma=1.0, return_coverage=True)
+        scores = model.path_errors(rendered, coverage)
+
+        visible = coverage.sum(dim=(1, 2))
+        assert scores.shape == (model.num_paths,)
+        assert torch.equal(torch.isinf(scores), visible < 1.0)
+
+        error = ((rendered.detach() - model.target_image) ** 2).sum(dim=-1)
+        i = int(torch.argmax(visible))
+        assert scores[i] == pytest.approx(float((coverage[i] * error).sum() / visible[i]), rel=1e-4)
+
+    def test_worst_paths_are_reinitialized(self, model, monkeypatch):
+        scores = torch.zeros(model.num_paths)
+        scores[[3, 7]] = torch.tensor([2.0, 1.0])
+        monkeypatch.setattr(BayesianVectorRenderer, 'path_errors', lambda self, rendered, coverage: scores)
+
+        before = model.points.detach().clone()
+        model.propose_topology_changes()
+        changed = (model.points.detach() != before).any(dim=(1, 2)).nonzero().ravel().tolist()
+        assert changed == [3, 7]
+
+    def test_reinitialized_paths_reach_border_pixels(self, model, monkeypatch):
+        monkeypatch.setattr(BayesianVectorRenderer, 'path_errors',
+                            lambda self, rendered, coverage: torch.arange(self.num_paths, dtype=torch.float32))
+        # All error in the corner pixel: new paths are centered there
+        rendered = model.target_image.clone()
+        rendered[0, 0] += 1.0
+        np.random.seed(0)
+        model.propose_topology_changes(rendered=rendered,
+                                       coverage=torch.zeros(model.num_paths, model.height, model.width))
+
+        points = model.points.detach()[-2:]
+        assert points.min().item() == -0.5
+        assert points[..., 0].max().item() <= model.width - 0.5
+
+
+class TestActiveSet:
+    """Active-set rendering with cached static layers."""
+
+    @pytest.mark.parametrize("pattern", ["alternating", "front", "none", "all"])
+    def test_render_active_matches_full_render(self, model, pattern):
+        n = model.num_paths
+        active = {
+            "alternating": torch.arange(n) % 3 == 0,
+            "front": torch.arange(n) >= n - 4,
+            "none": torch.zeros(n, dtype=torch.bool),
+            "all": torch.ones(n, dtype=torch.bool),
+        }[pattern]
+        model.cache_static_layers(active, sigma=1.0, group_size=3)
+
+        expected = model.render_antialiased(sigma=1.0)
+        assert torch.allclose(model.render_active(sigma=1.0, group_size=2), expected, atol=1e-5)
+
+    def test_gradients_reach_active_paths_only(self, model):
+        active = torch.arange(model.num_paths) < 5
+        model.cache_static_layers(active, sigma=1.0)
+        model.render_active(sigma=1.0).sum().backward()
+
+        touched = model.points.grad.abs().sum(dim=(1, 2)) > 0
+        assert not touched[~active].any()
+
+    def test_select_active_paths(self, model):
+        with torch.no_grad():
+            model.points[0] = torch.tensor([2.0, 2.0]) + torch.rand(model.points.shape[1], 2)
+            model.points[1] = torch.tensor([28.0, 28.0]) + torch.rand(model.points.shape[1], 2)
+        error = torch.zeros(model.height, model.width)
+        error[:8, :8] = 1.0
+
+        active = model.select_active_paths(error, tile_size=8, threshold=0.5, margin=1.0)
+        assert active[0] and not active[1]
+        assert not model.select_active_paths(torch.zeros_like(error), tile_size=8).any()
+
+    def test_optimization_freezes_inactive_paths(self, square_image, monkeypatch):
+        frozen = {}
+
+        def select(self, error, *args, **kwargs):
+            active = torch.arange(self.num_paths) % 2 == 0
+            frozen.setdefault('points', self.points.detach()[~active].clone())
+            return active
+
+        monkeypatch.setattr(BayesianVectorRenderer, 'select_active_paths', select)
+        renderer = run_optimization(square_image, num_iterations=5, topology_interval=100, active_set=True)
+
+        inactive = torch.arange(renderer.num_paths) % 2 == 1
+        expected = frozen['points'].clamp(-0.5, 31.5)  # points are clamped to the canvas
+        assert torch.equal(renderer.points.detach()[inactive], expected)
+
+
+def saved_tensor_bytes(fn):
+    """Bytes of the distinct storages autograd keeps for backward while running fn."""
+    storages = {}
+
+    def pack(tensor):
+        storage = tensor.untyped_storage()
+        storages[storage.data_ptr()] = storage.nbytes()
+        return tensor
+
+    with torch.autograd.graph.saved_tensors_hooks(pack, lambda tensor: tensor):
+        fn()
+    return sum(storages.values())
+
+
+class TestCheckpointing:
+    """Memory-budgeted group checkpointing."""
+
+    def test_gradients_match(self, model):
+        target = torch.rand(model.height, model.width, 3, generator=torch.Generator().manual_seed(0))
+
+        ((model.render_antialiased(sigma=1.0) - target) ** 2).sum().backward()
+        expected = model.points.grad.clone(), model.colors.grad.clone()
+        model.zero_grad()
+
+        rendered = model.render_antialiased(sigma=1.0, group_size=3, checkpoint=True)
+        ((rendered - target) ** 2).sum().backward()
+        assert torch.allclose(model.points.grad, expected[0], rtol=1e-4, atol=1e-5)
+        assert torch.allclose(model.colors.grad, expected[1], rtol=1e-4, atol=1e-5)
+
+    def test_estimate_tracks_graph_size(self, model):
+        estimate = model.renderer.estimate_graph_bytes(model.points, 1.0).sum().item()
+        actual = saved_tensor_bytes(lambda: model.render_antialiased(sigma=1.0))
+        assert 0.8 * actual < estimate < 1.5 * actual
+
+    def test_budget_splits_and_checkpoints_groups(self, model):
+        full = saved_tensor_bytes(lambda: model.render_antialiased(sigma=1.0))
+        path_bytes = model.renderer.estimate_graph_bytes(model.points, 1.0)
+        model.memory_budget = int(path_bytes.sum().item() / 4)
+
+        order = torch.arange(model.num_paths)
+        groups = model._render_groups(order, group_size=64, sigma=1.0)
+        assert len(groups) >= 4
+        assert torch.equal(torch.cat(groups), order)
+        assert all(len(g) == 1 or path_bytes[g].sum() <= model.memory_budget for g in groups)
+
+        expected = model.render_antialiased(sigma=1.0, checkpoint=False)
+        budgeted = saved_tensor_bytes(lambda: model.render_antialiased(sigma=1.0))
+        assert budgeted < full / 4
+        assert torch.allclose(model.render_antialiased(sigma=1.0), expected, atol=1e-6)
+
+    def test_render_active(self, model):
+        active = torch.arange(model.num_paths) % 2 == 0
+        model.cache_static_layers(active, sigma=1.0)
+        expected = model.render_active(sigma=1.0)
+        assert torch.allclose(model.render_active(sigma=1.0, checkpoint=True), expected, atol=1e-6)
+
+
+def test_region_extractor_crops_to_bbox():
+    rng = np.random.default_rng(0)
+    image = np.full((96, 128, 3), 255, dtype=np.uint8)
+    image[10:60, 20:90] = [200, 30, 30]
+    image[50:90, 70:120] = [20, 90, 200]
+    image = np.clip(image + rng.integers(-5, 6, image.shape), 0, 255).astype(np.uint8)
+
+    regions = RegionExtractor(n_segments=32).extract_regions(image)
+    assert regions
+    assert [r['area'] for r in regions] == sorted((r['area'] for r in regions), reverse=True)
+
+    for region in regions:
+        x0, y0, x1, y1 = region['bbox']
+        assert region['mask'].shape == (y1 - y0, x1 - x0)
+        expected = image[y0:y1, x0:x1][region['mask'] > 0].mean(axis=0)
+        assert np.allclose(region['color'], expected)
+
+        points = np.array(region['points'])
+        assert (points >= [x0, y0]).all() and (points < [x1, y1]).all()
+
+
+class TestRegularizers:
+    """Tensorized regularizers match the per-point loops."""
+
+    @pytest.mark.parametrize("name,reference", [
+        ('complexity_penalty', loop_complexity),
+        ('corner_penalty', loop_corner),
+        ('smoothness_penalty', loop_smoothness),
+    ])
+    def test_matches_loop(self, model, name, reference):
+        expected = reference(model)
+        (expected_grad,) = torch.autograd.grad(expected, model.points)
+
+        actual = getattr(model, name)()
+        (actual_grad,) = torch.autograd.grad(actual, model.points)
+
+        assert actual.shape == ()
+        assert torch.allclose(actual, expected, rtol=1e-5)
+        assert torch.allclose(actual_grad, expected_grad, rtol=1e-4, atol=1e-7)
+
+
+class TestPyramidSchedule:
+    """Coarse-to-fine optimization schedule."""
+
+    def test_build_pyramid(self):
+        image = np.zeros((40, 64, 3), dtype=np.uint8)
+        levels = build_pyramid(image, 3)
+        assert [scale for scale, _ in levels] == [0.25, 0.5, 1.0]
+        assert [level.shape[:2] for _, level in levels] == [(10, 16), (20, 32), (40, 64)]
+        assert levels[-1][1] is image
+
+    def test_split_iterations(self):
+        assert split_iterations(500, 1) == [500]
+        counts = split_iterations(500, 3)
+        assert sum(counts) == 500
+        assert counts[0] > counts[1] > counts[2]
+
+    def test_set_target_rescales_points(self, model):
+        points = model.points.detach().clone()
+        coarse = model.target_image.numpy()[::2, ::2] * 255
+        model.set_target(coarse.astype(np.uint8))
+
+        assert (model.width, model.height) == (16, 16)
+        assert model.target_lab.shape == (16, 16, 3)
+        assert torch.allclose(model.points, (points + 0.5) * 0.5 - 0.5)
+        assert model.render_antialiased().shape == (16, 16, 3)
+
+    def test_optimize_with_pyramid(self, square_image):
+        renderer = run_optimization(
+            square_image, num_iterations=6, pyramid_levels=2,
+            level_sigmas=[(2.0, 1.0), (1.0, 0.5)],
+        )
+        assert (renderer.width, renderer.height) == (32, 32)
+
+        with pytest.raises(ValueError):
+            optimize_vectorization(square_image, pyramid_levels=2, level_iterations=[5], verbose=False)
+
+
+class TestOptimizationLoop:
+    """Render reuse, early stopping and checkpoint / resume."""
+
+    def test_one_render_per_iteration(self, square_image, monkeypatch):
+        calls = []
+        original = BayesianVectorRenderer.render_antialiased
+
+        def counting_render(self, *args, **kwargs):
+            calls.append(True)
+            return original(self, *args, **kwargs)
+
+        monkeypatch.setattr(BayesianVectorRenderer, 'render_antialiased', counting_render)
+        run_optimization(square_image, num_iterations=6)
+        assert len(calls) == 6
+
+    def test_early_stopping(self):
+        stopper = EarlyStopping(patience=2, min_loss_delta=0.1, min_psnr_delta=1.0)
+        assert not stopper.update(1.0, 20.0)
+        assert not stopper.update(0.5, 20.0)
+        assert not stopper.update(0.48, 20.5)
+        assert stopper.update(0.47, 20.6)
+
+    def test_plateau_stops_optimization(self, square_image, monkeypatch):
+        calls = []
+        original = BayesianVectorRenderer.compute_total_loss
+
+        def counting_loss(self, *args, **kwargs):
+            calls.append(True)
+            return original(self, *args, **kwargs)
+
+        monkeypatch.setattr(BayesianVectorRenderer, 'compute_total_loss', counting_loss)
+        run_optimization(square_image, num_iterations=50, patience=2,
+                         min_loss_delta=0.9, min_psnr_delta=100.0)
+        assert len(calls) == 3
+
+    def test_resume_matches_uninterrupted_run(self, square_image, tmp_path, monkeypatch):
+        expected = run_optimization(square_image)
+
+        checkpoint = str(tmp_path / "run.pt")
+        original = BayesianVectorRenderer.compute_total_loss
+        calls = []
+
+        def preempted_loss(self, *args, **kwargs):
+            calls.append(True)
+            if len(calls) == 6:
+                raise KeyboardInterrupt
+            return original(self, *args, **kwargs)
+
+        monkeypatch.setattr(BayesianVectorRenderer, 'compute_total_loss', preempted_loss)
+        with pytest.raises(KeyboardInterrupt):
+            run_optimization(square_image, checkpoint_path=checkpoint, checkpoint_interval=4)
+        monkeypatch.setattr(BayesianVectorRenderer, 'compute_total_loss', original)
+
+        resumed = run_optimization(square_image, checkpoint_path=checkpoint, checkpoint_interval=4)
+        assert torch.allclose(resumed.points, expected.points)
+        assert torch.allclose(resumed.colors, expected.colors)
+
+    def test_stale_checkpoint_is_ignored(self, square_image, tmp_path):
+        checkpoint = str(tmp_path / "run.pt")
+        other = np.roll(square_image, 3, axis=1)
+        run_optimization(other, checkpoint_path=checkpoint, checkpoint_interval=4)
+        expected = run_optimization(square_image)
+
+        # Same size, different image: a fresh run rather than the other image's result
+        fresh = run_optimization(square_image, checkpoint_path=checkpoint, checkpoint_interval=4)
+        assert torch.allclose(fresh.points, expected.points)
+
+        # A different schedule does not resume either (nor skip every level)
+        two_levels = run_optimization(square_image, checkpoint_path=checkpoint, pyramid_levels=2)
+        assert torch.allclose(two_levels.points, run_optimization(square_image, pyramid_levels=2).points)
+
+
+SQUARE_SVG = """<svg xmlns="http://www.w3.org/2000/svg" width="32" height="32">
+<path d="M0 0 C11 0 21 0 32 0 L32 32 L0 32 Z " fill="#FFFFFF" transform="translate(0,0)"/>
+<path d="M0 0 L16 0 L16 16 L0 16 Z " fill="#C81E1E" transform="translate(8,8)"/>
+</svg>"""
+
+
+def render_psnr(model):
+    with torch.no_grad():
+        mse = torch.mean((model.render_antialiased() - model.target_image) ** 2).item()
+    return 10 * np.log10(1.0 / mse)
+
+
+class TestWarmStart:
+    """Initialization from SVG (vtracer) output."""
+
+    def test_flatten_path_data(self):
+        square, = flatten_path_data("m10,10h5v5h-5z")
+        assert square.tolist() == [[10, 10], [15, 10], [15, 15], [10, 15], [10, 10]]
+
+        # Implicit line-to after M, exponents and compact numbers
+        line, = flatten_path_data("M1e1 2 3.5.5")
+        assert line.tolist() == [[10, 2], [3.5, 0.5]]
+
+        curve, = flatten_path_data("M0 0 C0 10 10 10 10 0 S20 -10 20 0", samples_per_curve=4)
+        assert len(curve) == 9
+        assert curve[-1].tolist() == [20, 0]
+        # The reflected control point mirrors the first curve below the axis
+        assert np.allclose(curve[6], [15, -curve[2][1]])
+
+        # Numbers after Z are an error: parsing stops there
+        triangle, = flatten_path_data("M0 0 L1 0 L1 1 Z 2 2")
+        assert triangle.tolist() == [[0, 0], [1, 0], [1, 1], [0, 0]]
+
+    def test_svg_to_init_paths(self):
+        svg = """<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 64 32">
+        <rect width="64" height="32" fill="white"/>
+        <g transform="translate(10,4)" fill="#00f">
+          <path d="M0 0 L20 0 L20 20 L0 20 Z M5 5 L6 5 L6 6 Z"/>
+          <circle cx="30" cy="10" r="4" style="fill:rgb(0,128,0)"/>
+        </g>
+        <path d="M0 0 L4 0 L4 4 Z" fill="none"/>
+        </svg>"""
+        paths = svg_to_init_paths(svg, width=32, height=16)
+
+        assert [path['color'] for path in paths] == [[255, 255, 255], [0, 0, 255], [0, 128, 0]]
+        # Outer subpath only, scaled by one half, pixel centers at integers
+        square = paths[1]['points']
+        assert square.min(axis=0).tolist() == [4.5, 1.5]
+        assert square.max(axis=0).tolist() == [14.5, 11.5]
+        assert np.allclose(square[0], square[-1])
+
+        largest = svg_to_init_paths(svg, max_paths=2)
+        assert [path['color'] for path in largest] == [[255, 255, 255], [0, 0, 255]]
+
+    def test_svg_style_with_spaces(self):
+        svg = """<svg xmlns="http://www.w3.org/2000/svg" width="8" height="8">
+        <rect width="8" height="8" style="stroke:none; fill : #ff0000 "/>
+        </svg>"""
+        path, = svg_to_init_paths(svg)
+        assert path['color'] == [255, 0, 0]
+
+    def test_fit_keeps_corners(self):
+        square = np.array([[0, 0], [10, 0], [10, 10], [0, 10], [0, 0]], dtype=float)
+        control = fit_bezier_path(square, num_segments=4)
+        assert control.shape == (13, 2)
+        assert np.allclose(control[::3], square)
+        # Straight sides: inner control points stay on the edges
+        assert np.allclose(control[1:3, 1], 0)
+
+    def test_warm_start_matches_svg(self, square_image):
+        paths = svg_to_init_paths(SQUARE_SVG, 32, 32)
+        model = BayesianVectorRenderer(square_image, init_paths=paths, num_segments=4, min_paths=1)
+        assert model.num_paths == 2
+        assert render_psnr(model) > 24
+
+    def test_refine_svg(self, square_image, tmp_path):
+        svg_file = tmp_path / "init.svg"
+        svg_file.write_text(SQUARE_SVG.replace('translate(8,8)', 'translate(9,7)'))
+        paths = svg_to_init_paths(svg_file.read_text(), 32, 32)
+        start = render_psnr(BayesianVectorRenderer(square_image, init_paths=paths, min_paths=1))
+
+        torch.manual_seed(0)
+        refined = refine_svg(square_image, str(svg_file), num_iterations=20, verbose=False)
+        assert refined.num_paths == 2
+        assert render_psnr(refined) > start + 3
@@ -0,0 +1,70 @@
+"""
+Tests for the packed-RGB color histogram.
+"""
+
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from vectalab.colors import ColorHistogram, pack_rgb, unpack_rgb
+
+
+@pytest.fixture
+def image():
+    """Small image with a skewed color distribution."""
+    rng = np.random.default_rng(0)
+    palette = np.array([[255, 255, 255], [200, 30, 30], [0, 0, 0], [10, 200, 90]], dtype=np.uint8)
+    labels = rng.choice(4, size=(40, 50), p=[0.6, 0.25, 0.1, 0.05])
+    img = palette[labels]
+    img[0, :5] = rng.integers(0, 256, (5, 3), dtype=np.uint8)
+    return img
+
+
+def test_pack_unpack_roundtrip():
+    pixels = np.array([[0, 0, 0], [255, 255, 255], [1, 2, 3], [255, 0, 128]], dtype=np.uint8)
+    keys = pack_rgb(pixels)
+    assert keys.dtype == np.uint32
+    assert keys[2] == (1 << 16) | (2 << 8) | 3
+    assert np.array_equal(unpack_rgb(keys), pixels)
+
+
+class TestColorHistogram:
+    """ColorHistogram matches the Counter-based statistics it replaces."""
+
+    def test_matches_counter(self, image):
+        pixels = image.reshape(-1, 3)
+        counter = Counter(map(tuple, pixels))
+        hist = ColorHistogram.from_image(image)
+
+        assert hist.unique_count == len(np.unique(pixels, axis=0))
+        assert hist.total == len(pixels)
+        for k in (1, 3, 10, 50):
+            expected = sum(c for _, c in counter.most_common(k)) / len(pixels)
+            assert hist.top_k_coverage(k) == pytest.approx(expected)
+
+    def test_dominant_order(self, image):
+        hist = ColorHistogram.from_image(image)
+        assert hist.dominant(2) == [(255, 255, 255), (200, 30, 30)]
+        assert hist.most_common(1)[0][1] == hist.counts[0]
+
+    def test_ties_in_first_occurrence_order(self, image):
+        # Two equally common colors, the larger key appearing first
+        tied = np.array([[[9, 9, 9], [1, 1, 1], [1, 1, 1], [9, 9, 9]]], dtype=np.uint8)
+        assert ColorHistogram.from_image(tied).dominant(2) == [(9, 9, 9), (1, 1, 1)]
+
+        counter = Counter(tuple(int(c) for c in p) for p in image.reshape(-1, 3))
+        assert ColorHistogram.from_image(image).most_common() == counter.most_common()
+
+    def test_mask_and_rgba(self, image):
+        rgba = np.dstack((image, np.zeros(image.shape[:2], dtype=np.uint8)))
+        mask = np.zeros(image.shape[:2], dtype=bool)
+        mask[10:20, 10:20] = True
+
+        assert ColorHistogram.from_image(rgba).unique_count == ColorHistogram.from_image(image).unique_count
+        assert ColorHistogram.from_image(image, mask=mask).total == 100
+
+    def test_empty(self):
+        hist = ColorHistogram.from_keys(np.array([], dtype=np.uint32))
+        assert hist.unique_count == 0
+        assert hist.top_k_coverage(10) == 0.0
@@ -0,0 +1,78 @@
+"""
+Tests for the shared ImageContext.
+"""
+
+import os
+import tempfile
+
+import cv2
+import numpy as np
+import pytest
+
+from vectalab.auto import determine_auto_mode
+from vectalab.context import ImageContext
+from vectalab.icon import is_monochrome_icon
+from vectalab.quality import analyze_image
+
+
+@pytest.fixture
+def icon_path():
+    """Monochrome shape on a transparent background, saved as PNG."""
+    bgra = np.zeros((48, 48, 4), dtype=np.uint8)
+    bgra[12:36, 12:36] = [30, 60, 200, 255]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "icon.png")
+        cv2.imwrite(path, bgra)
+        yield path
+
+
+@pytest.fixture
+def logo_path():
+    """Opaque two-color logo, saved as PNG."""
+    bgr = np.full((40, 60, 3), 255, dtype=np.uint8)
+    bgr[10:30, 10:50] = [0, 0, 200]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "logo.png")
+        cv2.imwrite(path, bgr)
+        yield path
+
+
+class TestImageContext:
+    """ImageContext decoding and cached analysis."""
+
+    def test_load_with_alpha(self, icon_path):
+        context = ImageContext.load(icon_path)
+        assert context.has_alpha
+        assert context.rgb.shape == (48, 48, 3)
+        assert tuple(context.rgb[20, 20]) == (200, 60, 30)
+        assert context.alpha[0, 0] == 0
+        assert context.rgba.shape == (48, 48, 4)
+
+    def test_load_opaque(self, logo_path):
+        context = ImageContext.load(logo_path)
+        assert not context.has_alpha
+        assert (context.width, context.height) == (60, 40)
+        assert context.rgba[..., 3].min() == 255
+
+    def test_load_missing_file(self):
+        with pytest.raises(ValueError):
+            ImageContext.load("does-not-exist.png")
+
+    def test_analysis_matches_analyze_image(self, logo_path):
+        context = ImageContext.load(logo_path)
+        assert context.analysis == analyze_image(context.rgb)
+        assert context.analysis is context.analysis
+
+    def test_monochrome_matches_icon_check(self, icon_path, logo_path):
+        assert ImageContext.load(icon_path).monochrome == is_monochrome_icon(icon_path)
+        assert ImageContext.load(logo_path).monochrome == (False, None)
+
+    def test_determine_auto_mode_reuses_context(self, logo_path, monkeypatch):
+        context = ImageContext.load(logo_path)
+        expected = determine_auto_mode(logo_path)
+
+        def fail_load(path):
+            raise AssertionError("image decoded again")
+
+        monkeypatch.setattr(ImageContext, "load", fail_load)
+        assert determine_auto_mode(logo_path, image_context=context) == expected
@@ -61,6 +61,79 @@ class TestColorQuantization:
         assert len(kmeans.cluster_centers_) == n_colors
 
 
+class TestMaskUpsampling:
+    """Segmenting at native resolution and upscaling masks."""
+
+    def test_choose_scale_factor(self):
+        assert core.choose_scale_factor(256, 256) == 4.0
+        assert core.choose_scale_factor(2048, 2048) == 2.0
+        assert core.choose_scale_factor(8192, 8192) == 1.0
+
+    @pytest.mark.parametrize("upsample_masks", [False, True])
+    def test_vectorize_traces_at_upsampled_size(self, tmp_path, monkeypatch, upsample_masks):
+        import cv2
+        from vectalab.masks import CompactMask
+
+        image = np.full((30, 40, 3), 255, dtype=np.uint8)
+        image[8:20, 10:30] = [30, 30, 200]
+        cv2.imwrite(str(tmp_path / 'in.png'), image)
+
+        vm = core.Vectalab(checkpoint_path=str(tmp_path / 'unused.pth'), upsample_masks=upsample_masks)
+        segmented, traced = [], []
+
+        def segment(rgb):
+            segmented.append(rgb.shape[:2])
+            mask = CompactMask.from_dense(rgb[..., 2] < 128)
+            return [{'segmentation': mask, 'area': mask.area, 'bbox': [0, 0, 0, 0]}]
+
+        def trace(rgb, masks):
+            traced.append((rgb.shape[:2], masks[0]['segmentation'].to_dense()))
+            return []
+
+        monkeypatch.setattr(vm.segmenter, 'segment', segment)
+        monkeypatch.setattr(vm.tracer, 'trace', trace)
+        vm.vectorize(str(tmp_path / 'in.png'), str(tmp_path / 'out.svg'))
+
+        assert segmented == [(30, 40) if upsample_masks else (120, 160)]
+        (shape, mask), = traced
+        assert shape == mask.shape == (120, 160)
+        expected = np.zeros((120, 160), dtype=bool)
+        expected[32:80, 40:120] = True
+        assert (mask != expected).mean() < 0.01
+
+
+    def test_transparent_segments_are_filtered(self, tmp_path, monkeypatch):
+        import cv2
+        from vectalab.masks import CompactMask
+
+        image = np.full((30, 40, 4), 255, dtype=np.uint8)
+        image[:, 20:, 3] = 0  # right half transparent
+        cv2.imwrite(str(tmp_path / 'in.png'), image)
+
+        vm = core.Vectalab(checkpoint_path=str(tmp_path / 'unused.pth'), upsample_masks=True)
+        regions = {
+            'background': np.s_[:, :],
+            'transparent': np.s_[5:25, 25:35],
+            'opaque': np.s_[5:25, 5:15],
+            'straddling': np.s_[10:20, 14:26],  # half over the transparent side
+        }
+        masks = []
+        for name, region in regions.items():
+            dense = np.zeros((30, 40), dtype=bool)
+            dense[region] = True
+            compact = CompactMask.from_dense(dense)
+            masks.append({'segmentation': compact, 'area': compact.area, 'bbox': [0, 0, 0, 0], 'name': name})
+        traced = []
+
+        monkeypatch.setattr(vm.segmenter, 'segment', lambda rgb: masks)
+        monkeypatch.setattr(vm.tracer, 'trace', lambda rgb, kept: traced.extend(kept) or [])
+        vm.vectorize(str(tmp_path / 'in.png'), str(tmp_path / 'out.svg'))
+
+        # Visible parts: the background and the straddling rectangle are at
+        # most half transparent, the transparent rectangle entirely
+        assert [m['name'] for m in traced] == ['background', 'opaque', 'straddling']
+
+
 def main():
     """Run tests manually."""
     print("Testing core functionality...")
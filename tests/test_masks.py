@@ -0,0 +1,119 @@
+"""
+Tests for compact (bounding box + bit-packed) masks.
+"""
+
+import numpy as np
+import pytest
+
+from vectalab.masks import (
+    CompactMask,
+    as_compact,
+    label_statistics,
+    paint_label_map,
+    upscale_mask,
+)
+from vectalab.tracing import Tracer
+
+
+@pytest.fixture
+def dense():
+    mask = np.zeros((40, 50), dtype=bool)
+    mask[5:12, 30:44] = True
+    mask[20:31, 2:9] = True
+    mask[8, 31] = False
+    return mask
+
+
+def test_dense_round_trip(dense):
+    mask = CompactMask.from_dense(dense)
+    assert mask.bbox == (2, 5, 44, 31)
+    assert mask.area == dense.sum()
+    assert mask.nbytes == -(-26 * 42 // 8)
+    assert np.array_equal(mask.crop(), dense[5:31, 2:44])
+    assert np.array_equal(mask.to_dense(), dense)
+    assert np.array_equal(np.asarray(mask), dense)
+
+
+@pytest.mark.parametrize("corner", [False, True])
+def test_rle_round_trip(dense, corner):
+    dense[0, 0] = corner
+    mask = CompactMask.from_dense(dense)
+    rle = mask.to_rle()
+
+    # Column-major runs starting with background
+    assert rle['size'] == [40, 50]
+    assert sum(rle['counts']) == dense.size
+    assert (rle['counts'][0] == 0) == corner
+
+    decoded = CompactMask.from_rle(rle)
+    assert decoded.bbox == mask.bbox and decoded.area == mask.area
+    assert np.array_equal(decoded.to_dense(), dense)
+
+
+def test_rle_matches_segment_anything(dense):
+    torch = pytest.importorskip("torch")
+    amg = pytest.importorskip("segment_anything.utils.amg")
+
+    rle = amg.mask_to_rle_pytorch(torch.from_numpy(dense)[None])[0]
+    assert np.array_equal(CompactMask.from_rle(rle).to_dense(), dense)
+    assert np.array_equal(amg.rle_to_mask(CompactMask.from_dense(dense).to_rle()), dense)
+
+
+def test_empty_mask():
+    mask = as_compact({'size': [4, 6], 'counts': [24]})
+    assert mask.area == 0 and mask.crop().shape == (0, 0)
+    assert not mask.to_dense().any() and mask.to_dense().shape == (4, 6)
+
+
+def test_tracer_accepts_compact_masks(dense):
+    image = np.random.default_rng(0).integers(0, 256, (40, 50, 3), dtype=np.uint8)
+    tracer = Tracer(turdsize=0, alphamax=0)
+
+    expected = tuple(map(int, image[dense].mean(axis=0)))
+    assert tracer._get_average_color(image, dense) == expected
+    assert tracer._get_average_color(image, CompactMask.from_dense(dense)) == expected
+
+    paths = tracer.trace(image, [{'segmentation': CompactMask.from_dense(dense), 'area': int(dense.sum())}])
+    assert len(paths) == 1 and paths[0]['color'] == expected
+
+
+def test_upscale_mask_follows_image_edges():
+    cv2 = pytest.importorskip("cv2")
+    image = np.full((200, 240, 3), 240, dtype=np.uint8)
+    cv2.circle(image, (110, 95), 60, (30, 60, 200), -1, lineType=cv2.LINE_AA)
+    truth = np.abs(image.astype(int) - [30, 60, 200]).sum(axis=-1) < 60
+
+    small = cv2.resize(image, (60, 50), interpolation=cv2.INTER_AREA)
+    low_res = np.abs(small.astype(int) - [30, 60, 200]).sum(axis=-1) < 120
+    upscaled = upscale_mask(CompactMask.from_dense(low_res), image)
+    nearest = cv2.resize(low_res.astype(np.uint8), (240, 200), interpolation=cv2.INTER_NEAREST) > 0
+
+    iou = lambda a, b: (a & b).sum() / (a | b).sum()
+    assert upscaled.shape == (200, 240)
+    assert iou(upscaled.to_dense(), truth) > max(0.99, iou(nearest, truth))
+
+
+def test_label_statistics_match_per_mask_loop():
+    rng = np.random.default_rng(1)
+    image = rng.integers(0, 256, (50, 60, 3), dtype=np.uint8)
+    transparent = rng.random((50, 60)) < 0.3
+    dense = []
+    for _ in range(6):
+        mask = np.zeros((50, 60), dtype=bool)
+        y, x = rng.integers(0, 40), rng.integers(0, 50)
+        mask[y:y + rng.integers(3, 20), x:x + rng.integers(3, 20)] = True
+        dense.append(mask)
+
+    labels = paint_label_map([CompactMask.from_dense(m) for m in dense], (50, 60))
+    stats = label_statistics(labels, len(dense), image=image, transparent=transparent)
+
+    covered = np.zeros((50, 60), dtype=bool)
+    for i in reversed(range(len(dense))):
+        # Pixels of mask i not painted over by later masks
+        visible = dense[i] & ~covered
+        covered |= dense[i]
+        assert stats['area'][i] == visible.sum()
+        assert stats['transparent_area'][i] == (visible & transparent).sum()
+        if visible.any():
+            assert np.allclose(stats['mean_color'][i], image[visible].mean(axis=0))
+    assert (labels == -1).sum() == (~covered).sum()
@@ -0,0 +1,145 @@
+"""
+Tests for palette extraction and memory-bounded palette mapping.
+"""
+
+import numpy as np
+import pytest
+
+from vectalab import palette as palette_module
+from vectalab.palette import (
+    PaletteLUT,
+    extract_palette,
+    map_to_palette,
+    nearest_palette_indices,
+    weighted_kmeans,
+    weighted_unique_colors,
+)
+
+
+def brute_force(image, palette):
+    """Reference implementation: full (n_pixels, n_colors) distance matrix."""
+    pal = np.asarray(palette, dtype=np.float64)
+    pixels = image.reshape(-1, image.shape[-1]).astype(np.float64)
+    distances = ((pixels[:, np.newaxis, :] - pal[np.newaxis, :, :]) ** 2).sum(axis=2)
+    return np.argmin(distances, axis=1).reshape(image.shape[:-1])
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+
+class TestPaletteLUT:
+    """LUT mapping is exact."""
+
+    @pytest.mark.parametrize("n_colors", [1, 2, 16, 64])
+    def test_matches_brute_force(self, rng, n_colors):
+        image = rng.integers(0, 256, (120, 160, 3), dtype=np.uint8)
+        palette = rng.integers(0, 256, (n_colors, 3))
+
+        lut = PaletteLUT(palette)
+        assert np.array_equal(lut.indices(image), brute_force(image, palette))
+
+    def test_ties_go_to_first_color(self):
+        image = np.array([[[100, 100, 100]]], dtype=np.uint8)
+        palette = [(90, 100, 100), (110, 100, 100)]
+        assert PaletteLUT(palette).indices(image)[0, 0] == 0
+
+    def test_resolved_cells(self):
+        # Far-apart colors: most cells resolve without refinement
+        lut = PaletteLUT([(0, 0, 0), (255, 255, 255)])
+        assert (lut.table >= 0).mean() > 0.9
+
+
+def test_chunked_search_matches_brute_force(rng, monkeypatch):
+    monkeypatch.setattr(palette_module, 'CHUNK_ELEMENTS', 64)
+    pixels = rng.integers(0, 256, (1000, 4), dtype=np.uint8)
+    palette = rng.integers(0, 256, (10, 4))
+
+    expected = brute_force(pixels[np.newaxis], palette)[0]
+    assert np.array_equal(nearest_palette_indices(pixels, palette), expected)
+
+
+def test_map_to_palette_rgba(rng):
+    image = rng.integers(0, 256, (20, 30, 4), dtype=np.uint8)
+    palette = rng.integers(0, 256, (5, 4)).astype(np.uint8)
+
+    mapped = map_to_palette(image, palette)
+    assert mapped.shape == image.shape
+    assert np.array_equal(mapped, palette[brute_force(image, palette)])
+
+
+def test_map_to_palette_large_image_uses_lut(rng, monkeypatch):
+    built = []
+    original_init = PaletteLUT.__init__
+
+    def tracking_init(self, *args, **kwargs):
+        built.append(True)
+        original_init(self, *args, **kwargs)
+
+    monkeypatch.setattr(PaletteLUT, '__init__', tracking_init)
+    image = rng.integers(0, 256, (256, 256, 3), dtype=np.uint8)
+    palette = rng.integers(0, 256, (8, 3))
+
+    mapped = map_to_palette(image, palette)
+    assert built
+    assert np.array_equal(mapped, palette.astype(np.uint8)[brute_force(image, palette)])
+
+
+@pytest.fixture
+def logo(rng):
+    """Four flat colors with a little noise around each."""
+    base = np.array([[250, 250, 250], [200, 30, 30], [20, 20, 20], [10, 180, 90]])
+    labels = rng.choice(4, size=(60, 80), p=[0.55, 0.25, 0.15, 0.05])
+    noise = rng.integers(-3, 4, (60, 80, 3))
+    return np.clip(base[labels] + noise, 0, 255).astype(np.uint8), base
+
+
+class TestExtractPalette:
+    """Palette extraction on weighted unique colors."""
+
+    def test_weighted_unique_colors(self):
+        image = np.array([[[1, 2, 3], [1, 2, 3], [9, 9, 9]]], dtype=np.uint8)
+        colors, counts = weighted_unique_colors(image)
+        assert colors.tolist() == [[1, 2, 3], [9, 9, 9]]
+        assert counts.tolist() == [2, 1]
+
+    def test_exact_when_few_colors(self, logo):
+        _, base = logo
+        image = base.astype(np.uint8)[np.array([[0, 1], [2, 3]])]
+        palette = extract_palette(image, n_colors=8)
+        assert sorted(map(tuple, palette.astype(int))) == sorted(map(tuple, base))
+
+    @pytest.mark.parametrize("method,color_space", [
+        ('kmeans', 'rgb'), ('kmeans', 'lab'), ('median_cut', 'rgb'),
+    ])
+    def test_recovers_clusters(self, logo, method, color_space):
+        image, base = logo
+        palette = extract_palette(image, n_colors=4, method=method, color_space=color_space)
+
+        assert palette.shape == (4, 3)
+        nearest = nearest_palette_indices(base, palette)
+        assert len(set(nearest.tolist())) == 4
+        assert np.abs(palette[nearest] - base).max() < 6
+
+    def test_deterministic(self, logo):
+        image, _ = logo
+        assert np.array_equal(extract_palette(image, 3), extract_palette(image, 3))
+
+    def test_rgba(self, rng):
+        image = rng.integers(0, 256, (30, 30, 4), dtype=np.uint8)
+        palette = extract_palette(image, n_colors=5)
+        assert palette.shape == (5, 4)
+
+    def test_many_unique_colors_are_binned(self, rng, monkeypatch):
+        monkeypatch.setattr(palette_module, 'MAX_CLUSTER_COLORS', 512)
+        image = rng.integers(0, 256, (100, 100, 3), dtype=np.uint8)
+        palette = extract_palette(image, n_colors=8)
+        assert palette.shape == (8, 3)
+        assert palette.min() >= 0 and palette.max() <= 255
+
+    def test_weighted_kmeans_respects_weights(self):
+        points = np.array([[0.0], [1.0], [10.0]])
+        centers, labels = weighted_kmeans(points, np.array([1.0, 3.0, 1.0]), 2, n_init=1)
+        assert sorted(centers.ravel().tolist()) == pytest.approx([0.75, 10.0])
+        assert labels[0] == labels[1] != labels[2]
@@ -0,0 +1,94 @@
+"""
+Tests for the batched / tiled perceptual metrics API.
+"""
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from vectalab import perceptual
+from vectalab.perceptual import _split_tiles, calculate_gmsd, calculate_gmsd_batch
+
+
+@pytest.fixture
+def image_pairs():
+    """Reference images and noisy copies."""
+    rng = np.random.default_rng(0)
+    refs = [rng.integers(0, 256, (64, 96, 3), dtype=np.uint8) for _ in range(3)]
+    outs = [np.clip(r.astype(int) + rng.integers(-30, 30, r.shape), 0, 255).astype(np.uint8) for r in refs]
+    return refs, outs
+
+
+def to_tensor(image, normalize=False):
+    """Whole-image NCHW tensor, as the metric models take it."""
+    t = torch.from_numpy(image).permute(2, 0, 1)[None].float() / 255
+    return t * 2 - 1 if normalize else t
+
+
+def test_split_tiles_covers_image_with_equal_tiles():
+    tiles = _split_tiles(100, 70, 32)
+    covered = np.zeros((100, 70), dtype=bool)
+    for ys, xs, _ in tiles:
+        assert (ys.stop - ys.start, xs.stop - xs.start) == (32, 32)
+        covered[ys, xs] = True
+    assert covered.all()
+    # Overlapping strips of the shifted last tiles are weighted once
+    assert sum(weight for _, _, weight in tiles) == 100 * 70
+
+
+class TestGMSDBatch:
+    """GMSD batch variant (piq only, no pretrained weights needed)."""
+
+    @pytest.fixture(autouse=True)
+    def _require_piq(self):
+        pytest.importorskip("piq")
+
+    def test_batch_matches_whole_image(self, image_pairs):
+        import piq
+        refs, outs = image_pairs
+        expected = [piq.gmsd(to_tensor(r), to_tensor(o)).item() for r, o in zip(refs, outs)]
+        batch = calculate_gmsd_batch(np.stack(refs), np.stack(outs), batch_size=2)
+        assert batch == pytest.approx(expected, rel=1e-5)
+        assert calculate_gmsd(refs[0], outs[0]) == pytest.approx(expected[0], rel=1e-5)
+
+    def test_reference_broadcast(self, image_pairs):
+        refs, outs = image_pairs
+        batch = calculate_gmsd_batch(refs[0], outs)
+        assert len(batch) == 3
+        assert batch[0] == pytest.approx(calculate_gmsd(refs[0], outs[0]), rel=1e-5)
+
+    def test_memory_cap_does_not_tile(self, image_pairs):
+        refs, outs = image_pairs
+        capped = calculate_gmsd_batch(refs, outs, max_batch_pixels=32 * 32)
+        assert capped == pytest.approx(calculate_gmsd_batch(refs, outs), rel=1e-5)
+        assert calculate_gmsd(refs[0], outs[0], tile_size=32) != pytest.approx(capped[0], rel=1e-3)
+
+    def test_size_mismatch_returns_none(self, image_pairs):
+        refs, _ = image_pairs
+        assert calculate_gmsd_batch(refs[0], refs[0][:32]) is None
+
+
+class TestLPIPSBatch:
+    """LPIPS batch variant with an untrained backbone (no weight download)."""
+
+    @pytest.fixture(autouse=True)
+    def random_lpips(self, monkeypatch):
+        lpips = pytest.importorskip("lpips")
+        model = lpips.LPIPS(net='alex', pnet_rand=True, verbose=False).eval()
+        monkeypatch.setattr(perceptual, '_LPIPS_MODEL', model)
+        return model
+
+    def test_batch_matches_whole_image(self, image_pairs, random_lpips):
+        refs, outs = image_pairs
+        with torch.no_grad():
+            expected = [random_lpips(to_tensor(r, True), to_tensor(o, True)).item()
+                        for r, o in zip(refs, outs)]
+        batch = perceptual.calculate_lpips_batch(refs, outs, batch_size=2)
+        assert batch == pytest.approx(expected, rel=1e-5)
+        assert perceptual.calculate_lpips(refs[0], outs[0]) == pytest.approx(expected[0], rel=1e-5)
+
+    def test_tiled_identical_images(self, image_pairs):
+        refs, _ = image_pairs
+        scores = perceptual.calculate_lpips_batch(refs, refs, tile_size=32)
+        assert scores == pytest.approx([0.0] * 3, abs=1e-6)
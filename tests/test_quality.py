@@ -1,7 +1,13 @@
 import unittest
 import numpy as np
 import cv2
-from vectalab.quality import reduce_to_palette, analyze_image
+from vectalab.quality import (
+    reduce_to_palette,
+    analyze_image,
+    MetricContext,
+    compute_pixel_metrics,
+    SKIMAGE_AVAILABLE,
+)
 
 class TestQuality(unittest.TestCase):
     def test_reduce_to_palette_kmeans(self):
@@ -37,5 +43,38 @@ class TestQuality(unittest.TestCase):
         reduced = reduce_to_palette(img, n_colors=2)
         self.assertTrue(reduced.shape == img.shape)
 
+class TestMetricContext(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.original = np.full((64, 80, 3), 255, dtype=np.uint8)
+        cv2.circle(self.original, (40, 32), 20, (200, 30, 30), -1)
+        cv2.rectangle(self.original, (5, 5), (20, 20), (20, 20, 160), -1)
+        noise = rng.integers(-15, 15, self.original.shape)
+        self.rendered = np.clip(self.original.astype(int) + noise, 0, 255).astype(np.uint8)
+
+    @unittest.skipUnless(SKIMAGE_AVAILABLE, "scikit-image not installed")
+    def test_ssim_matches_skimage(self):
+        from skimage.metrics import structural_similarity
+        context = MetricContext(self.original)
+        expected = structural_similarity(self.original, self.rendered, channel_axis=2, data_range=255)
+        self.assertAlmostEqual(context.ssim(self.rendered), expected, places=10)
+
+    def test_context_reuse_matches_fresh_metrics(self):
+        context = MetricContext(self.original)
+        context.score(self.original)  # Populate cached features
+        reused = compute_pixel_metrics(self.original, self.rendered, context=context)
+        fresh = compute_pixel_metrics(self.original, self.rendered)
+        for key, value in fresh.items():
+            if value is None:
+                self.assertIsNone(reused[key])
+            else:
+                self.assertAlmostEqual(reused[key], value, places=10, msg=key)
+
+    def test_identical_image_scores(self):
+        metrics = MetricContext(self.original).score(self.original)
+        self.assertAlmostEqual(metrics['edge_similarity'], 1.0)
+        self.assertAlmostEqual(metrics['delta_e'], 0.0)
+        self.assertEqual(metrics['topology_score'], 1.0)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,82 @@
+"""
+Tests for the shared SVG renderer and its LRU cache.
+"""
+
+import numpy as np
+import pytest
+
+from vectalab import render
+from vectalab.render import RenderCache, render_svg_to_array
+
+SVG_A = '<svg xmlns="http://www.w3.org/2000/svg" width="8" height="8"><rect width="8" height="8" fill="#ff0000"/></svg>'
+SVG_B = SVG_A.replace('#ff0000', '#0000ff')
+
+
+@pytest.fixture
+def fake_rasterize(monkeypatch):
+    """Replace cairosvg rasterization with a counting stub."""
+    calls = []
+
+    def _rasterize(svg_content, width, height, mode, scale):
+        calls.append((svg_content, width, height, mode, scale))
+        channels = len(mode)
+        return np.full((height, width, channels), len(calls), dtype=np.uint8)
+
+    monkeypatch.setattr(render, '_rasterize', _rasterize)
+    monkeypatch.setattr(render, '_RENDER_CACHE', RenderCache())
+    return calls
+
+
+class TestRenderCache:
+    """Tests for render_svg_to_array caching."""
+
+    def test_same_content_rendered_once(self, fake_rasterize):
+        first = render_svg_to_array(SVG_A, 8, 8)
+        second = render_svg_to_array(SVG_A, 8, 8)
+
+        assert len(fake_rasterize) == 1
+        assert second is first
+        info = render.render_cache_info()
+        assert info['hits'] == 1
+        assert info['misses'] == 1
+
+    def test_key_includes_size_mode_and_scale(self, fake_rasterize):
+        render_svg_to_array(SVG_A, 8, 8)
+        render_svg_to_array(SVG_A, 16, 8)
+        render_svg_to_array(SVG_A, 8, 8, mode='RGBA')
+        render_svg_to_array(SVG_A, 8, 8, scale=2)
+        render_svg_to_array(SVG_B, 8, 8)
+
+        assert len(fake_rasterize) == 5
+
+    def test_cached_arrays_are_read_only(self, fake_rasterize):
+        rendered = render_svg_to_array(SVG_A, 8, 8)
+        with pytest.raises(ValueError):
+            rendered[0, 0, 0] = 1
+
+    def test_lru_eviction(self):
+        cache = RenderCache(max_entries=2)
+        arrays = [np.zeros((2, 2, 3), dtype=np.uint8) for _ in range(3)]
+        keys = [RenderCache.make_key(svg, 2, 2, 'RGB', 1) for svg in ('a', 'b', 'c')]
+
+        cache.put(keys[0], arrays[0])
+        cache.put(keys[1], arrays[1])
+        cache.get(keys[0])  # 'a' becomes most recent
+        cache.put(keys[2], arrays[2])
+
+        assert cache.get(keys[0]) is arrays[0]
+        assert cache.get(keys[1]) is None
+        assert cache.info()['entries'] == 2
+
+    def test_byte_budget(self):
+        cache = RenderCache(max_entries=10, max_bytes=20)
+        cache.put(RenderCache.make_key('a', 2, 2, 'RGB', 1), np.zeros((2, 2, 3), dtype=np.uint8))
+        cache.put(RenderCache.make_key('b', 2, 2, 'RGB', 1), np.zeros((2, 2, 3), dtype=np.uint8))
+
+        assert cache.info()['entries'] == 1
+        assert cache.info()['bytes'] <= 20
+
+    def test_bypass_cache(self, fake_rasterize):
+        render_svg_to_array(SVG_A, 8, 8, use_cache=False)
+        render_svg_to_array(SVG_A, 8, 8, use_cache=False)
+        assert len(fake_rasterize) == 2
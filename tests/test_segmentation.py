@@ -0,0 +1,226 @@
+"""
+Tests for the SAM model pool, the on-disk mask cache and the HTTP backend.
+"""
+
+import threading
+import time
+
+import numpy as np
+import pytest
+
+pytest.importorskip("segment_anything")
+
+from vectalab import segmentation
+from vectalab.masks import CompactMask
+from vectalab.segmentation import (
+    HTTPBackend, MaskCache, SAMSegmenter, SegmentationBackend, decode_image, encode_image,
+)
+from vectalab.segmentation_server import ComponentsBackend, start_server
+
+
+def fake_masks(image):
+    h, w = image.shape[:2]
+    masks = []
+    for i, (y0, x0) in enumerate([(0, 0), (h // 2, w // 3)]):
+        segmentation_mask = np.zeros((h, w), dtype=bool)
+        segmentation_mask[y0:y0 + 5, x0:x0 + 7] = True
+        masks.append({
+            'segmentation': segmentation_mask,
+            'area': int(segmentation_mask.sum()),
+            'bbox': [x0, y0, 7, 5],
+            'predicted_iou': 0.9 + i / 100,
+            'point_coords': [[x0 + 1.5, y0 + 2.0]],
+            'stability_score': np.float32(0.95),
+            'crop_box': [0, 0, w, h],
+        })
+    return masks
+
+
+@pytest.fixture
+def fake_sam(monkeypatch, tmp_path):
+    """Replace SAM loading and mask generation, counting calls to each."""
+    calls = {'load': 0, 'generate': 0}
+
+    class FakeModel:
+        def to(self, device):
+            return self
+
+    def build(checkpoint):
+        calls['load'] += 1
+        return FakeModel()
+
+    class FakeGenerator:
+        def __init__(self, model, output_mode='binary_mask', **kwargs):
+            self.model = model
+            self.output_mode = output_mode
+
+        def generate(self, image):
+            calls['generate'] += 1
+            masks = fake_masks(image)
+            if self.output_mode == 'uncompressed_rle':
+                for m in masks:
+                    m['segmentation'] = CompactMask.from_dense(m['segmentation']).to_rle()
+            return masks
+
+    monkeypatch.setattr(segmentation, 'sam_model_registry', {'vit_b': build})
+    monkeypatch.setattr(segmentation, 'SamAutomaticMaskGenerator', FakeGenerator)
+    monkeypatch.setattr(segmentation, '_MODEL_POOL', {})
+
+    checkpoint = tmp_path / 'sam_vit_b.pth'
+    checkpoint.write_bytes(b'')
+    return calls, str(checkpoint)
+
+
+@pytest.fixture
+def image():
+    return np.random.default_rng(0).integers(0, 256, (20, 27, 3), dtype=np.uint8)
+
+
+def test_segmenters_share_pooled_model(fake_sam, image):
+    calls, checkpoint = fake_sam
+    first = SAMSegmenter('vit_b', checkpoint)
+    second = SAMSegmenter('vit_b', checkpoint, points_per_side=8)
+    first.segment(image)
+    second.segment(image)
+
+    assert calls['load'] == 1
+    assert first.sam is second.sam
+    assert second.mask_generator is not first.mask_generator
+
+
+def test_mask_cache_skips_sam(fake_sam, image, tmp_path):
+    calls, checkpoint = fake_sam
+    cache_dir = tmp_path / 'masks'
+    expected = SAMSegmenter('vit_b', checkpoint, cache_dir=cache_dir).segment(image)
+
+    cached = SAMSegmenter('vit_b', checkpoint, cache_dir=cache_dir).segment(image)
+    assert calls == {'load': 1, 'generate': 1}
+    assert len(cached) == len(expected) == 2
+    for a, b, dense in zip(cached, expected, fake_masks(image)):
+        assert isinstance(a['segmentation'], CompactMask)
+        assert np.array_equal(a['segmentation'].to_dense(), dense['segmentation'])
+        assert np.array_equal(b['segmentation'].to_dense(), dense['segmentation'])
+        assert a['bbox'] == b['bbox'] and a['area'] == b['area']
+        assert a['predicted_iou'] == pytest.approx(b['predicted_iou'])
+
+    # Different generator args or image miss the cache
+    SAMSegmenter('vit_b', checkpoint, cache_dir=cache_dir, points_per_side=8).segment(image)
+    SAMSegmenter('vit_b', checkpoint, cache_dir=cache_dir).segment(image[:, ::-1])
+    assert calls['generate'] == 3
+
+
+def test_mask_cache_entries(tmp_path, image):
+    cache = MaskCache(tmp_path)
+    key = cache.make_key(image, 'vit_b', {'points_per_side': 32})
+    assert cache.get(key) is None
+
+    cache.put(key, [])
+    assert cache.get(key) == []
+
+    # Corrupt entries are misses
+    (tmp_path / f"{key}.npz").write_bytes(b'not an npz')
+    assert cache.get(key) is None
+
+
+class FakeBackend(SegmentationBackend):
+    """fake_masks with a delay, recording batch sizes and peak concurrency."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.batches = []
+        self.active = self.peak = 0
+        self.lock = threading.Lock()
+
+    def segment_batch(self, images, generator_args):
+        with self.lock:
+            self.batches.append(len(images))
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        if generator_args.get('fail'):
+            raise RuntimeError('model failed')
+        return [fake_masks(image) for image in images]
+
+
+@pytest.fixture
+def server():
+    servers = []
+
+    def serve(backend):
+        servers.append(start_server(backend))
+        return servers[-1]
+
+    yield serve
+    for s in servers:
+        s.shutdown()
+        s.server_close()
+
+
+@pytest.mark.parametrize('image_format', ['png', 'webp'])
+def test_image_encoding_is_lossless(image, image_format):
+    # WebP drops the color of fully transparent pixels
+    rgba = np.dstack([image, np.maximum(image[..., :1], 1)])
+    for img in (image, rgba):
+        assert np.array_equal(decode_image(encode_image(img, image_format)), img)
+
+
+def test_http_backend_round_trip(server, image, tmp_path):
+    backend = FakeBackend()
+    url = server(backend).url
+    segmenter = SAMSegmenter(backend=url, cache_dir=tmp_path)
+    masks = segmenter.segment(image)
+
+    assert len(masks) == 2
+    for m, dense in zip(masks, fake_masks(image)):
+        assert isinstance(m['segmentation'], CompactMask)
+        assert np.array_equal(m['segmentation'].to_dense(), dense['segmentation'])
+        assert m['bbox'] == dense['bbox']
+        assert m['stability_score'] == pytest.approx(0.95)
+
+    # Served from the cache the second time
+    segmenter.segment(image)
+    assert backend.batches == [1]
+    segmenter.close()
+
+
+def test_http_backend_batches_concurrently(server, image):
+    backend = FakeBackend(delay=0.2)
+    images = [np.roll(image, i, axis=1) for i in range(5)]
+    with HTTPBackend(server(backend).url, batch_size=2, max_in_flight=3) as client:
+        results = client.segment_batch(images, {})
+
+    assert sorted(backend.batches) == [1, 2, 2]
+    assert backend.peak > 1
+    # Results stay in input order
+    for result, img in zip(results, images):
+        assert result[1]['bbox'] == fake_masks(img)[1]['bbox']
+
+
+def test_http_backend_reports_server_errors(server, image):
+    with HTTPBackend(server(FakeBackend()).url) as client:
+        with pytest.raises(RuntimeError, match='500'):
+            client.segment_batch([image], {'fail': True})
+        # The connection is still usable
+        assert len(client.segment_batch([image], {})[0]) == 2
+
+
+def test_http_backend_recovers_from_timeout(server, image):
+    backend = FakeBackend(delay=1.0)
+    with HTTPBackend(server(backend).url, timeout=0.3, max_in_flight=1) as client:
+        with pytest.raises(TimeoutError):
+            client.segment_batch([image], {})
+        backend.delay = 0.0
+        assert len(client.segment_batch([image], {})[0]) == 2
+
+
+def test_components_backend_partitions_image(server):
+    image = np.zeros((24, 32, 3), dtype=np.uint8)
+    image[4:12, 6:20] = 255
+    image[16:, 24:] = (0, 0, 255)
+    masks = SAMSegmenter(backend=server(ComponentsBackend(min_area=1)).url).segment(image)
+
+    assert sorted(m['area'] for m in masks) == [8 * 8, 8 * 14, 24 * 32 - 8 * 8 - 8 * 14]
+    covered = sum(m['segmentation'].to_dense().astype(int) for m in masks)
+    assert np.array_equal(covered, np.ones(image.shape[:2], dtype=int))
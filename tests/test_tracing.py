@@ -0,0 +1,75 @@
+"""
+Tests for bounding-box-cropped, parallel potrace tracing.
+"""
+
+import numpy as np
+import pytest
+
+potrace = pytest.importorskip("potrace")
+
+from vectalab.masks import CompactMask
+from vectalab import tracing
+from vectalab.tracing import Tracer
+
+
+def full_frame_trace(mask, turdsize=0, alphamax=0):
+    """Reference: trace the uncropped mask."""
+    return potrace.Bitmap(~mask).trace(turdsize=turdsize, alphamax=alphamax, opticurve=True)
+
+
+def path_coords(path):
+    coords = []
+    for curve in path:
+        coords.append((curve.start_point.x, curve.start_point.y))
+        for segment in curve:
+            points = [segment.c, segment.end_point] if segment.is_corner else [segment.c1, segment.c2, segment.end_point]
+            coords.extend((p.x, p.y) for p in points)
+    return np.array(coords)
+
+
+@pytest.fixture
+def masks():
+    yy, xx = np.mgrid[:60, :80]
+    shapes = [
+        (xx - 50) ** 2 / 100 + (yy - 20) ** 2 / 40 < 1,
+        (np.abs(xx - 20) < 12) & (np.abs(yy - 35) < 15) & ~((xx - 20) ** 2 + (yy - 35) ** 2 < 20),
+        yy < 4,  # touches the frame edge
+        np.zeros((60, 80), dtype=bool),
+    ]
+    return [{'segmentation': CompactMask.from_dense(m), 'area': int(m.sum())} for m in shapes]
+
+
+@pytest.fixture
+def image():
+    return np.random.default_rng(0).integers(0, 256, (60, 80, 3), dtype=np.uint8)
+
+
+def test_cropped_trace_matches_full_frame(image, masks):
+    paths = Tracer(turdsize=0, alphamax=0, workers=1).trace(image, masks)
+
+    by_area = sorted(masks, key=lambda m: m['area'], reverse=True)
+    assert len(paths) == len(masks)
+    for traced, mask_data in zip(paths, by_area):
+        expected = full_frame_trace(mask_data['segmentation'].to_dense())
+        assert len(traced['path']) == len(expected)
+        assert np.allclose(path_coords(traced['path']), path_coords(expected))
+
+
+def test_parallel_trace_keeps_order(image, masks, monkeypatch):
+    monkeypatch.setattr(tracing, 'PARALLEL_MIN_MASKS', 1)
+    sequential = Tracer(turdsize=0, alphamax=0, workers=1).trace(image, masks)
+    parallel = Tracer(turdsize=0, alphamax=0, workers=2).trace(image, masks)
+
+    assert [p['color'] for p in parallel] == [p['color'] for p in sequential]
+    for a, b in zip(parallel, sequential):
+        assert np.array_equal(path_coords(a['path']), path_coords(b['path']))
+
+
+def test_default_traces_in_process(image, masks, monkeypatch):
+    def no_pool(*args, **kwargs):
+        raise AssertionError("process pool started")
+
+    monkeypatch.setattr(tracing, 'ProcessPoolExecutor', no_pool)
+    assert len(Tracer().trace(image, masks)) == len(masks)
+    # Too few masks to be worth a pool
+    assert len(Tracer(workers=4).trace(image, masks)) == len(masks)
@@ -0,0 +1,80 @@
+"""
+Tests for the shared in-memory vtracer entry point.
+"""
+
+import os
+import tempfile
+
+import cv2
+import numpy as np
+import pytest
+
+from vectalab.vtrace import VTRACER_AVAILABLE, encode_png, trace_array, trace_file
+
+SETTINGS = {
+    'colormode': 'color',
+    'hierarchical': 'stacked',
+    'mode': 'spline',
+    'filter_speckle': 4,
+}
+
+
+@pytest.fixture
+def logo_image():
+    """Two-color image with a solid block."""
+    image = np.full((64, 96, 3), 255, dtype=np.uint8)
+    image[16:48, 24:72] = [200, 30, 30]
+    return image
+
+
+@pytest.mark.skipif(not VTRACER_AVAILABLE, reason="vtracer not installed")
+class TestTraceArray:
+    """Tests for trace_array / trace_file."""
+
+    def _trace_via_disk(self, bgr_image):
+        import vtracer
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            png_path = os.path.join(tmpdir, "in.png")
+            svg_path = os.path.join(tmpdir, "out.svg")
+            cv2.imwrite(png_path, bgr_image)
+            vtracer.convert_image_to_svg_py(png_path, svg_path, **SETTINGS)
+            with open(svg_path) as f:
+                return f.read()
+
+    def test_matches_file_based_output(self, logo_image):
+        """In-memory tracing produces the same SVG as the temp-file path."""
+        expected = self._trace_via_disk(cv2.cvtColor(logo_image, cv2.COLOR_RGB2BGR))
+        assert trace_array(logo_image, **SETTINGS) == expected
+
+    def test_alpha_channel(self, logo_image):
+        """Separate alpha channel is attached before tracing."""
+        alpha = np.full(logo_image.shape[:2], 255, dtype=np.uint8)
+        alpha[:, :10] = 0
+
+        bgra = np.dstack((cv2.cvtColor(logo_image, cv2.COLOR_RGB2BGR), alpha))
+        expected = self._trace_via_disk(bgra)
+        assert trace_array(logo_image, alpha=alpha, **SETTINGS) == expected
+
+    def test_grayscale_input(self, logo_image):
+        """Grayscale (e.g. binary) arrays are accepted."""
+        gray = cv2.cvtColor(logo_image, cv2.COLOR_RGB2GRAY)
+        svg = trace_array(gray, colormode='binary')
+        assert svg.count('<path') >= 1
+
+    def test_trace_file(self, logo_image):
+        """trace_file returns the SVG string without writing one."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            png_path = os.path.join(tmpdir, "in.png")
+            cv2.imwrite(png_path, cv2.cvtColor(logo_image, cv2.COLOR_RGB2BGR))
+            svg = trace_file(png_path, **SETTINGS)
+            assert os.listdir(tmpdir) == ["in.png"]
+        assert svg.startswith('<?xml')
+        assert '<path' in svg
+
+
+def test_encode_png_roundtrip(logo_image):
+    """encode_png preserves pixels."""
+    data = encode_png(logo_image)
+    decoded = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_UNCHANGED)
+    assert np.array_equal(cv2.cvtColor(decoded, cv2.COLOR_BGR2RGB), logo_image)
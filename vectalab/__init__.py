@@ -8,7 +8,7 @@ Website: https://vectalab.com
 """
 
 from .core import Vectalab
-from .bayesian import optimize_vectorization, BayesianVectorRenderer
+from .bayesian import optimize_vectorization, refine_svg, BayesianVectorRenderer
 from .hifi import (
     vectorize_high_fidelity, 
     vectorize_for_figma,
@@ -38,6 +38,7 @@ from .quality import (
     vectorize_logo_clean,
     compare_and_visualize,
     compute_pixel_metrics,
+    MetricContext,
     analyze_image,
     reduce_to_palette,
     QUALITY_PRESETS,
@@ -49,6 +50,8 @@ from .premium import (
     edge_aware_denoise,
     reduce_to_clean_palette,
 )
+from .context import ImageContext
+from .colors import ColorHistogram
 from .optimizations import (
     apply_all_optimizations,
     optimize_with_svgo,
@@ -69,6 +72,7 @@ __all__ = [
     # Core
     'Vectalab', 
     'optimize_vectorization', 
+    'refine_svg',
     'BayesianVectorRenderer',
     # High-fidelity vectorization
     'vectorize_high_fidelity',
@@ -96,6 +100,7 @@ __all__ = [
     'vectorize_logo_clean',
     'compare_and_visualize',
     'compute_pixel_metrics',
+    'MetricContext',
     'analyze_image',
     'reduce_to_palette',
     'QUALITY_PRESETS',
@@ -105,6 +110,9 @@ __all__ = [
     'vectorize_photo_premium',
     'edge_aware_denoise',
     'reduce_to_clean_palette',
+    # Shared image state
+    'ImageContext',
+    'ColorHistogram',
     # 80/20 Optimizations
     'apply_all_optimizations',
     'optimize_with_svgo',
@@ -5,22 +5,20 @@ This module centralizes the decision logic for the 'auto' vectorization mode.
 It is used by both the CLI and the Benchmark tool to ensure consistent behavior.
 """
 
-import cv2
-import numpy as np
 from pathlib import Path
 from typing import Tuple, Optional, Dict, Any
 
 # Import dependencies
 try:
-    from vectalab.quality import analyze_image
-    from vectalab.icon import is_monochrome_icon
+    from vectalab.context import ImageContext
     DEPENDENCIES_AVAILABLE = True
 except ImportError:
     DEPENDENCIES_AVAILABLE = False
 
 def determine_auto_mode(
     input_path: str, 
-    set_name: Optional[str] = None
+    set_name: Optional[str] = None,
+    image_context: Optional["ImageContext"] = None,
 ) -> Tuple[str, str, Optional[Tuple[int, int, int]]]:
     """
     Determine the best vectorization mode and quality settings for an image.
@@ -28,6 +26,8 @@ def determine_auto_mode(
     Args:
         input_path: Path to the input image.
         set_name: Optional name of the dataset (e.g., 'complex', 'mono') for fallback hints.
+        image_context: Already decoded input (loaded from input_path if None).
+            Its cached analysis is reused by the selected pipeline.
         
     Returns:
         Tuple containing:
@@ -44,39 +44,33 @@ def determine_auto_mode(
     mono_color = None
     
     try:
+        # Decode once; raises ValueError if the image cannot be loaded
+        image_context = ImageContext.resolve(input_path, image_context)
+        
         # 1. Check for Monochrome Icon first (Geometric shapes)
-        is_mono, m_color = is_monochrome_icon(input_path)
+        is_mono, m_color = image_context.monochrome
         if is_mono:
             # Use logo mode which now handles monochrome icons with binary tracing
             return "logo", "ultra", m_color
             
         # 2. Analyze image content
-        img = cv2.imread(str(input_path))
-        if img is not None:
-            img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-            analysis = analyze_image(img_rgb)
-            
-            if analysis['is_logo']:
-                # Heuristic: High color count (> 1000) usually means complex illustration/gradients
-                # even if top-10 coverage is high (e.g. cartoons). Use Premium for these.
-                if analysis['unique_colors'] > 1000:
-                    effective_mode = "premium"
-                else:
-                    effective_mode = "logo"
-                    # Heuristic: Very simple logos (high top-10 coverage) benefit from 'clean'
-                    # Complex logos benefit from 'ultra'
-                    if analysis['top_10_coverage'] > 0.90:
-                        effective_quality = "clean"
-                    else:
-                        effective_quality = "ultra"
-            else:
-                effective_mode = "premium"
-        else:
-            # Fallback if image load fails
-            if set_name == "complex":
+        analysis = image_context.analysis
+        
+        if analysis['is_logo']:
+            # Heuristic: High color count (> 1000) usually means complex illustration/gradients
+            # even if top-10 coverage is high (e.g. cartoons). Use Premium for these.
+            if analysis['unique_colors'] > 1000:
                 effective_mode = "premium"
             else:
                 effective_mode = "logo"
+                # Heuristic: Very simple logos (high top-10 coverage) benefit from 'clean'
+                # Complex logos benefit from 'ultra'
+                if analysis['top_10_coverage'] > 0.90:
+                    effective_quality = "clean"
+                else:
+                    effective_quality = "ultra"
+        else:
+            effective_mode = "premium"
                 
     except Exception:
         # Fallback on error
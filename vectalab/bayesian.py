@@ -17,17 +17,24 @@ Where:
 The optimization uses a differentiable renderer with soft anti-aliasing.
 """
 
+import hashlib
+import os
+import re
+import xml.etree.ElementTree as ET
+
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
+import torch.utils.checkpoint
 import numpy as np
 import cv2
 from typing import List, Dict, Tuple, Optional
-from sklearn.cluster import KMeans
 from skimage.segmentation import slic
 from skimage.measure import find_contours
 from scipy import ndimage
 
+from vectalab.palette import extract_palette, palette_indices
+
 
 class ColorPalette:
     """
@@ -56,29 +63,14 @@ class ColorPalette:
         h, w = image_rgb.shape[:2]
         
         # Convert to LAB
-        image_lab = cv2.cvtColor(image_rgb, cv2.COLOR_RGB2LAB).astype(np.float32)
-        
-        # Reshape for clustering
-        pixels_lab = image_lab.reshape(-1, 3)
-        
-        # Add spatial coordinates for spatial regularization
-        y_coords, x_coords = np.meshgrid(np.arange(h), np.arange(w), indexing='ij')
-        y_norm = y_coords.flatten() / h * 10  # Scale factor for spatial influence
-        x_norm = x_coords.flatten() / w * 10
-        
-        # Combine LAB + spatial
-        features = np.column_stack([pixels_lab, x_norm, y_norm])
-        
-        # K-means clustering
-        kmeans = KMeans(n_clusters=min(self.num_colors, len(features) // 10), 
-                       random_state=42, n_init=10)
-        labels = kmeans.fit_predict(features)
+        image_lab = cv2.cvtColor(image_rgb, cv2.COLOR_RGB2LAB)
         
-        # Extract palette (LAB values only, not spatial)
-        palette = kmeans.cluster_centers_[:, :3]
+        # K-means on the unique LAB colors weighted by pixel count
+        n_clusters = max(1, min(self.num_colors, (h * w) // 10))
+        palette = extract_palette(image_lab, n_clusters)
         
-        # Reshape labels
-        labels = labels.reshape(h, w)
+        # Assign every pixel to its nearest palette color
+        labels = palette_indices(image_lab, palette).reshape(h, w)
         
         return palette, labels
     
@@ -107,20 +99,44 @@ class RegionExtractor:
         """
         Extract regions from image using SLIC superpixels.
         
+        Mean colors come from one bincount pass over the label map and
+        contours are traced in each superpixel's bounding box only, so the
+        cost grows with the image size rather than with segments × pixels.
+        
         Returns:
-            List of regions with contours and colors
+            List of regions with contours and colors; 'mask' covers the
+            region's bounding box 'bbox' (x0, y0, x1, y1) only
         """
-        # SLIC superpixel segmentation
+        # SLIC superpixel segmentation (labels from 1 for find_objects)
         segments = slic(image_rgb, n_segments=self.n_segments, 
-                       compactness=self.compactness, start_label=0)
+                       compactness=self.compactness, start_label=1)
+        h, w = segments.shape
+        
+        # Per-label pixel counts and mean colors in one pass
+        labels = segments.ravel()
+        num_labels = labels.max() + 1
+        counts = np.bincount(labels, minlength=num_labels)
+        pixels = image_rgb.reshape(labels.shape[0], -1)
+        color_sums = np.stack([
+            np.bincount(labels, weights=pixels[:, c], minlength=num_labels)
+            for c in range(pixels.shape[1])
+        ], axis=1)
+        mean_colors = color_sums / np.maximum(counts, 1)[:, np.newaxis]
         
         regions = []
         
-        for segment_id in np.unique(segments):
-            mask = (segments == segment_id).astype(np.uint8)
+        for segment_id, window in enumerate(ndimage.find_objects(segments), start=1):
+            if window is None:
+                continue
+            
+            # Bounding box with a 1-pixel border so contours match the full frame
+            y0, y1 = max(window[0].start - 1, 0), min(window[0].stop + 1, h)
+            x0, x1 = max(window[1].start - 1, 0), min(window[1].stop + 1, w)
+            mask = (segments[y0:y1, x0:x1] == segment_id).astype(np.uint8)
             
-            # Get contour
-            contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            # Get contour (in image coordinates)
+            contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE,
+                                           offset=(x0, y0))
             
             if len(contours) == 0:
                 continue
@@ -135,17 +151,15 @@ class RegionExtractor:
             epsilon = 0.01 * cv2.arcLength(contour, True)
             simplified = cv2.approxPolyDP(contour, epsilon, True)
             
-            # Get mean color in region
-            mean_color = image_rgb[mask > 0].mean(axis=0)
-            
             # Convert contour to points list
             points = simplified.reshape(-1, 2).tolist()
             
             regions.append({
                 'points': points,
-                'color': mean_color.tolist(),
+                'color': mean_colors[segment_id].tolist(),
                 'area': cv2.contourArea(contour),
-                'mask': mask
+                'mask': mask,
+                'bbox': (x0, y0, x1, y1)
             })
         
         # Sort by area (largest first for proper layering)
@@ -154,6 +168,27 @@ class RegionExtractor:
         return regions
 
 
+# Default element budget for one (segment rows, W) winding chunk (~64 MB float32)
+WINDING_MAX_ELEMENTS = 1 << 24
+
+# Rows with segment parameter t < -pad or t > 1 + pad get a soft validity
+# below 1e-9 and are skipped
+WINDING_T_PAD = 1.05
+
+# A bounding-box-culled winding element (masked block plus int64 scatter
+# index) costs about this many full-row pixels; culling is only used when
+# it evaluates fewer than 1 / BOX_ELEMENT_COST of the row pixels
+BOX_ELEMENT_COST = 3
+
+# Autograd memory of rendering, in float32 values kept for backward: about 7
+# per pixel of each path (winding, alpha, compositing), 2 per pixel of each
+# (segment, row) winding pair and 7 per culled (segment, row, column)
+# element; rounded up for memory budgets
+GRAPH_VALUES_PER_PIXEL = 8
+GRAPH_VALUES_PER_PAIR_PIXEL = 2.5
+GRAPH_VALUES_PER_BOX_PIXEL = 8
+
+
 class DifferentiableBezierRenderer(nn.Module):
     """
     Pure PyTorch differentiable Bézier curve renderer using soft rasterization.
@@ -162,11 +197,13 @@ class DifferentiableBezierRenderer(nn.Module):
     with differentiable anti-aliasing for backpropagation.
     """
     
-    def __init__(self, width: int, height: int, device: str = 'cpu'):
+    def __init__(self, width: int, height: int, device: str = 'cpu',
+                 max_elements: int = WINDING_MAX_ELEMENTS):
         super().__init__()
         self.width = width
         self.height = height
         self.device = device
+        self.max_elements = max_elements
         
         # Create coordinate grids
         y_coords = torch.arange(height, dtype=torch.float32, device=device)
@@ -198,26 +235,37 @@ class DifferentiableBezierRenderer(nn.Module):
         Returns:
             [M, 2] sampled points
         """
-        num_points = control_points.shape[0]
+        return self.sample_bezier_paths(control_points.unsqueeze(0), samples_per_segment)[0]
+    
+    def sample_bezier_paths(self, control_points: torch.Tensor,
+                            samples_per_segment: int = 20) -> torch.Tensor:
+        """
+        Sample points along a batch of Bézier paths.
+        
+        Args:
+            control_points: [P, N, 2] where N = num_segments * 3 + 1
+            samples_per_segment: Number of samples per Bézier segment
+            
+        Returns:
+            [P, M, 2] sampled points (M = num_segments * samples_per_segment)
+        """
+        num_paths, num_points = control_points.shape[:2]
         num_segments = (num_points - 1) // 3
         
         if num_segments < 1:
             return control_points
         
-        all_points = []
-        t_vals = torch.linspace(0, 1, samples_per_segment, device=self.device)
+        # Segment control points: [P, S, 1, 2] each
+        end = num_segments * 3
+        p0 = control_points[:, 0:end:3].unsqueeze(2)
+        p1 = control_points[:, 1:end:3].unsqueeze(2)
+        p2 = control_points[:, 2:end:3].unsqueeze(2)
+        p3 = control_points[:, 3:end + 1:3].unsqueeze(2)
         
-        for seg in range(num_segments):
-            idx = seg * 3
-            p0 = control_points[idx]
-            p1 = control_points[idx + 1]
-            p2 = control_points[idx + 2]
-            p3 = control_points[min(idx + 3, num_points - 1)]
-            
-            points = self.cubic_bezier(t_vals, p0, p1, p2, p3)
-            all_points.append(points)
+        t_vals = torch.linspace(0, 1, samples_per_segment, device=control_points.device)
+        points = self.cubic_bezier(t_vals, p0, p1, p2, p3)
         
-        return torch.cat(all_points, dim=0)
+        return points.reshape(num_paths, num_segments * samples_per_segment, 2)
     
     def compute_winding_number(self, path_points: torch.Tensor, 
                                sigma: float = 1.0) -> torch.Tensor:
@@ -225,50 +273,369 @@ class DifferentiableBezierRenderer(nn.Module):
         Compute soft winding number for all pixels using scanline approach.
         
         Uses ray casting with soft boundaries for differentiability.
-        More memory efficient by processing in chunks.
+        All segments are evaluated as batched tensor operations in chunks
+        bounded by max_elements (see _winding_over_grid).
+        
+        Args:
+            path_points: [M, 2] closed polyline (last point connects to first)
+            sigma: Anti-aliasing width
+            
+        Returns:
+            [H, W] soft winding number
+        """
+        return self._winding_over_grid(
+            path_points, self.grid_x[:1, :], self.grid_y[:, :1], sigma
+        )
+    
+    def path_bbox(self, path_points: torch.Tensor,
+                  margin: float) -> Tuple[int, int, int, int]:
+        """
+        Padded integer bounding box (x0, y0, x1, y1) of a path, clipped to
+        the canvas. The box is empty (x1 <= x0 or y1 <= y0) if the path lies
+        entirely off-canvas.
+        """
+        with torch.no_grad():
+            lo = path_points.min(dim=0).values - margin
+            hi = path_points.max(dim=0).values + margin
+        x0 = max(0, int(np.floor(lo[0].item())))
+        y0 = max(0, int(np.floor(lo[1].item())))
+        x1 = min(self.width, int(np.ceil(hi[0].item())) + 1)
+        y1 = min(self.height, int(np.ceil(hi[1].item())) + 1)
+        return x0, y0, x1, y1
+    
+    def compute_winding_number_bbox(self, path_points: torch.Tensor,
+                                    sigma: float = 1.0,
+                                    bbox: Optional[Tuple[int, int, int, int]] = None,
+                                    margin: Optional[float] = None
+                                    ) -> Tuple[torch.Tensor, Tuple[int, int, int, int]]:
         """
-        n_points = path_points.shape[0]
+        Soft winding number restricted to a bounding box.
         
-        # Process in chunks to avoid memory issues
-        chunk_size = 32
-        winding = torch.zeros(self.height, self.width, device=self.device)
+        Pixels outside the path's padded bounding box only receive the soft
+        tails of the sigmoids, which decay exponentially with distance; this
+        variant treats them as zero and evaluates the window only.
         
-        for i in range(0, n_points, chunk_size):
-            end_i = min(i + chunk_size, n_points)
+        Args:
+            path_points: [M, 2] closed polyline
+            sigma: Anti-aliasing width
+            bbox: Window (x0, y0, x1, y1); defaults to path_bbox(path_points, margin)
+            margin: Padding around the path in pixels (default bbox_margin(sigma))
             
-            for j in range(i, end_i):
-                # Current and next point (wrap around)
-                p0 = path_points[j]
-                p1 = path_points[(j + 1) % n_points]
-                
-                x0, y0 = p0[0], p0[1]
-                x1, y1 = p1[0], p1[1]
-                
-                # Skip horizontal segments
-                dy = y1 - y0
-                if torch.abs(dy) < 1e-6:
-                    continue
-                
-                # For each pixel, check if horizontal ray to the right crosses this segment
-                # t parameter where ray at pixel's y crosses the segment
-                t_cross = (self.grid_y - y0) / (dy + 1e-8)
-                
-                # x coordinate where crossing occurs
-                x_cross = x0 + t_cross * (x1 - x0)
-                
-                # Soft validity check (t in [0, 1])
-                valid_t = torch.sigmoid((t_cross - 0) * 20) * torch.sigmoid((1 - t_cross) * 20)
-                
-                # Soft check if crossing is to the right of pixel
-                crosses_right = torch.sigmoid((x_cross - self.grid_x) / sigma)
-                
-                # Direction of crossing (up or down)
-                direction = torch.sign(dy)
-                
-                # Accumulate winding contribution
-                winding = winding + crosses_right * valid_t * direction
+        Returns:
+            Tuple of ([y1 - y0, x1 - x0] winding number, bbox)
+        """
+        if bbox is None:
+            if margin is None:
+                margin = self.bbox_margin(sigma)
+            bbox = self.path_bbox(path_points, margin)
+        
+        x0, y0, x1, y1 = bbox
+        if x1 <= x0 or y1 <= y0:
+            return torch.zeros(0, 0, device=self.device), bbox
+        
+        winding = self._winding_over_grid(
+            path_points, self.grid_x[:1, x0:x1], self.grid_y[y0:y1, :1], sigma
+        )
+        return winding, bbox
+    
+    def compute_winding_numbers(self, path_points: torch.Tensor,
+                                sigma: float = 1.0,
+                                margin: Optional[float] = None) -> torch.Tensor:
+        """
+        Soft winding numbers of a batch of closed polylines.
+        
+        With a margin, each path is only evaluated inside its bounding box
+        padded by margin pixels (see compute_winding_number_bbox) and is
+        zero elsewhere, so a path costs in proportion to its area rather
+        than to the canvas.
+        
+        Args:
+            path_points: [P, M, 2] closed polylines
+            sigma: Anti-aliasing width
+            margin: Bounding-box padding in pixels (None: whole canvas)
+            
+        Returns:
+            [P, H, W] soft winding numbers
+        """
+        return self._winding_over_grid(
+            path_points, self.grid_x[:1, :], self.grid_y[:, :1], sigma, margin
+        )
+    
+    def render_alphas(self, control_points: torch.Tensor,
+                      sigma: float = 1.0) -> torch.Tensor:
+        """
+        Soft coverage of a batch of filled closed paths.
+        
+        Args:
+            control_points: [P, N, 2] Bézier control points
+            sigma: Anti-aliasing width
+            
+        Returns:
+            [P, H, W] alpha (inside = 1, outside = 0)
+        """
+        path_points = self.sample_bezier_paths(control_points, samples_per_segment=32)
+        winding = self.compute_winding_numbers(path_points, sigma, self.bbox_margin(sigma))
+        return self.winding_to_alpha(winding)
+    
+    @staticmethod
+    def bbox_margin(sigma: float) -> float:
+        """Bounding-box padding beyond which soft-edge tails are negligible."""
+        return 8 * sigma + 2
+    
+    @staticmethod
+    def winding_to_alpha(winding: torch.Tensor) -> torch.Tensor:
+        """
+        Nonzero-rule coverage from a soft winding number.
+        
+        The soft winding is already anti-aliased across edges, so its
+        magnitude clamped to [0, 1] is the coverage: 0 outside, 1 inside,
+        for either path orientation (as the exported SVG fills render).
+        """
+        return winding.abs().clamp(max=1.0)
+    
+    def _winding_over_grid(self, path_points: torch.Tensor, grid_x: torch.Tensor,
+                           grid_y: torch.Tensor, sigma: float,
+                           margin: Optional[float] = None) -> torch.Tensor:
+        """
+        Soft winding number over the pixel grid spanned by grid_x [1, W] and
+        grid_y [H, 1] (consecutive integer pixel coordinates).
+        
+        A segment's soft validity sigmoid(20 t) * sigmoid(20 (1 - t)) is below
+        1e-9 for rows with t outside [-WINDING_T_PAD, 1 + WINDING_T_PAD], so
+        each segment is only evaluated on the rows it can cross. The
+        (segment, row) pairs are broadcast against the row's pixels in
+        chunks of at most max_elements and scatter-added into the output.
+        
+        With a margin, pairs are further restricted to their path's bounding
+        box padded by margin: rows outside it are skipped and, when the boxes
+        are narrow enough for it to pay off, each pair only covers the box's
+        columns (see _winding_over_boxes).
+        
+        path_points is either one polyline [M, 2] (returns [H, W]) or a
+        batch [P, M, 2] (returns [P, H, W]).
+        """
+        batched = path_points.dim() == 3
+        if not batched:
+            path_points = path_points.unsqueeze(0)
+        
+        num_paths = path_points.shape[0]
+        height, width = grid_y.shape[0], grid_x.shape[1]
+        device = path_points.device
+        
+        p0, p1, path_ids = self._polyline_segments(path_points)
+        
+        winding = torch.zeros(num_paths * height, width, device=device)
+        
+        if p0.shape[0] == 0 or height == 0 or width == 0:
+            return self._unflatten_winding(winding, num_paths, height, width, batched)
+        
+        with torch.no_grad():
+            start, counts = self._segment_rows(p0, p1, path_ids, path_points, grid_y, margin)
+            
+            seg_idx = torch.repeat_interleave(torch.arange(p0.shape[0], device=device), counts)
+            offsets = torch.cumsum(counts, 0) - counts
+            row_idx = start[seg_idx] + torch.arange(seg_idx.shape[0], device=device) - offsets[seg_idx]
+            out_idx = path_ids[seg_idx] * height + row_idx
+        
+        if margin is not None:
+            with torch.no_grad():
+                col_start, col_count = self._path_span(path_points[..., 0], margin, grid_x[0, 0], width)
+                pair_cols = col_count[path_ids[seg_idx]]
+            if BOX_ELEMENT_COST * pair_cols.sum().item() < pair_cols.shape[0] * width:
+                winding = self._winding_over_boxes(
+                    path_points, p0, p1, seg_idx, row_idx, out_idx,
+                    col_start[path_ids[seg_idx]], pair_cols, grid_x, grid_y, sigma
+                )
+                return self._unflatten_winding(winding, num_paths, height, width, batched)
+        
+        chunk_size = max(1, self.max_elements // width)
+        
+        for i in range(0, seg_idx.shape[0], chunk_size):
+            seg = seg_idx[i:i + chunk_size]
+            rows = row_idx[i:i + chunk_size]
+            x0, y0 = p0[seg, 0], p0[seg, 1]
+            x1, y1 = p1[seg, 0], p1[seg, 1]
+            dy = y1 - y0
+            
+            # t parameter where the horizontal ray of each row crosses the
+            # segment, and the x coordinate of the crossing
+            t_cross = (grid_y[rows, 0] - y0) / (dy + 1e-8)
+            x_cross = x0 + t_cross * (x1 - x0)
+            
+            # Soft validity check (t in [0, 1]) times crossing direction
+            valid_t = torch.sigmoid((t_cross - 0) * 20) * torch.sigmoid((1 - t_cross) * 20)
+            weight = valid_t * torch.sign(dy)
+            
+            # Soft check if crossing is to the right of pixel: [chunk, W]
+            crosses_right = torch.sigmoid((x_cross.view(-1, 1) - grid_x) / sigma)
+            
+            # Accumulate winding contribution into each pair's (path, row)
+            winding.index_add_(0, out_idx[i:i + chunk_size], crosses_right * weight.view(-1, 1))
+        
+        return self._unflatten_winding(winding, num_paths, height, width, batched)
+    
+    def _winding_over_boxes(self, path_points: torch.Tensor, p0: torch.Tensor, p1: torch.Tensor,
+                            seg_idx: torch.Tensor, row_idx: torch.Tensor, out_idx: torch.Tensor,
+                            pair_start: torch.Tensor, pair_cols: torch.Tensor,
+                            grid_x: torch.Tensor, grid_y: torch.Tensor,
+                            sigma: float) -> torch.Tensor:
+        """
+        Bounding-box-culled part of _winding_over_grid: every (segment, row)
+        pair is evaluated on columns [pair_start, pair_start + pair_cols)
+        only, its path's padded column range.
+        
+        Pairs are ordered by box width, so each chunk evaluates a
+        [pairs, widest box] block with little padding; padded columns are
+        masked out.
+        """
+        num_paths = path_points.shape[0]
+        height, width = grid_y.shape[0], grid_x.shape[1]
+        device = path_points.device
+        winding = torch.zeros(num_paths * height * width, device=device)
+        
+        with torch.no_grad():
+            by_width = torch.argsort(pair_cols, descending=True)
+            seg_idx, row_idx = seg_idx[by_width], row_idx[by_width]
+            out_idx, pair_start = out_idx[by_width], pair_start[by_width]
+            pair_cols = pair_cols[by_width].tolist()
+        
+        num_pairs = seg_idx.shape[0]
+        i = 0
+        while i < num_pairs and pair_cols[i] > 0:
+            # Widest box of the chunk sets the block width (pairs are sorted)
+            block = pair_cols[i]
+            j = min(num_pairs, i + max(1, self.max_elements // block))
+            
+            seg = seg_idx[i:j]
+            x0, y0 = p0[seg, 0], p0[seg, 1]
+            x1, y1 = p1[seg, 0], p1[seg, 1]
+            dy = y1 - y0
+            t_cross = (grid_y[row_idx[i:j], 0] - y0) / (dy + 1e-8)
+            x_cross = x0 + t_cross * (x1 - x0)
+            valid_t = torch.sigmoid((t_cross - 0) * 20) * torch.sigmoid((1 - t_cross) * 20)
+            weight = valid_t * torch.sign(dy)
+            
+            with torch.no_grad():
+                offsets = torch.arange(block, device=device)
+                cols = pair_start[i:j].view(-1, 1) + offsets
+                inside = offsets < torch.tensor(pair_cols[i:j], device=device).view(-1, 1)
+                cols = torch.where(inside, cols, pair_start[i:j].view(-1, 1))
+                flat_idx = out_idx[i:j].view(-1, 1) * width + cols
+                pixel_x = grid_x[0, 0] + cols
+            
+            crosses_right = torch.sigmoid((x_cross.view(-1, 1) - pixel_x) / sigma)
+            contribution = crosses_right * (weight.view(-1, 1) * inside)
+            winding.index_add_(0, flat_idx.view(-1), contribution.view(-1))
+            i = j
+        
+        return winding.view(num_paths * height, width)
+    
+    @staticmethod
+    def _path_span(coords: torch.Tensor, margin: float, origin: torch.Tensor,
+                   size: int) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Padded range [start, start + count) of each path's coordinates [P, M] in grid cells."""
+        lo = coords.min(dim=1).values - margin - origin
+        hi = coords.max(dim=1).values + margin - origin
+        start = torch.floor(lo).clamp(0, size).long()
+        stop = (torch.ceil(hi) + 1).clamp(0, size).long()
+        return start, (stop - start).clamp(min=0)
+    
+    @staticmethod
+    def _polyline_segments(path_points: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        """Segments (p0, p1, path index) of closed polylines [P, M, 2], without horizontal ones."""
+        num_paths, num_points = path_points.shape[:2]
+        p0 = path_points.reshape(-1, 2)
+        p1 = torch.roll(path_points, -1, dims=1).reshape(-1, 2)
+        path_ids = torch.arange(num_paths, device=path_points.device).repeat_interleave(num_points)
+        keep = torch.abs(p1[:, 1] - p0[:, 1]) >= 1e-6
+        return p0[keep], p1[keep], path_ids[keep]
+    
+    def _segment_rows(self, p0: torch.Tensor, p1: torch.Tensor, path_ids: torch.Tensor,
+                      path_points: torch.Tensor, grid_y: torch.Tensor,
+                      margin: Optional[float] = None) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Rows each segment can cross: [start, start + count) in grid rows,
+        within its path's padded bounding box if a margin is given.
+        """
+        height, y_top = grid_y.shape[0], grid_y[0, 0]
+        dy_abs = torch.abs(p1[:, 1] - p0[:, 1])
+        lo = torch.minimum(p0[:, 1], p1[:, 1]) - WINDING_T_PAD * dy_abs - y_top
+        hi = torch.maximum(p0[:, 1], p1[:, 1]) + WINDING_T_PAD * dy_abs - y_top
+        start = torch.ceil(lo).clamp(0, height).long()
+        stop = (torch.floor(hi) + 1).clamp(0, height).long()
+        if margin is not None:
+            row_start, row_count = self._path_span(path_points[..., 1], margin, y_top, height)
+            stop = torch.minimum(stop, (row_start + row_count)[path_ids])
+            start = torch.maximum(start, row_start[path_ids])
+        return start, (stop - start).clamp(min=0)
+    
+    def estimate_graph_bytes(self, control_points: torch.Tensor,
+                             sigma: float = 1.0) -> torch.Tensor:
+        """
+        Approximate autograd memory of rendering and compositing each path
+        with render_alphas.
+        
+        Counts the (segment, row) pairs the winding number evaluates, over
+        the bounding-box columns for paths narrow enough to be culled and
+        full rows otherwise, plus the per-path full-frame tensors.
+        
+        Args:
+            control_points: [P, N, 2] Bézier control points
+            sigma: Anti-aliasing width (sets the bounding-box margin)
+            
+        Returns:
+            [P] estimated bytes kept for backward per path
+        """
+        margin = self.bbox_margin(sigma)
+        with torch.no_grad():
+            path_points = self.sample_bezier_paths(control_points, samples_per_segment=32)
+            p0, p1, path_ids = self._polyline_segments(path_points)
+            _, counts = self._segment_rows(p0, p1, path_ids, path_points, self.grid_y[:, :1], margin)
+            _, col_count = self._path_span(path_points[..., 0], margin, self.grid_x[0, 0], self.width)
+            culled = BOX_ELEMENT_COST * col_count < self.width
+            pair_values = torch.where(culled, GRAPH_VALUES_PER_BOX_PIXEL * col_count.float(),
+                                      torch.full_like(col_count, self.width, dtype=torch.float)
+                                      * GRAPH_VALUES_PER_PAIR_PIXEL)
+            pairs = torch.zeros(control_points.shape[0], device=control_points.device)
+            pairs.index_add_(0, path_ids, counts.float())
+        values = GRAPH_VALUES_PER_PIXEL * self.height * self.width + pairs * pair_values
+        return values * 4
+    
+    @staticmethod
+    def _unflatten_winding(winding: torch.Tensor, num_paths: int, height: int,
+                           width: int, batched: bool) -> torch.Tensor:
+        winding = winding.view(num_paths, height, width)
+        return winding if batched else winding[0]
+    
+    @staticmethod
+    def composite(alphas: torch.Tensor, colors: torch.Tensor,
+                  background: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        """
+        Alpha-composite paths (back to front) over a background.
+        
+        The sequential "over" loop canvas = canvas * (1 - a_i) + c_i * a_i is
+        evaluated in closed form: each path is weighted by a_i times the
+        transmittance of everything in front of it, a reverse cumulative
+        product of (1 - a_j).
+        
+        Args:
+            alphas: [P, H, W] path alphas in back-to-front order
+            colors: [P, 3] path colors
+            background: [H, W, 3] canvas under the paths
+            
+        Returns:
+            Tuple of ([H, W, 3] composited image, [H, W] total transmittance,
+            [P, H, W] visible weight of each path)
+        """
+        # Inclusive transmittance of paths i..P-1: prod_{j >= i} (1 - a_j)
+        transmittance = torch.flip(torch.cumprod(torch.flip(1 - alphas, [0]), dim=0), [0])
         
-        return winding
+        # Exclusive transmittance (paths in front of i only)
+        in_front = torch.cat([transmittance[1:], torch.ones_like(transmittance[:1])], dim=0)
+        
+        weights = alphas * in_front
+        image = background * transmittance[0].unsqueeze(-1) + torch.einsum('phw,pc->hwc', weights, colors)
+        return image, transmittance[0], weights
     
     def render_filled_path(self, control_points: torch.Tensor, 
                            color: torch.Tensor,
@@ -276,6 +643,9 @@ class DifferentiableBezierRenderer(nn.Module):
         """
         Render a filled closed path with soft anti-aliasing.
         
+        Coverage is only evaluated inside the path's padded bounding box
+        (see compute_winding_number_bbox), so small paths are cheap.
+        
         Args:
             control_points: [N, 2] Bézier control points
             color: [3] RGB color (0-1)
@@ -287,21 +657,58 @@ class DifferentiableBezierRenderer(nn.Module):
         # Sample path densely
         path_points = self.sample_bezier_path(control_points, samples_per_segment=32)
         
-        # Compute soft winding number
-        winding = self.compute_winding_number(path_points, sigma)
-        
-        # Convert to alpha (inside = 1, outside = 0)
-        # Use sigmoid for soft threshold
-        alpha = torch.sigmoid(winding * 4)
+        # Soft winding number inside the padded bounding box only
+        winding, (x0, y0, x1, y1) = self.compute_winding_number_bbox(path_points, sigma)
         
-        # Create RGBA output
+        # Create RGBA output, alpha (inside = 1, outside = 0) scattered into the window
         rgba = torch.zeros(self.height, self.width, 4, device=self.device)
         rgba[..., :3] = color.view(1, 1, 3)
-        rgba[..., 3] = alpha
+        if winding.numel() > 0:
+            rgba[y0:y1, x0:x1, 3] = self.winding_to_alpha(winding)
         
         return rgba
 
 
+def fit_bezier_path(polyline: np.ndarray, num_segments: int,
+                    samples_per_segment: int = 16) -> np.ndarray:
+    """
+    Fit a polyline with a chain of cubic Bézier segments.
+    
+    Anchors are placed at equal arc-length steps; the inner control points
+    of each segment are the least-squares fit to the polyline resampled at
+    equal arc-length steps within the segment. Corners and curvature are
+    kept much better than by using the resampled points as control points.
+    
+    Args:
+        polyline: [N, 2] points (closed paths end on their start point)
+        num_segments: Number of Bézier segments
+        samples_per_segment: Polyline samples fitted per segment
+        
+    Returns:
+        [num_segments * 3 + 1, 2] control points
+    """
+    polyline = np.asarray(polyline, dtype=np.float64)
+    cum_dist = np.concatenate([[0], np.cumsum(np.linalg.norm(np.diff(polyline, axis=0), axis=1))])
+    total_dist = cum_dist[-1]
+    if total_dist <= 0:
+        return np.repeat(polyline[:1], num_segments * 3 + 1, axis=0)
+    
+    # Samples [S, m, 2], shared between neighbouring segments at the anchors
+    t = np.linspace(0, 1, samples_per_segment + 1)
+    target = (np.arange(num_segments)[:, np.newaxis] + t) * (total_dist / num_segments)
+    samples = np.stack([np.interp(target, cum_dist, polyline[:, 0]),
+                        np.interp(target, cum_dist, polyline[:, 1])], axis=-1)
+    
+    # Least squares for P1, P2 with P0, P3 fixed (same basis for every segment)
+    basis = np.stack([(1 - t) ** 3, 3 * (1 - t) ** 2 * t, 3 * (1 - t) * t ** 2, t ** 3], axis=1)
+    p0, p3 = samples[:, :1], samples[:, -1:]
+    residual = samples - basis[:, :1] * p0 - basis[:, 3:] * p3
+    inner = np.einsum('km,smd->skd', np.linalg.pinv(basis[:, 1:3]), residual)
+    
+    control = np.concatenate([p0, inner], axis=1).reshape(-1, 2)
+    return np.concatenate([control, samples[-1, -1:]], axis=0)
+
+
 class BayesianVectorRenderer(nn.Module):
     """
     Full Bayesian vectorization system implementing the VectorMagic algorithm.
@@ -321,7 +728,10 @@ class BayesianVectorRenderer(nn.Module):
                  init_paths: Optional[List[Dict]] = None,
                  num_paths: int = 64,
                  num_segments: int = 4,
-                 sigma_aa: float = 1.0):
+                 sigma_aa: float = 1.0,
+                 render_group_size: Optional[int] = None,
+                 min_paths: int = 16,
+                 memory_budget: Optional[int] = None):
         """
         Initialize the Bayesian vector renderer.
         
@@ -332,6 +742,13 @@ class BayesianVectorRenderer(nn.Module):
             num_paths: Number of vector paths to optimize
             num_segments: Number of Bézier segments per path
             sigma_aa: Anti-aliasing sigma
+            render_group_size: Paths rasterized together per group in
+                render_antialiased (None: bounded by the winding memory budget)
+            min_paths: Paths added as random circles when init_paths has
+                fewer entries
+            memory_budget: Bytes the render graph may keep for backward;
+                over budget, path groups are split to fit and checkpointed
+                (None: no limit)
         """
         super().__init__()
         
@@ -340,6 +757,12 @@ class BayesianVectorRenderer(nn.Module):
         self.num_paths = num_paths
         self.num_segments = num_segments
         self.sigma_aa = sigma_aa
+        self.render_group_size = render_group_size
+        self.min_paths = min_paths
+        self.memory_budget = memory_budget
+        
+        # Active-set mode: cached layers of the paths that are not optimized
+        self.static_layers = None
         
         # Convert target to tensor [0, 1]
         target = torch.from_numpy(target_image.copy()).float().to(device) / 255.0
@@ -408,6 +831,36 @@ class BayesianVectorRenderer(nn.Module):
         
         return sigma
     
+    def set_target(self, target_image: np.ndarray):
+        """
+        Switch to a new target image of a different resolution (e.g. the next
+        pyramid level).
+        
+        Control points are rescaled to the new pixel grid (pixel centers
+        aligned, as with area resampling); colors and z-order are kept.
+        
+        Args:
+            target_image: RGB image [H, W, 3] with values 0-255
+        """
+        height, width = target_image.shape[:2]
+        scale = torch.tensor([width / self.width, height / self.height],
+                             dtype=torch.float32, device=self.device)
+        
+        with torch.no_grad():
+            self.points.copy_((self.points + 0.5) * scale - 0.5)
+        
+        self.height, self.width = height, width
+        
+        target = torch.from_numpy(target_image.copy()).float().to(self.device) / 255.0
+        self.target_image = target
+        self.target_lab = self._rgb_to_lab_tensor(target)
+        
+        self.renderer = DifferentiableBezierRenderer(
+            width, height, self.device, max_elements=self.renderer.max_elements
+        )
+        self.sigma_aa = self._estimate_aa_sigma(target_image)
+        self.static_layers = None
+    
     def _initialize_from_regions(self, image: np.ndarray):
         """Initialize paths from automatic region extraction."""
         print("Extracting regions using SLIC superpixels...")
@@ -425,7 +878,7 @@ class BayesianVectorRenderer(nn.Module):
     def _initialize_from_paths(self, init_paths: List[Dict]):
         """Initialize from pre-computed paths."""
         num_init = len(init_paths)
-        self.num_paths = max(num_init, 16)  # Ensure minimum paths
+        self.num_paths = max(num_init, self.min_paths)  # Ensure minimum paths
         
         points_per_path = self.num_segments * 3 + 1
         points = torch.zeros(self.num_paths, points_per_path, 2, device=self.device)
@@ -438,20 +891,8 @@ class BayesianVectorRenderer(nn.Module):
             if len(path_pts) < 2:
                 continue
             
-            # Resample to required number of control points
-            # Use cumulative distance for even sampling
-            diffs = np.diff(path_pts, axis=0)
-            dists = np.sqrt(np.sum(diffs**2, axis=1))
-            cum_dist = np.concatenate([[0], np.cumsum(dists)])
-            total_dist = cum_dist[-1]
-            
-            if total_dist > 0:
-                target_dists = np.linspace(0, total_dist, points_per_path)
-                resampled_x = np.interp(target_dists, cum_dist, path_pts[:, 0])
-                resampled_y = np.interp(target_dists, cum_dist, path_pts[:, 1])
-                resampled = np.stack([resampled_x, resampled_y], axis=1)
-            else:
-                resampled = np.zeros((points_per_path, 2)) + path_pts[0]
+            # Fit the required number of Bézier control points
+            resampled = fit_bezier_path(path_pts, self.num_segments)
             
             points[i] = torch.from_numpy(resampled).float().to(self.device)
             
@@ -506,32 +947,250 @@ class BayesianVectorRenderer(nn.Module):
         self.colors = nn.Parameter(colors)
         self.z_order = nn.Parameter(torch.arange(self.num_paths, dtype=torch.float32, device=self.device))
     
-    def render_antialiased(self, sigma: Optional[float] = None) -> torch.Tensor:
+    def _group_size(self, group_size: Optional[int] = None) -> int:
+        """Paths per render group: explicit, per-renderer, or budget-derived."""
+        if group_size is None:
+            group_size = self.render_group_size
+        if group_size is None:
+            group_size = max(1, self.renderer.max_elements // (self.height * self.width))
+        return group_size
+    
+    def _render_groups(self, idx: torch.Tensor, group_size: int,
+                       sigma: float) -> List[torch.Tensor]:
+        """
+        Split paths (in z-order) into render groups of at most group_size
+        paths and, with a memory budget, of at most memory_budget estimated
+        graph bytes (at least one path each).
+        """
+        if self.memory_budget is None:
+            return [idx[g:g + group_size] for g in range(0, idx.shape[0], group_size)]
+        
+        path_bytes = self.renderer.estimate_graph_bytes(self.points[idx], sigma).tolist()
+        groups = []
+        start, total = 0, 0.0
+        for i, nbytes in enumerate(path_bytes):
+            if i > start and (i - start >= group_size or total + nbytes > self.memory_budget):
+                groups.append(idx[start:i])
+                start, total = i, 0.0
+            total += nbytes
+        groups.append(idx[start:])
+        return groups
+    
+    def _use_checkpoint(self, checkpoint: Optional[bool], idx: torch.Tensor,
+                        sigma: float) -> bool:
+        """Checkpoint groups if asked to, or if the whole graph exceeds the budget."""
+        if not torch.is_grad_enabled():
+            return False
+        if checkpoint is not None:
+            return checkpoint
+        if self.memory_budget is None:
+            return False
+        total = self.renderer.estimate_graph_bytes(self.points[idx], sigma).sum().item()
+        return total > self.memory_budget
+    
+    def _composite_group(self, group: torch.Tensor, sigma: float, canvas: torch.Tensor,
+                         checkpoint: bool = False) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        """
+        Rasterize one path group and composite it over canvas.
+        
+        With checkpoint, the group's intermediates are not kept for
+        backward but recomputed from the inputs during backward.
+        """
+        def render(points, colors, background):
+            alphas = self.renderer.render_alphas(points, sigma)
+            return self.renderer.composite(alphas, torch.sigmoid(colors), background)
+        
+        if checkpoint:
+            return torch.utils.checkpoint.checkpoint(
+                render, self.points[group], self.colors[group], canvas, use_reentrant=False
+            )
+        return render(self.points[group], self.colors[group], canvas)
+    
+    def render_antialiased(self, sigma: Optional[float] = None,
+                           group_size: Optional[int] = None,
+                           return_coverage: bool = False,
+                           checkpoint: Optional[bool] = None):
         """
         Render all paths with anti-aliasing.
         
         This implements: Render(vector V, palette C) → synthetic bitmap Î
+        
+        All path alphas of a group are rasterized as one [G, H, W] tensor and
+        composited in z-order with a cumulative product of (1 - alpha).
+        Groups are composited onto the canvas back to front, so group_size
+        bounds memory without changing the result.
+        
+        With return_coverage=True the per-path coverage maps are returned as
+        well: the weight with which each path shows in the final image
+        (its alpha times the transmittance of everything in front of it).
+        They sum with the background weight to 1 at every pixel, so the
+        residual of each path is a single reduction. Coverage is detached
+        and takes [P, H, W] memory.
+        
+        With checkpointing, each group's rasterization is recomputed during
+        backward instead of kept alive: the graph then holds one canvas per
+        group, and backward peaks at the graph of a single group. Groups are
+        checkpointed when the estimated graph of all paths exceeds
+        memory_budget, or as set by `checkpoint`.
+        
+        Args:
+            sigma: Anti-aliasing width (default: estimated sigma_aa)
+            group_size: Paths per group (default: render_group_size, or as
+                many as fit in the renderer's max_elements budget)
+            return_coverage: Also return the coverage maps
+            checkpoint: Force group checkpointing on or off (default: by
+                memory_budget)
+            
+        Returns:
+            [H, W, 3] image, or ([H, W, 3] image, [P, H, W] coverage) with
+            coverage indexed like self.points
         """
         if sigma is None:
             sigma = self.sigma_aa
         
+        group_size = self._group_size(group_size)
+        
         # Sort paths by z-order (back to front)
         _, order = torch.sort(self.z_order)
         
         # Start with white background
         canvas = torch.ones(self.height, self.width, 3, device=self.device)
         
-        for idx in order:
-            path_points = self.points[idx]
-            path_color = torch.sigmoid(self.colors[idx])
+        use_checkpoint = self._use_checkpoint(checkpoint, order, sigma)
+        groups = []
+        
+        for idx in self._render_groups(order, group_size, sigma):
+            canvas, transmittance, weights = self._composite_group(idx, sigma, canvas, use_checkpoint)
+            if return_coverage:
+                groups.append((idx, weights.detach(), transmittance.detach()))
+        
+        if not return_coverage:
+            return canvas
+        
+        # Paths are also seen through every group composited after theirs
+        coverage = torch.empty(self.points.shape[0], self.height, self.width, device=self.device)
+        in_front = torch.ones(self.height, self.width, device=self.device)
+        for idx, weights, transmittance in reversed(groups):
+            coverage[idx] = weights * in_front
+            in_front = in_front * transmittance
+        
+        return canvas, coverage
+    
+    def select_active_paths(self, error: torch.Tensor, tile_size: int = 32,
+                            threshold: float = 1e-3, margin: float = 3.0) -> torch.Tensor:
+        """
+        Paths whose padded bounding boxes overlap high-error tiles.
+        
+        Args:
+            error: [H, W] per-pixel error (e.g. squared RGB residual)
+            tile_size: Tile edge in pixels
+            threshold: Mean tile error above which a tile is "hot"
+            margin: Bounding-box padding in pixels
             
-            # Render this path
-            rgba = self.renderer.render_filled_path(path_points, path_color, sigma)
+        Returns:
+            [P] boolean mask of active paths
+        """
+        # Mean error per tile (partial tiles at the border are averaged too)
+        tile_error = F.avg_pool2d(
+            error.detach()[None, None], tile_size, stride=tile_size, ceil_mode=True
+        )[0, 0]
+        hot = (tile_error > threshold).float()
+        tiles_y, tiles_x = hot.shape
+        
+        # Summed-area table: hot-tile count of any tile rectangle in O(1)
+        table = F.pad(hot.cumsum(0).cumsum(1), (1, 0, 1, 0))
+        
+        with torch.no_grad():
+            lo = self.points.min(dim=1).values - margin
+            hi = self.points.max(dim=1).values + margin
+        tx0 = (lo[:, 0] // tile_size).long().clamp(0, tiles_x - 1)
+        ty0 = (lo[:, 1] // tile_size).long().clamp(0, tiles_y - 1)
+        tx1 = (hi[:, 0] // tile_size).long().clamp(0, tiles_x - 1) + 1
+        ty1 = (hi[:, 1] // tile_size).long().clamp(0, tiles_y - 1) + 1
+        
+        hot_count = table[ty1, tx1] - table[ty0, tx1] - table[ty1, tx0] + table[ty0, tx0]
+        return hot_count > 0
+    
+    def cache_static_layers(self, active: torch.Tensor, sigma: Optional[float] = None,
+                            group_size: Optional[int] = None):
+        """
+        Render the inactive paths once into cached layers for render_active.
+        
+        Consecutive inactive paths in z-order collapse into one layer
+        (premultiplied color and transmittance), so compositing the layers
+        and the live active paths with the "over" operator gives the same
+        image as rendering every path. The layers stay valid while the
+        inactive paths and sigma are unchanged.
+        
+        Args:
+            active: [P] boolean mask of paths that will be optimized
+            sigma: Anti-aliasing width the layers are rendered with
+            group_size: Paths rasterized together (see render_antialiased)
+        """
+        if sigma is None:
+            sigma = self.sigma_aa
+        group_size = self._group_size(group_size)
+        
+        _, order = torch.sort(self.z_order)
+        active_sorted = active[order].tolist()
+        
+        # Split z-order into runs of equal activity
+        segments = []
+        start = 0
+        for i in range(1, len(active_sorted) + 1):
+            if i == len(active_sorted) or active_sorted[i] != active_sorted[start]:
+                segments.append((active_sorted[start], order[start:i]))
+                start = i
+        
+        layers = []
+        with torch.no_grad():
+            for is_active, idx in segments:
+                if is_active:
+                    layers.append(('active', idx))
+                    continue
+                
+                premultiplied = torch.zeros(self.height, self.width, 3, device=self.device)
+                transmittance = torch.ones(self.height, self.width, device=self.device)
+                for group in self._render_groups(idx, group_size, sigma):
+                    premultiplied, group_transmittance, _ = self._composite_group(
+                        group, sigma, premultiplied
+                    )
+                    transmittance = transmittance * group_transmittance
+                layers.append(('static', (premultiplied, transmittance)))
+        
+        self.static_layers = {'active': active.clone(), 'sigma': sigma, 'layers': layers}
+    
+    def render_active(self, sigma: Optional[float] = None,
+                      group_size: Optional[int] = None,
+                      checkpoint: Optional[bool] = None) -> torch.Tensor:
+        """
+        Render with only the active paths live (see cache_static_layers).
+        
+        Inactive paths come from the cached layers (rendered at the sigma
+        they were cached with); gradients flow to the active paths only.
+        Checkpointing applies to the live groups as in render_antialiased.
+        
+        Returns:
+            [H, W, 3] image
+        """
+        if self.static_layers is None:
+            return self.render_antialiased(sigma, group_size, checkpoint=checkpoint)
+        if sigma is None:
+            sigma = self.sigma_aa
+        group_size = self._group_size(group_size)
+        
+        live = [payload for kind, payload in self.static_layers['layers'] if kind == 'active']
+        use_checkpoint = bool(live) and self._use_checkpoint(checkpoint, torch.cat(live), sigma)
+        
+        canvas = torch.ones(self.height, self.width, 3, device=self.device)
+        for kind, payload in self.static_layers['layers']:
+            if kind == 'static':
+                premultiplied, transmittance = payload
+                canvas = canvas * transmittance.unsqueeze(-1) + premultiplied
+                continue
             
-            # Alpha composite (over operation)
-            alpha = rgba[..., 3:4]
-            rgb = rgba[..., :3]
-            canvas = canvas * (1 - alpha) + rgb * alpha
+            for group in self._render_groups(payload, group_size, sigma):
+                canvas, _, _ = self._composite_group(group, sigma, canvas, use_checkpoint)
         
         return canvas
     
@@ -555,12 +1214,9 @@ class BayesianVectorRenderer(nn.Module):
         
         Penalizes total path length.
         """
-        total_length = torch.tensor(0.0, device=self.device)
-        
-        for i in range(self.num_paths):
-            diffs = self.points[i, 1:] - self.points[i, :-1]
-            lengths = torch.sqrt(torch.sum(diffs ** 2, dim=-1) + 1e-8)
-            total_length = total_length + torch.sum(lengths)
+        diffs = self.points[:, 1:] - self.points[:, :-1]
+        lengths = torch.sqrt(torch.sum(diffs ** 2, dim=-1) + 1e-8)
+        total_length = torch.sum(lengths)
         
         # Normalize
         diag = np.sqrt(self.width ** 2 + self.height ** 2)
@@ -572,25 +1228,20 @@ class BayesianVectorRenderer(nn.Module):
         
         Penalizes sharp angles at control point junctions.
         """
-        total_cost = torch.tensor(0.0, device=self.device)
+        pts = self.points
+        v1 = pts[:, 1:-1] - pts[:, :-2]
+        v2 = pts[:, 2:] - pts[:, 1:-1]
         
-        for i in range(self.num_paths):
-            pts = self.points[i]
-            
-            for j in range(1, len(pts) - 1):
-                v1 = pts[j] - pts[j-1]
-                v2 = pts[j+1] - pts[j]
-                
-                # Normalize
-                v1_n = v1 / (torch.norm(v1) + 1e-8)
-                v2_n = v2 / (torch.norm(v2) + 1e-8)
-                
-                # Dot product = cos(angle)
-                cos_angle = torch.sum(v1_n * v2_n)
-                
-                # Penalty for sharp corners (cos close to -1)
-                corner_cost = (1 - cos_angle) / 2
-                total_cost = total_cost + corner_cost ** 2
+        # Normalize
+        v1_n = v1 / (torch.norm(v1, dim=-1, keepdim=True) + 1e-8)
+        v2_n = v2 / (torch.norm(v2, dim=-1, keepdim=True) + 1e-8)
+        
+        # Dot product = cos(angle)
+        cos_angle = torch.sum(v1_n * v2_n, dim=-1)
+        
+        # Penalty for sharp corners (cos close to -1)
+        corner_cost = (1 - cos_angle) / 2
+        total_cost = torch.sum(corner_cost ** 2)
         
         return total_cost / (self.num_paths * self.num_segments)
     
@@ -598,15 +1249,11 @@ class BayesianVectorRenderer(nn.Module):
         """
         Smoothness penalty for G1 continuity.
         """
-        total = torch.tensor(0.0, device=self.device)
+        pts = self.points
         
-        for i in range(self.num_paths):
-            pts = self.points[i]
-            
-            # Second derivative approximation
-            for j in range(1, len(pts) - 1):
-                d2 = pts[j-1] - 2 * pts[j] + pts[j+1]
-                total = total + torch.sum(d2 ** 2)
+        # Second derivative approximation
+        d2 = pts[:, :-2] - 2 * pts[:, 1:-1] + pts[:, 2:]
+        total = torch.sum(d2 ** 2)
         
         return total / (self.num_paths * self.num_segments)
     
@@ -614,13 +1261,18 @@ class BayesianVectorRenderer(nn.Module):
                            lambda_complexity: float = 0.02,
                            lambda_corner: float = 0.01,
                            lambda_smooth: float = 0.001,
-                           sigma: Optional[float] = None) -> Tuple[torch.Tensor, Dict]:
+                           sigma: Optional[float] = None,
+                           rendered: Optional[torch.Tensor] = None) -> Tuple[torch.Tensor, Dict]:
         """
         Compute total Bayesian posterior energy.
         
         E(V) = reconstruction + λ_c*complexity + λ_corner*corners + λ_s*smooth
+        
+        `rendered` is the render of the current paths if the caller already
+        has it (with gradients); otherwise the paths are rendered here.
         """
-        rendered = self.render_antialiased(sigma)
+        if rendered is None:
+            rendered = self.render_antialiased(sigma)
         
         recon = self.compute_reconstruction_loss(rendered)
         complexity = self.complexity_penalty()
@@ -639,31 +1291,54 @@ class BayesianVectorRenderer(nn.Module):
         
         return total, losses
     
-    def propose_topology_changes(self, threshold: float = 0.1):
+    def path_errors(self, rendered: torch.Tensor, coverage: torch.Tensor) -> torch.Tensor:
+        """
+        Coverage-weighted error of each path.
+        
+        Args:
+            rendered: [H, W, 3] render of the current paths
+            coverage: [P, H, W] coverage maps from render_antialiased
+            
+        Returns:
+            [P] mean squared RGB error over the pixels each path shows in,
+            weighted by coverage. Paths covering less than one pixel in
+            total contribute nothing to the image and score +inf.
+        """
+        error = torch.sum((rendered.detach() - self.target_image) ** 2, dim=-1)
+        visible = coverage.sum(dim=(1, 2))
+        scores = torch.einsum('phw,hw->p', coverage, error) / visible.clamp(min=1e-8)
+        scores[visible < 1.0] = float('inf')
+        return scores
+    
+    def propose_topology_changes(self, threshold: float = 0.1,
+                                 rendered: Optional[torch.Tensor] = None,
+                                 coverage: Optional[torch.Tensor] = None):
         """
         Propose topology changes (Phase C of the algorithm).
         
         Reinitialize poorly performing paths to high-error regions.
+        
+        Paths are ranked by their coverage-weighted error (see path_errors).
+        `rendered` and `coverage` come from render_antialiased(
+        return_coverage=True), typically the forward pass of the last
+        optimization step; without them the paths are rendered once here.
         """
         with torch.no_grad():
-            rendered = self.render_antialiased()
+            if rendered is None or coverage is None:
+                rendered, coverage = self.render_antialiased(return_coverage=True)
+            rendered = rendered.detach()
             
             # Find high-error regions
             error = torch.sum((rendered - self.target_image) ** 2, dim=-1)
             
             # Evaluate each path's contribution
-            path_errors = []
-            for i in range(self.num_paths):
-                pts = self.points[i]
-                center = pts.mean(dim=0)
-                x, y = int(center[0].clamp(0, self.width-1)), int(center[1].clamp(0, self.height-1))
-                path_errors.append((i, error[y, x].item()))
+            scores = self.path_errors(rendered, coverage)
             
             # Reinitialize worst paths
-            path_errors.sort(key=lambda x: x[1], reverse=True)
             num_reinit = max(1, self.num_paths // 10)
+            worst = torch.argsort(scores, descending=True, stable=True)[:num_reinit]
             
-            for idx, _ in path_errors[:num_reinit]:
+            for idx in worst.tolist():
                 # Sample from high-error region
                 flat_error = error.view(-1)
                 probs = F.softmax(flat_error * 10, dim=0)
@@ -679,8 +1354,9 @@ class BayesianVectorRenderer(nn.Module):
                 new_pts[:, 0] = x + radius * torch.cos(torch.from_numpy(angles).float().to(self.device))
                 new_pts[:, 1] = y + radius * torch.sin(torch.from_numpy(angles).float().to(self.device))
                 
-                new_pts[:, 0].clamp_(0, self.width - 1)
-                new_pts[:, 1].clamp_(0, self.height - 1)
+                # Image bounds: the outer edges of the border pixels
+                new_pts[:, 0].clamp_(-0.5, self.width - 0.5)
+                new_pts[:, 1].clamp_(-0.5, self.height - 0.5)
                 
                 self.points.data[idx] = new_pts
                 
@@ -699,7 +1375,8 @@ class BayesianVectorRenderer(nn.Module):
         ]
         
         for idx in order:
-            pts = self.points[idx].detach().cpu().numpy()
+            # Pixel centers sit at integer coordinates here, at +0.5 in SVG
+            pts = self.points[idx].detach().cpu().numpy() + 0.5
             color = torch.sigmoid(self.colors[idx]).detach().cpu().numpy()
             r, g, b = int(color[0]*255), int(color[1]*255), int(color[2]*255)
             
@@ -721,6 +1398,161 @@ class BayesianVectorRenderer(nn.Module):
             f.write('\n'.join(svg))
 
 
+class EarlyStopping:
+    """
+    Patience-based plateau detection for the optimization loop.
+    
+    An iteration counts as an improvement if the loss drops by more than
+    min_loss_delta (relative) or the PSNR rises by more than min_psnr_delta
+    dB over their best values so far. stop() turns True after `patience`
+    iterations without improvement.
+    """
+    
+    def __init__(self, patience: int, min_loss_delta: float = 1e-3,
+                 min_psnr_delta: float = 0.01):
+        self.patience = patience
+        self.min_loss_delta = min_loss_delta
+        self.min_psnr_delta = min_psnr_delta
+        self.reset()
+    
+    def reset(self):
+        self.best_loss = float('inf')
+        self.best_psnr = float('-inf')
+        self.stale = 0
+    
+    def update(self, loss: float, psnr: float) -> bool:
+        """Record one iteration; returns True if optimization should stop."""
+        improved = False
+        if loss < self.best_loss * (1 - self.min_loss_delta):
+            self.best_loss = loss
+            improved = True
+        if psnr > self.best_psnr + self.min_psnr_delta:
+            self.best_psnr = psnr
+            improved = True
+        
+        self.stale = 0 if improved else self.stale + 1
+        return self.stale >= self.patience
+    
+    def state_dict(self) -> Dict:
+        return {'best_loss': self.best_loss, 'best_psnr': self.best_psnr, 'stale': self.stale}
+    
+    def load_state_dict(self, state: Dict):
+        self.best_loss = state['best_loss']
+        self.best_psnr = state['best_psnr']
+        self.stale = state['stale']
+
+
+def save_checkpoint(path: str, renderer: BayesianVectorRenderer,
+                    optimizer: torch.optim.Optimizer, progress: Dict,
+                    signature: Optional[Dict] = None):
+    """
+    Save renderer parameters, optimizer state and loop progress.
+    
+    The file is written next to `path` and renamed into place, so an
+    interrupted save never leaves a truncated checkpoint behind.
+    `signature` (see _run_signature) identifies the run the checkpoint
+    belongs to.
+    """
+    state = {
+        'signature': signature,
+        'points': renderer.points.detach().cpu(),
+        'colors': renderer.colors.detach().cpu(),
+        'z_order': renderer.z_order.detach().cpu(),
+        'size': (renderer.width, renderer.height),
+        'optimizer': optimizer.state_dict(),
+        'progress': progress,
+        'torch_rng': torch.get_rng_state(),
+        'numpy_rng': np.random.get_state(),
+    }
+    tmp_path = f"{path}.tmp"
+    torch.save(state, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path: str) -> Dict:
+    """Load a checkpoint written by save_checkpoint."""
+    return torch.load(path, map_location='cpu', weights_only=False)
+
+
+def _restore_checkpoint(renderer: BayesianVectorRenderer, state: Dict):
+    """Restore renderer parameters and RNG state from a checkpoint."""
+    if tuple(state['size']) != (renderer.width, renderer.height):
+        raise ValueError(
+            f"Checkpoint is for a {state['size'][0]}x{state['size'][1]} target, "
+            f"got {renderer.width}x{renderer.height}"
+        )
+    renderer.points = nn.Parameter(state['points'].to(renderer.device))
+    renderer.colors = nn.Parameter(state['colors'].to(renderer.device))
+    renderer.z_order = nn.Parameter(state['z_order'].to(renderer.device))
+    renderer.num_paths = renderer.points.shape[0]
+    torch.set_rng_state(state['torch_rng'])
+    np.random.set_state(state['numpy_rng'])
+
+
+def _run_signature(image: np.ndarray, level_iterations: List[int], num_segments: int) -> Dict:
+    """Input image digest and schedule; a checkpoint only resumes a run with the same."""
+    image = np.ascontiguousarray(image)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{image.shape}{image.dtype}".encode('utf-8'))
+    digest.update(image.tobytes())
+    return {
+        'image': digest.hexdigest(),
+        'pyramid_levels': len(level_iterations),
+        'level_iterations': [int(n) for n in level_iterations],
+        'num_segments': num_segments,
+    }
+
+
+def _progress_state(level: int, iteration: int, done: int, best_psnr: float,
+                    stopper: Optional[EarlyStopping]) -> Dict:
+    """Loop position stored in checkpoints (iteration = next iteration to run)."""
+    return {
+        'level': level,
+        'iteration': iteration,
+        'done': done,
+        'best_psnr': best_psnr,
+        'early_stopping': stopper.state_dict() if stopper is not None else None,
+    }
+
+
+def build_pyramid(image: np.ndarray, num_levels: int) -> List[Tuple[float, np.ndarray]]:
+    """
+    Image pyramid from coarse to fine.
+    
+    Each level halves the resolution of the next; the last level is the
+    input image itself.
+    
+    Args:
+        image: RGB image [H, W, 3]
+        num_levels: Number of levels (1 = native resolution only)
+        
+    Returns:
+        List of (scale, image) tuples, coarsest first
+    """
+    h, w = image.shape[:2]
+    levels = []
+    for level in range(num_levels - 1, 0, -1):
+        scale = 0.5 ** level
+        size = (max(1, int(round(w * scale))), max(1, int(round(h * scale))))
+        levels.append((scale, cv2.resize(image, size, interpolation=cv2.INTER_AREA)))
+    levels.append((1.0, image))
+    return levels
+
+
+def split_iterations(num_iterations: int, num_levels: int) -> List[int]:
+    """
+    Default per-level iteration counts for a pyramid schedule.
+    
+    Each level gets half the iterations of the next coarser one, so most of
+    the work happens at low resolution and only the final share at native
+    resolution (e.g. 500 over 3 levels -> [287, 142, 71]).
+    """
+    weights = [2 ** (num_levels - 1 - level) for level in range(num_levels)]
+    counts = [num_iterations * weight // sum(weights) for weight in weights]
+    counts[0] += num_iterations - sum(counts)
+    return counts
+
+
 def optimize_vectorization(image: np.ndarray,
                           device: str = 'cpu',
                           num_paths: int = 128,
@@ -729,7 +1561,23 @@ def optimize_vectorization(image: np.ndarray,
                           learning_rate: float = 1.0,
                           topology_interval: int = 50,
                           target_psnr: float = 38.0,
-                          verbose: bool = True) -> BayesianVectorRenderer:
+                          verbose: bool = True,
+                          pyramid_levels: int = 1,
+                          level_iterations: Optional[List[int]] = None,
+                          level_sigmas: Optional[List[Tuple[float, float]]] = None,
+                          patience: Optional[int] = None,
+                          min_loss_delta: float = 1e-3,
+                          min_psnr_delta: float = 0.01,
+                          checkpoint_path: Optional[str] = None,
+                          checkpoint_interval: int = 50,
+                          resume: bool = True,
+                          active_set: bool = False,
+                          active_tile_size: int = 32,
+                          active_threshold: float = 1e-3,
+                          active_refresh: int = 10,
+                          init_paths: Optional[List[Dict]] = None,
+                          start_sigma: float = 5.0,
+                          memory_budget: Optional[int] = None) -> BayesianVectorRenderer:
     """
     Full Bayesian vectorization optimization.
     
@@ -738,89 +1586,599 @@ def optimize_vectorization(image: np.ndarray,
     - Phase B: Geometry Optimization (continuous)
     - Phase C: Topology Proposal
     
+    With pyramid_levels > 1 the optimization runs coarse-to-fine: paths are
+    first fitted to a downsampled target (each level halves the resolution),
+    then rescaled to the next level, and only the final iterations run at
+    native resolution. Most of the geometry settles at coarse scale, where
+    an iteration is cheaper by the pixel-count ratio.
+    
+    Each iteration renders once: PSNR and topology proposals reuse the
+    forward render of the loss. With `patience`, a level ends once neither
+    loss nor PSNR has improved for that many iterations (at native
+    resolution this ends the optimization). With `checkpoint_path`, the
+    parameters, optimizer state and progress are saved every
+    checkpoint_interval iterations and an interrupted run resumes from there.
+    
+    With `active_set`, only paths whose bounding boxes overlap high-error
+    tiles are rendered live and updated; the other paths are cached as
+    static layers (see BayesianVectorRenderer.cache_static_layers). The
+    active set and the cache are refreshed every active_refresh iterations
+    and after topology changes. Cached layers keep the sigma they were
+    rendered with until the next refresh.
+    
+    With `init_paths` (e.g. from svg_to_init_paths), the optimization starts
+    from those paths, in native pixel coordinates and back-to-front order,
+    instead of SLIC regions; no random paths are added.
+    
     Args:
         image: Input RGB image [H, W, 3] with values 0-255
         device: Computation device
         num_paths: Number of vector paths
         num_segments: Bézier segments per path
-        num_iterations: Optimization iterations
+        num_iterations: Optimization iterations (total over all levels)
         learning_rate: Adam learning rate
         topology_interval: How often to propose topology changes
-        target_psnr: Target PSNR (algorithm terminates if reached)
+        target_psnr: Target PSNR (algorithm terminates if reached at native resolution)
         verbose: Print progress
+        pyramid_levels: Number of resolution levels (1 = native only)
+        level_iterations: Iterations per level, coarsest first
+            (default: split_iterations(num_iterations, pyramid_levels))
+        level_sigmas: (start, end) anti-aliasing sigma per level in that
+            level's pixels (default: one global anneal from 5.0 to the
+            estimated sigma in native pixels, scaled to each level)
+        patience: Plateau patience in iterations (None disables early stopping)
+        min_loss_delta: Relative loss decrease that counts as improvement
+        min_psnr_delta: PSNR increase (dB) that counts as improvement
+        checkpoint_path: File to save checkpoints to (None disables them)
+        checkpoint_interval: Iterations between checkpoints
+        resume: Resume from checkpoint_path if it exists and was saved for
+            the same image, pyramid schedule and num_segments
+        active_set: Only optimize paths overlapping high-error tiles
+        active_tile_size: Tile edge in pixels for the active-set error map
+        active_threshold: Mean squared RGB error above which a tile is active
+        active_refresh: Iterations between active-set refreshes
+        init_paths: Initial paths as dicts with 'points' ([N, 2] polyline in
+            native pixels) and 'color' (RGB 0-255), back to front
+        start_sigma: Anti-aliasing sigma at the start of the anneal, in
+            native pixels (ignored with level_sigmas)
+        memory_budget: Bytes the render graph may keep for backward (see
+            BayesianVectorRenderer.render_antialiased; None: no limit)
         
     Returns:
         Optimized BayesianVectorRenderer
     """
+    levels = build_pyramid(image, pyramid_levels)
+    if level_iterations is None:
+        level_iterations = split_iterations(num_iterations, len(levels))
+    if len(level_iterations) != len(levels):
+        raise ValueError(f"level_iterations needs {len(levels)} entries, got {len(level_iterations)}")
+    if level_sigmas is not None and len(level_sigmas) != len(levels):
+        raise ValueError(f"level_sigmas needs {len(levels)} entries, got {len(level_sigmas)}")
+    
+    signature = _run_signature(image, level_iterations, num_segments)
+    checkpoint = None
+    if checkpoint_path is not None and resume and os.path.exists(checkpoint_path):
+        checkpoint = load_checkpoint(checkpoint_path)
+        if checkpoint.get('signature') != signature:
+            # Another image or schedule: start fresh (the file gets overwritten)
+            if verbose:
+                print(f"Ignoring {checkpoint_path}: saved for a different image or schedule")
+            checkpoint = None
+        elif verbose:
+            saved = checkpoint['progress']
+            print(f"Resuming from {checkpoint_path} "
+                  f"(level {saved['level'] + 1}, iteration {saved['iteration']})")
+    
+    if init_paths:
+        # Native pixels -> first pyramid level (pixel centers aligned)
+        scale = levels[0][0]
+        init_paths = [
+            dict(path, points=(np.asarray(path['points'], dtype=np.float64) + 0.5) * scale - 0.5)
+            for path in init_paths
+        ]
+    
     renderer = BayesianVectorRenderer(
-        image,
+        levels[0][1],
         device=device,
+        init_paths=init_paths,
         num_paths=num_paths,
-        num_segments=num_segments
+        num_segments=num_segments,
+        min_paths=1 if init_paths else 16,
+        memory_budget=memory_budget
     )
     
-    optimizer = torch.optim.Adam(renderer.parameters(), lr=learning_rate)
+    # Sigma annealing (start blurry, sharpen over time), in native pixels
+    end_sigma = renderer._estimate_aa_sigma(image)
     
-    # Sigma annealing (start blurry, sharpen over time)
-    start_sigma = 5.0
-    end_sigma = renderer.sigma_aa
+    stopper = EarlyStopping(patience, min_loss_delta, min_psnr_delta) if patience else None
     
+    total_iterations = sum(level_iterations)
+    done = 0
     best_psnr = 0.0
+    start_level = checkpoint['progress']['level'] if checkpoint is not None else 0
     
-    for i in range(num_iterations):
-        progress = i / num_iterations
-        
-        # Anneal sigma
-        sigma = start_sigma + (end_sigma - start_sigma) * progress
+    for level, ((scale, level_image), iterations) in enumerate(zip(levels, level_iterations)):
+        if level < start_level:
+            continue
+        
+        is_native = level == len(levels) - 1
+        
+        if level > 0:
+            renderer.set_target(level_image)
+        
+        if verbose and len(levels) > 1:
+            print(f"Pyramid level {level + 1}/{len(levels)}: "
+                  f"{renderer.width}x{renderer.height}, {iterations} iterations")
+        
+        if checkpoint is not None:
+            _restore_checkpoint(renderer, checkpoint)
+        
+        optimizer = torch.optim.Adam(renderer.parameters(), lr=learning_rate)
+        if stopper is not None:
+            stopper.reset()
+        
+        start_iteration = 0
+        if checkpoint is not None:
+            saved = checkpoint['progress']
+            optimizer.load_state_dict(checkpoint['optimizer'])
+            start_iteration = saved['iteration']
+            done = saved['done']
+            best_psnr = saved['best_psnr']
+            if stopper is not None and saved['early_stopping'] is not None:
+                stopper.load_state_dict(saved['early_stopping'])
+            checkpoint = None
+        
+        stop_run = False
+        active = None
+        renderer.static_layers = None
+        since_refresh = 0
+        
+        for i in range(start_iteration, iterations):
+            progress = done / total_iterations
+            done += 1
+            
+            # Anneal sigma
+            if level_sigmas is not None:
+                level_start, level_end = level_sigmas[level]
+                sigma = level_start + (level_end - level_start) * (i / iterations)
+            else:
+                sigma = start_sigma + (end_sigma - start_sigma) * progress
+                if not is_native:
+                    sigma = max(sigma * scale, 0.5)
+            
+            # Anneal regularization (relax over time)
+            lambda_complexity = 0.02 * (1 - progress * 0.5)
+            lambda_corner = 0.01 * (1 - progress * 0.5)
+            
+            optimizer.zero_grad()
+            
+            # Coverage maps are only needed for topology proposals, which
+            # look at all paths
+            propose = (i + 1) % topology_interval == 0
+            use_active = active_set and not propose
+            
+            # Active set: pick the paths near high-error tiles, cache the rest
+            if use_active and (active is None or since_refresh >= active_refresh):
+                with torch.no_grad():
+                    full = renderer.render_antialiased(sigma)
+                    error = torch.sum((full - renderer.target_image) ** 2, dim=-1)
+                active = renderer.select_active_paths(
+                    error, active_tile_size, active_threshold, margin=3 * sigma
+                )
+                renderer.cache_static_layers(active, sigma)
+                since_refresh = 0
+            since_refresh += 1
+            
+            coverage = None
+            if propose:
+                rendered, coverage = renderer.render_antialiased(sigma, return_coverage=True)
+            elif use_active:
+                rendered = renderer.render_active(sigma)
+            else:
+                rendered = renderer.render_antialiased(sigma)
+            
+            loss, losses = renderer.compute_total_loss(
+                lambda_complexity=lambda_complexity,
+                lambda_corner=lambda_corner,
+                sigma=sigma,
+                rendered=rendered
+            )
+            
+            loss.backward()
+            
+            # Inactive paths stay frozen (their layers are cached)
+            frozen = None
+            if use_active:
+                frozen = ~active
+                renderer.points.grad[frozen] = 0
+                renderer.colors.grad[frozen] = 0
+                frozen_state = (renderer.points.data[frozen].clone(),
+                                renderer.colors.data[frozen].clone())
+            
+            # Gradient clipping
+            torch.nn.utils.clip_grad_norm_(renderer.parameters(), 1.0)
+            
+            optimizer.step()
+            
+            if frozen is not None:
+                # Adam momentum would otherwise keep moving them
+                renderer.points.data[frozen] = frozen_state[0]
+                renderer.colors.data[frozen] = frozen_state[1]
+            
+            # Clamp points to image bounds (the outer edges of the border pixels)
+            with torch.no_grad():
+                renderer.points.data[..., 0].clamp_(-0.5, renderer.width - 0.5)
+                renderer.points.data[..., 1].clamp_(-0.5, renderer.height - 0.5)
+            
+            # PSNR of the forward render (no extra render pass)
+            with torch.no_grad():
+                rendered = rendered.detach()
+                mse = F.mse_loss(rendered, renderer.target_image).item()
+                psnr = 10 * np.log10(1.0 / (mse + 1e-10))
+                
+                if is_native and psnr > best_psnr:
+                    best_psnr = psnr
+            
+            # Topology changes (Phase C)
+            if propose:
+                renderer.propose_topology_changes(rendered=rendered, coverage=coverage)
+                active = None
+            
+            if verbose and (i + 1) % 25 == 0:
+                print(f"Iter {i+1}/{iterations}: Loss={losses['total']:.4f}, "
+                      f"Recon={losses['reconstruction']:.4f}, PSNR={psnr:.2f}dB, sigma={sigma:.2f}")
+            
+            # Early termination if target reached
+            reached = is_native and psnr >= target_psnr
+            if reached and verbose:
+                print(f"Target PSNR {target_psnr}dB reached at iteration {i+1}")
+            
+            # Plateau: end this level (or the optimization at native resolution)
+            plateau = stopper is not None and stopper.update(losses['total'], psnr)
+            if plateau and not reached and verbose:
+                print(f"No improvement for {patience} iterations, stopping "
+                      f"{'optimization' if is_native else 'level'} at iteration {i+1}")
+            
+            if reached or plateau:
+                stop_run = reached or is_native
+                if checkpoint_path is not None:
+                    save_checkpoint(checkpoint_path, renderer, optimizer,
+                                    _progress_state(level, iterations, done, best_psnr, stopper), signature)
+                break
+            
+            if checkpoint_path is not None and (done % checkpoint_interval == 0 or i + 1 == iterations):
+                save_checkpoint(checkpoint_path, renderer, optimizer,
+                                _progress_state(level, i + 1, done, best_psnr, stopper), signature)
         
-        # Anneal regularization (relax over time)
-        lambda_complexity = 0.02 * (1 - progress * 0.5)
-        lambda_corner = 0.01 * (1 - progress * 0.5)
+        if stop_run:
+            break
+    
+    if verbose:
+        print(f"Best PSNR: {best_psnr:.2f}dB")
+    
+    return renderer
+
+
+# Path data tokens: a command letter or a number (with optional exponent)
+_PATH_TOKEN = re.compile(r'[MmLlHhVvCcSsQqTtAaZz]|[-+]?(?:\d*\.\d+|\d+\.?)(?:[eE][-+]?\d+)?')
+
+# Arguments consumed per repetition of each path command
+_PATH_ARITY = {'M': 2, 'L': 2, 'H': 1, 'V': 1, 'C': 6, 'S': 4, 'Q': 4, 'T': 2, 'A': 7, 'Z': 0}
+
+
+def _bezier_polyline(control: np.ndarray, samples: int) -> np.ndarray:
+    """Points of a quadratic or cubic Bézier at t = 1/samples .. 1."""
+    t = np.linspace(0, 1, samples + 1)[1:, np.newaxis]
+    if len(control) == 3:
+        p0, p1, p2 = control
+        return (1 - t) ** 2 * p0 + 2 * (1 - t) * t * p1 + t ** 2 * p2
+    p0, p1, p2, p3 = control
+    return ((1 - t) ** 3 * p0 + 3 * (1 - t) ** 2 * t * p1
+            + 3 * (1 - t) * t ** 2 * p2 + t ** 3 * p3)
+
+
+def flatten_path_data(d: str, samples_per_curve: int = 16) -> List[np.ndarray]:
+    """
+    Flatten an SVG path `d` attribute into one polyline per subpath.
+    
+    Supports all path commands in absolute and relative form; elliptical
+    arcs are approximated by a straight line to their end point.
+    
+    Args:
+        d: Path data string
+        samples_per_curve: Points per Bézier segment
         
-        optimizer.zero_grad()
+    Returns:
+        List of [N, 2] polylines (closed subpaths end on their start point)
+    """
+    tokens = _PATH_TOKEN.findall(d)
+    subpaths = []
+    current = []
+    pos = np.zeros(2)
+    start = np.zeros(2)
+    # Last control point and its curve kind ('C' or 'Q'), for S/T reflection
+    last_control, last_kind = None, None
+    cmd = None
+    i = 0
+    
+    while i < len(tokens):
+        if tokens[i].isalpha():
+            cmd = tokens[i]
+            i += 1
+        elif cmd is None:
+            raise ValueError(f"Path data does not start with a command: {d[:40]!r}")
+        
+        upper = cmd.upper()
+        relative = cmd.islower()
+        if upper == 'Z':
+            if current:
+                current.append(start.copy())
+                subpaths.append(np.array(current))
+                current = []
+            pos = start.copy()
+            last_kind = None
+            # Z takes no arguments; stray numbers end the path data
+            if i < len(tokens) and not tokens[i].isalpha():
+                break
+            continue
+        
+        arity = _PATH_ARITY[upper]
+        arg_tokens = tokens[i:i + arity]
+        if len(arg_tokens) < arity or any(x.isalpha() for x in arg_tokens):
+            break
+        args = [float(x) for x in arg_tokens]
+        i += arity
         
-        loss, losses = renderer.compute_total_loss(
-            lambda_complexity=lambda_complexity,
-            lambda_corner=lambda_corner,
-            sigma=sigma
+        if upper == 'H':
+            end = np.array([pos[0] * relative + args[0], pos[1]])
+        elif upper == 'V':
+            end = np.array([pos[0], pos[1] * relative + args[0]])
+        else:
+            end = np.array(args[-2:]) + pos * relative
+        
+        if upper == 'M':
+            if len(current) > 1:
+                subpaths.append(np.array(current))
+            current = [end]
+            start = end
+            # Further coordinate pairs are implicit line-tos
+            cmd = 'l' if relative else 'L'
+            last_kind = None
+        elif upper in 'CSQT':
+            kind = 'C' if upper in 'CS' else 'Q'
+            controls = [np.array(args[j:j + 2]) + pos * relative
+                        for j in range(0, arity - 2, 2)]
+            if upper in 'ST':
+                reflected = 2 * pos - last_control if last_kind == kind else pos
+                controls.insert(0, reflected)
+            if not current:
+                current = [pos.copy()]
+            current.extend(_bezier_polyline(np.array([pos] + controls + [end]), samples_per_curve))
+            last_control, last_kind = controls[-1], kind
+        else:
+            if not current:
+                current = [pos.copy()]
+            current.append(end)
+            last_kind = None
+        pos = end
+    
+    if len(current) > 1:
+        subpaths.append(np.array(current))
+    return subpaths
+
+
+def _parse_svg_color(value: Optional[str]) -> Optional[Tuple[int, int, int]]:
+    """RGB tuple of an SVG paint (#rgb, #rrggbb, rgb()); None for 'none'."""
+    if value is None:
+        return (0, 0, 0)
+    value = value.strip().lower()
+    if value in ('none', 'transparent'):
+        return None
+    if value.startswith('#'):
+        hex_digits = value[1:]
+        if len(hex_digits) == 3:
+            hex_digits = ''.join(c * 2 for c in hex_digits)
+        return tuple(int(hex_digits[j:j + 2], 16) for j in (0, 2, 4))
+    if value.startswith('rgb'):
+        channels = re.findall(r'[-+]?[\d.]+%?', value)[:3]
+        return tuple(
+            int(round(float(c[:-1]) * 2.55)) if c.endswith('%') else int(round(float(c)))
+            for c in channels
         )
+    named = {'white': (255, 255, 255), 'black': (0, 0, 0), 'red': (255, 0, 0),
+             'green': (0, 128, 0), 'blue': (0, 0, 255)}
+    return named.get(value, (0, 0, 0))
+
+
+def _parse_svg_transform(value: Optional[str]) -> np.ndarray:
+    """3x3 affine matrix of an SVG transform attribute."""
+    matrix = np.eye(3)
+    if not value:
+        return matrix
+    for name, arg_str in re.findall(r'(\w+)\s*\(([^)]*)\)', value):
+        args = [float(x) for x in _PATH_TOKEN.findall(arg_str) if not x.isalpha()]
+        step = np.eye(3)
+        if name == 'matrix' and len(args) == 6:
+            step[:2] = np.array(args).reshape(3, 2).T
+        elif name == 'translate' and args:
+            step[:2, 2] = [args[0], args[1] if len(args) > 1 else 0.0]
+        elif name == 'scale' and args:
+            step[0, 0] = args[0]
+            step[1, 1] = args[1] if len(args) > 1 else args[0]
+        elif name == 'rotate' and args:
+            angle = np.radians(args[0])
+            cx, cy = args[1:3] if len(args) == 3 else (0.0, 0.0)
+            rotation = np.array([[np.cos(angle), -np.sin(angle), 0],
+                                 [np.sin(angle), np.cos(angle), 0],
+                                 [0, 0, 1]])
+            to_center = np.array([[1, 0, cx], [0, 1, cy], [0, 0, 1]])
+            from_center = np.array([[1, 0, -cx], [0, 1, -cy], [0, 0, 1]])
+            step = to_center @ rotation @ from_center
+        matrix = matrix @ step
+    return matrix
+
+
+def _svg_shape_polylines(tag: str, element: ET.Element) -> List[np.ndarray]:
+    """Polylines of a path, rect, circle, ellipse or polygon element."""
+    def attr(name, default=0.0):
+        return float(element.get(name, default))
+    
+    if tag == 'path':
+        return flatten_path_data(element.get('d', ''))
+    if tag == 'rect':
+        x, y, w, h = attr('x'), attr('y'), attr('width'), attr('height')
+        return [np.array([[x, y], [x + w, y], [x + w, y + h], [x, y + h], [x, y]])]
+    if tag in ('circle', 'ellipse'):
+        rx = attr('r') if tag == 'circle' else attr('rx')
+        ry = attr('r') if tag == 'circle' else attr('ry')
+        angles = np.linspace(0, 2 * np.pi, 65)
+        return [np.stack([attr('cx') + rx * np.cos(angles),
+                          attr('cy') + ry * np.sin(angles)], axis=1)]
+    if tag == 'polygon':
+        coords = [float(x) for x in _PATH_TOKEN.findall(element.get('points', ''))]
+        pts = np.array(coords[:len(coords) // 2 * 2]).reshape(-1, 2)
+        return [np.vstack([pts, pts[:1]])] if len(pts) > 1 else []
+    return []
+
+
+def _polyline_area(points: np.ndarray) -> float:
+    """Absolute shoelace area of a closed polyline."""
+    x, y = points[:, 0], points[:, 1]
+    return 0.5 * abs(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))
+
+
+def svg_to_init_paths(svg_content: str,
+                      width: Optional[int] = None,
+                      height: Optional[int] = None,
+                      max_paths: Optional[int] = None) -> List[Dict]:
+    """
+    Convert filled shapes of an SVG (e.g. vtracer output) into init_paths
+    for BayesianVectorRenderer.
+    
+    Each filled shape becomes one path: its outer (largest) subpath as a
+    closed polyline with its fill color. Holes are dropped, since a renderer
+    path is a single contour; with vtracer's stacked output they are covered
+    by the shapes drawn above. Document order (the z-order) is kept.
+    
+    Args:
+        svg_content: SVG document
+        width: Target width in pixels (None: one pixel per user unit)
+        height: Target height in pixels (None: one pixel per user unit)
+        max_paths: Keep only the largest shapes by area (in document order)
         
-        loss.backward()
-        
-        # Gradient clipping
-        torch.nn.utils.clip_grad_norm_(renderer.parameters(), 1.0)
-        
-        optimizer.step()
-        
-        # Clamp points to image bounds
-        with torch.no_grad():
-            renderer.points.data[..., 0].clamp_(0, renderer.width - 1)
-            renderer.points.data[..., 1].clamp_(0, renderer.height - 1)
-        
-        # Compute PSNR
-        with torch.no_grad():
-            rendered = renderer.render_antialiased()
-            mse = F.mse_loss(rendered, renderer.target_image).item()
-            psnr = 10 * np.log10(1.0 / (mse + 1e-10))
-            
-            if psnr > best_psnr:
-                best_psnr = psnr
-        
-        # Topology changes (Phase C)
-        if (i + 1) % topology_interval == 0:
-            renderer.propose_topology_changes()
-        
-        if verbose and (i + 1) % 25 == 0:
-            print(f"Iter {i+1}/{num_iterations}: Loss={losses['total']:.4f}, "
-                  f"Recon={losses['reconstruction']:.4f}, PSNR={psnr:.2f}dB, sigma={sigma:.2f}")
+    Returns:
+        List of dicts with 'points' ([N, 2] polyline) and 'color' (RGB
+        0-255), back to front
+    """
+    root = ET.fromstring(svg_content)
+    
+    # User units -> target pixel coordinates (pixel centers at integers)
+    view_box = [float(x) for x in _PATH_TOKEN.findall(root.get('viewBox', '')) if not x.isalpha()]
+    if len(view_box) == 4:
+        min_x, min_y, view_w, view_h = view_box
+    else:
+        min_x, min_y = 0.0, 0.0
+        view_w = float(re.sub(r'[^\d.]', '', root.get('width', '')) or 0) or None
+        view_h = float(re.sub(r'[^\d.]', '', root.get('height', '')) or 0) or None
+    scale_x = width / view_w if width is not None and view_w else 1.0
+    scale_y = height / view_h if height is not None and view_h else 1.0
+    to_pixels = np.array([[scale_x, 0, -min_x * scale_x - 0.5],
+                          [0, scale_y, -min_y * scale_y - 0.5],
+                          [0, 0, 1]])
+    
+    shapes = []
+    
+    def visit(element, matrix, fill):
+        tag = element.tag.split('}')[-1]
+        if tag in ('defs', 'clipPath', 'mask', 'symbol', 'pattern', 'linearGradient',
+                   'radialGradient', 'style', 'title', 'desc', 'metadata'):
+            return
+        matrix = matrix @ _parse_svg_transform(element.get('transform'))
+        style = {}
+        for item in element.get('style', '').split(';'):
+            if ':' in item:
+                key, value = item.split(':', 1)
+                style[key.strip()] = value.strip()
+        fill = style.get('fill', element.get('fill', fill)).strip()
+        
+        color = _parse_svg_color(fill)
+        polylines = _svg_shape_polylines(tag, element) if color is not None else []
+        if polylines:
+            outer = max(polylines, key=_polyline_area)
+            homogeneous = np.hstack([outer, np.ones((len(outer), 1))])
+            points = (homogeneous @ matrix.T)[:, :2]
+            if not np.allclose(points[0], points[-1]):
+                points = np.vstack([points, points[:1]])
+            shapes.append({'points': points, 'color': list(color)})
+        
+        for child in element:
+            visit(child, matrix, fill)
+    
+    visit(root, to_pixels, 'black')
+    
+    if max_paths is not None and len(shapes) > max_paths:
+        areas = np.array([_polyline_area(shape['points']) for shape in shapes])
+        keep = np.sort(np.argsort(-areas, kind='stable')[:max_paths])
+        shapes = [shapes[i] for i in keep]
+    
+    return shapes
+
+
+def refine_svg(image: np.ndarray,
+               svg: str,
+               device: str = 'cpu',
+               num_segments: int = 8,
+               num_iterations: int = 30,
+               learning_rate: float = 0.1,
+               start_sigma: float = 1.5,
+               max_paths: Optional[int] = 256,
+               verbose: bool = True,
+               **kwargs) -> BayesianVectorRenderer:
+    """
+    Warm-started Bayesian refinement of an existing vectorization.
+    
+    Parses an SVG (e.g. the output of vectorize_premium), resamples each
+    shape into the renderer's Bézier control points with its color and
+    z-order, and runs a short optimization. Starting close to the optimum,
+    a few tens of iterations at a small learning rate and a sharp sigma
+    replace the hundreds needed from SLIC regions. Topology proposals are
+    off unless topology_interval is given.
+    
+    Args:
+        image: Input RGB image [H, W, 3] with values 0-255
+        svg: SVG document or path to an SVG file
+        device: Computation device
+        num_segments: Bézier segments per path
+        num_iterations: Refinement iterations
+        learning_rate: Adam learning rate
+        start_sigma: Anti-aliasing sigma at the start of the anneal
+        max_paths: Keep only the largest shapes (None keeps all)
+        verbose: Print progress
+        **kwargs: Further optimize_vectorization arguments
         
-        # Early termination if target reached
-        if psnr >= target_psnr:
-            if verbose:
-                print(f"Target PSNR {target_psnr}dB reached at iteration {i+1}")
-            break
+    Returns:
+        Optimized BayesianVectorRenderer
+    """
+    if not svg.lstrip().startswith('<'):
+        with open(svg) as f:
+            svg = f.read()
     
+    height, width = image.shape[:2]
+    init_paths = svg_to_init_paths(svg, width, height, max_paths=max_paths)
+    if not init_paths:
+        raise ValueError("SVG contains no filled shapes")
     if verbose:
-        print(f"Best PSNR: {best_psnr:.2f}dB")
+        print(f"Warm start from {len(init_paths)} SVG paths")
     
-    return renderer
+    kwargs.setdefault('topology_interval', num_iterations + 1)
+    return optimize_vectorization(
+        image,
+        device=device,
+        num_segments=num_segments,
+        num_iterations=num_iterations,
+        learning_rate=learning_rate,
+        verbose=verbose,
+        init_paths=init_paths,
+        start_sigma=start_sigma,
+        **kwargs
+    )
@@ -328,6 +328,7 @@ def convert(
 
 
 from vectalab.auto import determine_auto_mode
+from vectalab.context import ImageContext
 
 def _run_auto_conversion(
     input_path: Path,
@@ -341,8 +342,17 @@ def _run_auto_conversion(
 ):
     """Run auto-detected vectorization."""
     
+    # Decode the input once; the context (and its cached analysis) is shared
+    # by mode detection, the selected pipeline and the metrics
+    try:
+        image_context = ImageContext.load(str(input_path))
+    except ValueError:
+        image_context = None
+    
     # Use centralized auto logic
-    effective_mode, effective_quality, mono_color = determine_auto_mode(str(input_path))
+    effective_mode, effective_quality, mono_color = determine_auto_mode(
+        str(input_path), image_context=image_context
+    )
     
     if effective_mode == "geometric_icon" and ICON_MODULE_AVAILABLE:
         if not quiet:
@@ -360,7 +370,7 @@ def _run_auto_conversion(
         if success:
             if not quiet:
                 # Calculate and show full metrics
-                metrics = calculate_full_metrics(str(input_path), str(output_path))
+                metrics = calculate_full_metrics(str(input_path), str(output_path), image_context=image_context)
                 result = VectorizationResult(
                     input_path=input_path,
                     output_path=output_path,
@@ -383,10 +393,12 @@ def _run_auto_conversion(
                 console.print("[cyan]🚀 Using Logo Premium method...[/]")
             
             with console.status("[cyan]Vectorizing...[/]"):
-                vectorize_logo_premium(str(input_path), str(output_path), verbose=verbose)
+                vectorize_logo_premium(
+                    str(input_path), str(output_path), verbose=verbose, image_context=image_context
+                )
             
             # FEEDBACK LOOP: Check LPIPS
-            metrics = calculate_full_metrics(str(input_path), str(output_path))
+            metrics = calculate_full_metrics(str(input_path), str(output_path), image_context=image_context)
             lpips_val = metrics.get('lpips')
             
             # If LPIPS is high (> 0.15), it might be a complex illustration misclassified as a logo
@@ -397,10 +409,12 @@ def _run_auto_conversion(
                     console.print("[cyan]🔄 Retrying with Premium Photo method for better detail...[/]")
                 
                 with console.status("[cyan]Re-vectorizing (Attempt 2)...[/]"):
-                    vectorize_premium(str(input_path), str(output_path), verbose=verbose)
+                    vectorize_premium(
+                        str(input_path), str(output_path), verbose=verbose, image_context=image_context
+                    )
                 
                 # Recalculate metrics for new result
-                metrics = calculate_full_metrics(str(input_path), str(output_path))
+                metrics = calculate_full_metrics(str(input_path), str(output_path), image_context=image_context)
                 result = VectorizationResult(
                     input_path=input_path,
                     output_path=output_path,
@@ -425,9 +439,11 @@ def _run_auto_conversion(
                 console.print("[cyan]🚀 Using Premium method...[/]")
             
             with console.status("[cyan]Vectorizing...[/]"):
-                vectorize_premium(str(input_path), str(output_path), verbose=verbose)
+                vectorize_premium(
+                    str(input_path), str(output_path), verbose=verbose, image_context=image_context
+                )
             if not quiet:
-                metrics = calculate_full_metrics(str(input_path), str(output_path))
+                metrics = calculate_full_metrics(str(input_path), str(output_path), image_context=image_context)
                 result = VectorizationResult(
                     input_path=input_path,
                     output_path=output_path,
@@ -559,18 +575,20 @@ def _run_hifi_conversion(
         ) as progress:
             task = progress.add_task("[cyan]Vectorizing...", total=None)
             
+            image_context = ImageContext.load(str(input_path))
             svg_path, stats = vectorize_high_fidelity(
                 str(input_path),
                 str(output_path),
                 preset=preset,
                 optimize=True,
                 verbose=verbose,
+                image_context=image_context,
             )
             
             progress.update(task, completed=100, total=100)
         
         # Calculate and show full metrics
-        metrics = calculate_full_metrics(str(input_path), str(output_path))
+        metrics = calculate_full_metrics(str(input_path), str(output_path), image_context=image_context)
         result = VectorizationResult(
             input_path=input_path,
             output_path=output_path,
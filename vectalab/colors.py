@@ -0,0 +1,134 @@
+"""
+Vectalab Color Histogram.
+
+Vectorized color statistics shared by the image analyzers (sota, quality,
+premium). Each RGB pixel is packed into a single uint32 key
+(``r << 16 | g << 8 | b``) so counting colors is a 1-D ``np.unique``
+instead of hashing one Python tuple per pixel.
+
+Usage:
+    from vectalab.colors import ColorHistogram
+
+    hist = ColorHistogram.from_image(image_rgb)
+    hist.unique_count          # number of distinct colors
+    hist.top_k_coverage(10)    # fraction of pixels in the 10 most common colors
+    hist.dominant(20)          # [(r, g, b), ...] most common first
+"""
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+def pack_rgb(pixels: np.ndarray) -> np.ndarray:
+    """
+    Pack RGB pixels into uint32 keys.
+
+    Args:
+        pixels: Array [..., 3] of uint8 RGB values
+
+    Returns:
+        uint32 array of shape pixels.shape[:-1]
+    """
+    pixels = np.asarray(pixels)
+    r = pixels[..., 0].astype(np.uint32)
+    g = pixels[..., 1].astype(np.uint32)
+    b = pixels[..., 2].astype(np.uint32)
+    return (r << 16) | (g << 8) | b
+
+
+def unpack_rgb(keys: np.ndarray) -> np.ndarray:
+    """
+    Unpack uint32 keys into RGB pixels.
+
+    Args:
+        keys: uint32 array of packed colors
+
+    Returns:
+        uint8 array of shape keys.shape + (3,)
+    """
+    keys = np.asarray(keys, dtype=np.uint32)
+    return np.stack(
+        ((keys >> 16) & 0xFF, (keys >> 8) & 0xFF, keys & 0xFF), axis=-1
+    ).astype(np.uint8)
+
+
+def _rgb_pixels(image: np.ndarray) -> np.ndarray:
+    """Flatten an RGB/RGBA/grayscale image to [N, 3] uint8 pixels."""
+    if image.ndim == 2:
+        image = np.repeat(image[:, :, None], 3, axis=2)
+    pixels = image[..., :3].reshape(-1, 3)
+    if pixels.dtype != np.uint8:
+        pixels = np.clip(pixels, 0, 255).astype(np.uint8)
+    return pixels
+
+
+class ColorHistogram:
+    """
+    Exact color histogram of an image.
+
+    Colors are stored as packed uint32 keys sorted by descending count.
+    Ties are broken by first occurrence (as Counter.most_common over the
+    pixels does) when first indices are given, else by key.
+    """
+
+    def __init__(self, keys: np.ndarray, counts: np.ndarray, first: Optional[np.ndarray] = None):
+        order = np.lexsort((keys if first is None else first, -counts.astype(np.int64)))
+        self.keys = keys[order].astype(np.uint32)
+        self.counts = counts[order].astype(np.int64)
+        self.total = int(self.counts.sum())
+        self._cumulative = np.cumsum(self.counts)
+
+    @classmethod
+    def from_keys(cls, keys: np.ndarray) -> "ColorHistogram":
+        """Build a histogram from packed uint32 keys (one per pixel)."""
+        keys = np.asarray(keys, dtype=np.uint32).ravel()
+        # First indices break count ties by order of appearance
+        unique, first, counts = np.unique(keys, return_index=True, return_counts=True)
+        return cls(unique, counts, first)
+
+    @classmethod
+    def from_image(cls, image: np.ndarray, mask: Optional[np.ndarray] = None) -> "ColorHistogram":
+        """
+        Build a histogram from an image.
+
+        Args:
+            image: RGB (or RGBA / grayscale) uint8 image
+            mask: Optional boolean mask [H, W]; only masked pixels are counted
+
+        Returns:
+            ColorHistogram
+        """
+        pixels = _rgb_pixels(image)
+        if mask is not None:
+            pixels = pixels[np.asarray(mask, dtype=bool).ravel()]
+        return cls.from_keys(pack_rgb(pixels))
+
+    @property
+    def unique_count(self) -> int:
+        """Number of distinct colors."""
+        return len(self.keys)
+
+    @property
+    def colors(self) -> np.ndarray:
+        """Distinct colors [N, 3] uint8, most common first."""
+        return unpack_rgb(self.keys)
+
+    def top_k_coverage(self, k: int) -> float:
+        """Fraction of pixels covered by the k most common colors."""
+        if self.total == 0 or k <= 0:
+            return 0.0
+        k = min(k, len(self._cumulative))
+        return float(self._cumulative[k - 1]) / self.total
+
+    def dominant(self, k: int) -> List[Tuple[int, int, int]]:
+        """The k most common colors as (r, g, b) tuples."""
+        return [tuple(int(c) for c in color) for color in unpack_rgb(self.keys[:k])]
+
+    def most_common(self, k: Optional[int] = None) -> List[Tuple[Tuple[int, int, int], int]]:
+        """Counter-style [((r, g, b), count), ...], most common first."""
+        n = self.unique_count if k is None else min(k, self.unique_count)
+        return list(zip(self.dominant(n), self.counts[:n].tolist()))
+
+    def __len__(self) -> int:
+        return self.unique_count
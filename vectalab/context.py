@@ -0,0 +1,134 @@
+"""
+Vectalab Image Context.
+
+An ImageContext holds one decoded input image together with the analysis
+that the auto-mode detection, the vectorization pipelines and the metrics
+code all need. Creating it once and passing it along avoids decoding and
+analyzing the same file several times per conversion.
+
+Derived data (color histogram, logo analysis, monochrome check, BGR copy)
+is computed lazily on first access and then cached.
+
+Usage:
+    from vectalab.context import ImageContext
+
+    image_context = ImageContext.load(input_path)
+    mode, quality, color = determine_auto_mode(input_path, image_context=image_context)
+    vectorize_premium(input_path, output_path, image_context=image_context)
+    metrics = calculate_full_metrics(input_path, output_path, image_context=image_context)
+"""
+
+from functools import cached_property
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+from vectalab.colors import ColorHistogram
+
+
+class ImageContext:
+    """
+    Decoded input image shared across pipeline stages.
+
+    Attributes:
+        rgb: RGB image [H, W, 3] uint8
+        alpha: Alpha channel [H, W] uint8, or None for opaque inputs
+        path: Source path (None if built from an array)
+    """
+
+    def __init__(
+        self,
+        rgb: np.ndarray,
+        alpha: Optional[np.ndarray] = None,
+        path: Optional[Union[str, Path]] = None,
+    ):
+        self.rgb = rgb
+        self.alpha = alpha
+        self.path = str(path) if path is not None else None
+        self.height, self.width = rgb.shape[:2]
+
+    @classmethod
+    def load(cls, input_path: Union[str, Path]) -> "ImageContext":
+        """
+        Decode an image file (with transparency support).
+
+        Args:
+            input_path: Path to input image
+
+        Returns:
+            ImageContext
+        """
+        image = cv2.imread(str(input_path), cv2.IMREAD_UNCHANGED)
+        if image is None:
+            raise ValueError(f"Could not load image: {input_path}")
+
+        if image.dtype == np.uint16:
+            image = (image >> 8).astype(np.uint8)
+
+        alpha = None
+        if image.ndim == 3 and image.shape[2] == 4:
+            alpha = image[:, :, 3].copy()
+            rgb = cv2.cvtColor(image, cv2.COLOR_BGRA2RGB)
+        elif image.ndim == 3 and image.shape[2] == 3:
+            rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        else:
+            # Grayscale
+            rgb = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
+
+        return cls(rgb, alpha, path=input_path)
+
+    @classmethod
+    def from_array(cls, image: np.ndarray) -> "ImageContext":
+        """Build a context from an RGB, RGBA or grayscale array."""
+        if image.ndim == 2:
+            return cls(cv2.cvtColor(image, cv2.COLOR_GRAY2RGB))
+        if image.shape[2] == 4:
+            return cls(np.ascontiguousarray(image[:, :, :3]), image[:, :, 3].copy())
+        return cls(image)
+
+    @classmethod
+    def resolve(
+        cls,
+        input_path: Union[str, Path],
+        image_context: Optional["ImageContext"] = None,
+    ) -> "ImageContext":
+        """Return image_context if given, otherwise load input_path."""
+        if image_context is not None:
+            return image_context
+        return cls.load(input_path)
+
+    @property
+    def has_alpha(self) -> bool:
+        return self.alpha is not None
+
+    @cached_property
+    def rgba(self) -> np.ndarray:
+        """RGBA image (alpha = 255 for opaque inputs)."""
+        alpha = self.alpha
+        if alpha is None:
+            alpha = np.full((self.height, self.width), 255, dtype=np.uint8)
+        return np.dstack((self.rgb, alpha))
+
+    @cached_property
+    def bgr(self) -> np.ndarray:
+        """BGR copy for OpenCV code paths."""
+        return cv2.cvtColor(self.rgb, cv2.COLOR_RGB2BGR)
+
+    @cached_property
+    def histogram(self) -> ColorHistogram:
+        """Color histogram of the RGB pixels."""
+        return ColorHistogram.from_image(self.rgb)
+
+    @cached_property
+    def analysis(self) -> Dict[str, Any]:
+        """Logo detection analysis (see quality.analyze_image)."""
+        from vectalab.quality import analyze_image
+        return analyze_image(self.rgb, histogram=self.histogram)
+
+    @cached_property
+    def monochrome(self) -> Tuple[bool, Optional[Tuple[int, int, int]]]:
+        """Monochrome-icon check as (is_mono, color) (see icon.is_monochrome_array)."""
+        from vectalab.icon import is_monochrome_array
+        return is_monochrome_array(self.rgba)
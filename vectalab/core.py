@@ -11,14 +11,39 @@ from pathlib import Path
 from .segmentation import SAMSegmenter
 from .tracing import Tracer
 from .output import SVGWriter
+from .masks import as_compact, label_statistics, paint_label_map, upscale_mask
+
+
+# Tracing resolution: up to SCALE_FACTOR x the input, within MAX_TRACE_PIXELS
+SCALE_FACTOR = 4.0
+MAX_TRACE_PIXELS = 4096 * 4096
+
+# Longest side SAM segments at when masks are upsampled (SAM itself works at
+# 1024 px per crop, 2048 px with the default crop layer)
+MAX_SEGMENT_SIDE = 2048
+
+
+def choose_scale_factor(height, width, max_factor=SCALE_FACTOR, max_pixels=MAX_TRACE_PIXELS):
+    """Largest upsampling factor <= max_factor keeping the frame within max_pixels (never below 1)."""
+    return float(max(1.0, min(max_factor, np.sqrt(max_pixels / (height * width)))))
 
 
 class Vectalab:
-    def __init__(self, model_type="vit_h", checkpoint_path=None, device="cpu", method="sam", use_modal=False, **kwargs):
+    def __init__(self, model_type="vit_h", checkpoint_path=None, device="cpu", method="sam", use_modal=False,
+                 upsample_masks=False, **kwargs):
+        """
+        Args:
+            upsample_masks: Segment at native resolution (long side capped at
+                MAX_SEGMENT_SIDE) and upscale the masks to the tracing
+                resolution (choose_scale_factor), instead of upsampling the
+                input 4x before segmentation
+            workers: Tracing processes (see Tracer; default 1, in-process)
+        """
         self.method = method
         self.device = device
+        self.upsample_masks = upsample_masks
         # Separate arguments
-        tracing_keys = ['turdsize', 'alphamax', 'opticurve']
+        tracing_keys = ['turdsize', 'alphamax', 'opticurve', 'workers']
         tracing_args = {k: v for k, v in kwargs.items() if k in tracing_keys}
         segmentation_args = {k: v for k, v in kwargs.items() if k not in tracing_keys}
         
@@ -50,46 +75,74 @@ class Vectalab:
         else:
             image = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
         
-        # Upsample for better fidelity (4x)
+        # Upsample for better fidelity (4x, or within MAX_TRACE_PIXELS when masks are upsampled)
         orig_h, orig_w = image.shape[:2]
-        scale_factor = 4.0
+        if self.upsample_masks:
+            scale_factor = choose_scale_factor(orig_h, orig_w)
+            segment_scale = min(1.0, MAX_SEGMENT_SIDE / max(orig_h, orig_w))
+        else:
+            scale_factor = segment_scale = 4.0
         new_size = (int(orig_w * scale_factor), int(orig_h * scale_factor))
         print(f"Upsampling image to {new_size} for higher fidelity...")
-        image = cv2.resize(image, new_size, interpolation=cv2.INTER_LANCZOS4)
+        upsampled = cv2.resize(image, new_size, interpolation=cv2.INTER_LANCZOS4)
+        
+        if segment_scale == scale_factor:
+            segment_image = upsampled
+        elif segment_scale == 1.0:
+            segment_image = image
+        else:
+            segment_size = (max(1, int(orig_w * segment_scale)), max(1, int(orig_h * segment_scale)))
+            segment_image = cv2.resize(image, segment_size, interpolation=cv2.INTER_AREA)
+        image = upsampled
 
         # 2. Segment Image (Always run this first for initialization)
         print("Running segmentation...")
-        masks = self.segmenter.segment(image)
+        masks = self.segmenter.segment(segment_image)
         print(f"Found {len(masks)} segments.")
         
         # Filter masks based on alpha transparency
         if alpha_mask is not None:
             print("Filtering segments based on transparency...")
-            # Resize alpha mask to match upsampled image
-            alpha_mask_resized = cv2.resize(alpha_mask, new_size, interpolation=cv2.INTER_NEAREST)
+            # Resize alpha mask to match the segmented image
+            segment_h, segment_w = segment_image.shape[:2]
+            alpha_mask_resized = cv2.resize(alpha_mask, (segment_w, segment_h), interpolation=cv2.INTER_NEAREST)
+            
+            # Paint masks largest first (smaller ones on top, as drawn) and
+            # count each segment's visible and transparent (alpha < 10) pixels
+            masks = sorted(masks, key=lambda m: m['area'], reverse=True)
+            compacts = [as_compact(m['segmentation']) for m in masks]
+            labels = paint_label_map(compacts, alpha_mask_resized.shape)
+            stats = label_statistics(labels, len(masks), transparent=alpha_mask_resized < 10)
             
             valid_masks = []
-            for m in masks:
-                # m['segmentation'] is boolean mask of the object
-                object_mask = m['segmentation']
-                object_area = np.sum(object_mask)
-                
-                if object_area == 0:
+            for m, compact, visible_area, transparent_area in zip(
+                    masks, compacts, stats['area'], stats['transparent_area']):
+                if compact.area == 0:
                     continue
                 
-                # Pixels that are in the object AND are transparent (alpha < 10)
-                # We use a low threshold to be safe
-                transparent_pixels = np.logical_and(object_mask, alpha_mask_resized < 10)
-                transparent_area = np.sum(transparent_pixels)
+                if visible_area == 0:
+                    # Fully covered by smaller segments: judge the whole object
+                    x0, y0, x1, y1 = compact.bbox
+                    transparent_pixels = np.logical_and(compact.crop(), alpha_mask_resized[y0:y1, x0:x1] < 10)
+                    visible_area, transparent_area = compact.area, np.sum(transparent_pixels)
                 
-                # If object is more than 50% transparent, skip it
-                if transparent_area / object_area > 0.5:
+                # If the visible part of the object is more than 50% transparent, skip it
+                if transparent_area / visible_area > 0.5:
                     continue
                     
                 valid_masks.append(m)
             
             print(f"Filtered {len(masks) - len(valid_masks)} transparent segments.")
             masks = valid_masks
+        
+        # Scale masks up to the tracing resolution, snapping edges to the upsampled image
+        if segment_image is not image:
+            print(f"Upscaling {len(masks)} masks to {new_size}...")
+            for m in masks:
+                m['segmentation'] = upscale_mask(m['segmentation'], image)
+                m['area'] = m['segmentation'].area
+                x0, y0, x1, y1 = m['segmentation'].bbox
+                m['bbox'] = [x0, y0, x1 - x0, y1 - y0]
 
         # 3. Trace Segments (Always run this first)
         print("Tracing paths...")
@@ -217,5 +270,5 @@ class Vectalab:
 
         # 4. Save Output (Standard SAM mode)
         print(f"Saving to {output_path}...")
-        self.writer.save(paths, output_path, image.shape[:2])
+        self.writer.save(initial_paths, output_path, image.shape[:2])
         print("Done.")
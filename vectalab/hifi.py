@@ -21,10 +21,8 @@ Usage:
 """
 
 import numpy as np
-import cv2
 from PIL import Image
 import io
-import os
 import xml.etree.ElementTree as ET
 from typing import Optional, Tuple, Dict, Any
 from pathlib import Path
@@ -38,14 +36,11 @@ from .optimize import (
     VTRACER_PRESETS,
     optimize_svg_string,
 )
+from .render import render_svg_to_array, render_svg_file_to_array
+from .context import ImageContext
+from .vtrace import trace_file, VTRACER_AVAILABLE
 
 # Try to import optional dependencies
-try:
-    import vtracer
-    VTRACER_AVAILABLE = True
-except ImportError:
-    VTRACER_AVAILABLE = False
-
 try:
     import cairosvg
     CAIROSVG_AVAILABLE = True
@@ -87,19 +82,9 @@ def render_svg(svg_path: str, width: int, height: int, scale: int = 1) -> np.nda
         scale: Supersampling scale (render at higher res then downsample)
         
     Returns:
-        RGB numpy array [H, W, 3]
+        Read-only RGB numpy array [H, W, 3] (cached, see vectalab.render)
     """
-    png_data = cairosvg.svg2png(
-        url=svg_path,
-        output_width=width * scale,
-        output_height=height * scale
-    )
-    rendered = np.array(Image.open(io.BytesIO(png_data)).convert('RGB'))
-    
-    if scale > 1:
-        rendered = cv2.resize(rendered, (width, height), interpolation=cv2.INTER_AREA)
-    
-    return rendered
+    return render_svg_file_to_array(svg_path, width, height, scale=scale)
 
 
 def render_svg_string(svg_content: str, width: int, height: int) -> np.ndarray:
@@ -112,14 +97,9 @@ def render_svg_string(svg_content: str, width: int, height: int) -> np.ndarray:
         height: Target height
         
     Returns:
-        RGB numpy array [H, W, 3]
+        Read-only RGB numpy array [H, W, 3] (cached, see vectalab.render)
     """
-    png_data = cairosvg.svg2png(
-        bytestring=svg_content.encode('utf-8'),
-        output_width=width,
-        output_height=height
-    )
-    return np.array(Image.open(io.BytesIO(png_data)).convert('RGB'))
+    return render_svg_to_array(svg_content, width, height)
 
 
 def create_base_vectorization(
@@ -136,7 +116,10 @@ def create_base_vectorization(
         preset: Preset name ('figma', 'balanced', 'quality', 'ultra')
     """
     settings = get_vtracer_preset(preset)
-    vtracer.convert_image_to_svg_py(image_path, svg_path, **settings)
+    svg_content = trace_file(image_path, **settings)
+    
+    with open(svg_path, 'w', encoding='utf-8') as f:
+        f.write(svg_content)
 
 
 def get_svg_stats(svg_path: str) -> Dict[str, Any]:
@@ -164,7 +147,8 @@ def vectorize_high_fidelity(
     output_path: str,
     preset: str = "balanced",
     optimize: bool = True,
-    verbose: bool = True
+    verbose: bool = True,
+    image_context: Optional[ImageContext] = None,
 ) -> Tuple[str, Dict[str, Any]]:
     """
     Vectorize an image to a clean, lightweight SVG suitable for design tools.
@@ -184,6 +168,7 @@ def vectorize_high_fidelity(
             - 'ultra': Maximum quality (not recommended for large images)
         optimize: Apply post-processing optimization
         verbose: Print progress messages
+        image_context: Already decoded input (loaded from input_path if None)
         
     Returns:
         Tuple of (output_path, stats_dict)
@@ -195,24 +180,19 @@ def vectorize_high_fidelity(
     check_dependencies(require_metrics=False)
     
     # Load original image to get dimensions
-    original = cv2.imread(input_path)
-    if original is None:
-        raise ValueError(f"Could not load image: {input_path}")
-    
-    original_rgb = cv2.cvtColor(original, cv2.COLOR_BGR2RGB)
-    h, w = original_rgb.shape[:2]
+    image_context = ImageContext.resolve(input_path, image_context)
+    h, w = image_context.height, image_context.width
     
     if verbose:
         print(f"Input: {input_path} ({w}x{h})")
         print(f"Preset: {preset}")
     
-    # Create base vectorization
-    temp_svg = output_path.replace('.svg', '_temp.svg')
-    create_base_vectorization(input_path, temp_svg, preset)
+    # Create base vectorization (in memory, no temp SVG)
+    svg_content = trace_file(input_path, **get_vtracer_preset(preset))
     
     if verbose:
-        base_stats = get_svg_stats(temp_svg)
-        print(f"Base vectorization: {base_stats['file_size']:,} bytes, {base_stats['path_count']} paths")
+        base_size = len(svg_content.encode('utf-8'))
+        print(f"Base vectorization: {base_size:,} bytes, {svg_content.count('<path')} paths")
     
     # Optimize if requested
     if optimize:
@@ -225,31 +205,20 @@ def vectorize_high_fidelity(
         else:
             optimizer = create_quality_optimizer()
         
-        # Read and optimize
-        with open(temp_svg, 'r', encoding='utf-8') as f:
-            svg_content = f.read()
-        
         optimized_content = optimizer.optimize_string(svg_content)
         
         # Write optimized output
         with open(output_path, 'w', encoding='utf-8') as f:
             f.write(optimized_content)
         
-        # Clean up temp file
-        try:
-            os.remove(temp_svg)
-        except:
-            pass
-        
         stats = optimizer.get_stats(svg_content, optimized_content)
         
         if verbose:
             print(f"Optimized: {stats['optimized_size']:,} bytes ({stats['reduction_percent']:.1f}% reduction)")
             print(f"Paths: {stats['original_paths']} → {stats['optimized_paths']}")
     else:
-        # Just rename temp to output
-        import shutil
-        shutil.move(temp_svg, output_path)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(svg_content)
         
         stats = get_svg_stats(output_path)
         stats['reduction_percent'] = 0
@@ -263,7 +232,8 @@ def vectorize_high_fidelity(
 def vectorize_for_figma(
     input_path: str,
     output_path: str,
-    verbose: bool = True
+    verbose: bool = True,
+    image_context: Optional[ImageContext] = None,
 ) -> Tuple[str, Dict[str, Any]]:
     """
     Convenience function for Figma-optimized vectorization.
@@ -283,14 +253,16 @@ def vectorize_for_figma(
         output_path, 
         preset='figma',
         optimize=True,
-        verbose=verbose
+        verbose=verbose,
+        image_context=image_context,
     )
 
 
 def vectorize_with_quality(
     input_path: str,
     output_path: str,
-    verbose: bool = True
+    verbose: bool = True,
+    image_context: Optional[ImageContext] = None,
 ) -> Tuple[str, Dict[str, Any]]:
     """
     Convenience function for quality-focused vectorization.
@@ -310,14 +282,16 @@ def vectorize_with_quality(
         output_path, 
         preset='quality',
         optimize=True,
-        verbose=verbose
+        verbose=verbose,
+        image_context=image_context,
     )
 
 
 def compute_quality_metrics(
     input_path: str,
     svg_path: str,
-    verbose: bool = False
+    verbose: bool = False,
+    image_context: Optional[ImageContext] = None,
 ) -> Dict[str, float]:
     """
     Compute quality metrics between original image and SVG.
@@ -326,6 +300,7 @@ def compute_quality_metrics(
         input_path: Path to original image
         svg_path: Path to SVG file
         verbose: Print metrics
+        image_context: Already decoded original (loaded from input_path if None)
         
     Returns:
         Dictionary with quality metrics (SSIM, PSNR, etc.)
@@ -333,10 +308,7 @@ def compute_quality_metrics(
     check_dependencies(require_metrics=True)
     
     # Load original
-    original = cv2.imread(input_path)
-    if original is None:
-        raise ValueError(f"Could not load image: {input_path}")
-    original_rgb = cv2.cvtColor(original, cv2.COLOR_BGR2RGB)
+    original_rgb = ImageContext.resolve(input_path, image_context).rgb
     h, w = original_rgb.shape[:2]
     
     # Render SVG
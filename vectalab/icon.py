@@ -20,36 +20,47 @@ try:
 except ImportError:
     PREMIUM_AVAILABLE = False
 
-def is_monochrome_icon(img_path):
+def is_monochrome_array(arr):
+    """
+    Check if an RGBA array is a monochrome icon on transparent background.
+    Returns (bool, color_tuple).
+    """
+    alpha = arr[:, :, 3]
+    
+    # If mostly opaque (e.g. > 95%), it's likely not a transparent icon
+    if np.mean(alpha > 10) > 0.95: 
+        return False, None
+    
+    # Check colors of visible pixels
+    visible_mask = alpha > 10
+    if not np.any(visible_mask): 
+        return False, None
+    
+    visible = arr[visible_mask]
+    
+    # Get average color and variance
+    avg_color = np.mean(visible[:, :3], axis=0)
+    std_color = np.std(visible[:, :3], axis=0)
+    
+    # Low variance implies monochrome
+    if np.max(std_color) > 30: 
+        return False, None
+        
+    return True, tuple(map(int, avg_color))
+
+def is_monochrome_icon(img_path, image_context=None):
     """
     Check if the image is a monochrome icon on transparent background.
     Returns (bool, color_tuple).
+    
+    If an ImageContext is given, its cached result is used instead of
+    decoding img_path again.
     """
     try:
+        if image_context is not None:
+            return image_context.monochrome
         img = Image.open(img_path).convert('RGBA')
-        arr = np.array(img)
-        alpha = arr[:, :, 3]
-        
-        # If mostly opaque (e.g. > 95%), it's likely not a transparent icon
-        if np.mean(alpha > 10) > 0.95: 
-            return False, None
-        
-        # Check colors of visible pixels
-        visible_mask = alpha > 10
-        if not np.any(visible_mask): 
-            return False, None
-        
-        visible = arr[visible_mask]
-        
-        # Get average color and variance
-        avg_color = np.mean(visible[:, :3], axis=0)
-        std_color = np.std(visible[:, :3], axis=0)
-        
-        # Low variance implies monochrome
-        if np.max(std_color) > 30: 
-            return False, None
-            
-        return True, tuple(map(int, avg_color))
+        return is_monochrome_array(np.array(img))
     except Exception:
         return False, None
 
@@ -0,0 +1,270 @@
+"""
+Vectalab Compact Masks.
+
+SAM returns one full-frame boolean array per segment; on a 4x upsampled
+1024² input that is hundreds of 16 MP masks. ``CompactMask`` stores a
+mask as its bounding box plus the bit-packed crop, i.e. about
+bbox area / 8 bytes, and only decodes pixels when asked to.
+
+Masks convert from and to full-frame arrays and COCO-style uncompressed
+RLE (``{'size': [h, w], 'counts': [...]}``, column-major runs starting
+with zeros), which is what SAM emits with ``output_mode="uncompressed_rle"``.
+``upscale_mask`` maps a mask segmented at low resolution to a larger
+frame, refining its edges against the full-resolution image.
+
+Overlapping masks are painted once into an int32 label map
+(``paint_label_map``) and ``label_statistics`` then computes every
+mask's visible area, transparent area and mean color with np.bincount,
+in O(pixels) rather than O(masks x pixels).
+
+Usage:
+    from vectalab.masks import CompactMask, as_compact
+
+    mask = CompactMask.from_dense(segmentation)
+    x0, y0, x1, y1 = mask.bbox
+    pixels = image[y0:y1, x0:x1][mask.crop()]
+"""
+
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+
+class CompactMask:
+    """
+    Binary mask stored as a bounding box and a bit-packed crop.
+
+    Attributes:
+        shape: (height, width) of the full frame
+        bbox: (x0, y0, x1, y1) crop window; empty masks have a 0x0 box
+        bits: np.packbits of the [y1 - y0, x1 - x0] crop (row-major)
+        area: Number of foreground pixels
+    """
+
+    __slots__ = ('shape', 'bbox', 'bits', 'area')
+
+    def __init__(self, shape: Tuple[int, int], bbox: Tuple[int, int, int, int],
+                 bits: np.ndarray, area: int):
+        self.shape = (int(shape[0]), int(shape[1]))
+        self.bbox = tuple(int(v) for v in bbox)
+        self.bits = bits
+        self.area = int(area)
+
+    @classmethod
+    def from_crop(cls, crop: np.ndarray, x0: int, y0: int,
+                  shape: Tuple[int, int]) -> 'CompactMask':
+        """Mask whose foreground lies in crop, placed at (x0, y0) of a frame of shape."""
+        crop = np.asarray(crop, dtype=bool)
+        rows = np.flatnonzero(crop.any(axis=1))
+        if rows.size == 0:
+            return cls(shape, (0, 0, 0, 0), np.zeros(0, dtype=np.uint8), 0)
+
+        # Shrink to the tight bounding box
+        cols = np.flatnonzero(crop.any(axis=0))
+        top, bottom, left, right = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+        crop = crop[top:bottom, left:right]
+        bbox = (x0 + left, y0 + top, x0 + right, y0 + bottom)
+        return cls(shape, bbox, np.packbits(crop, axis=None), np.count_nonzero(crop))
+
+    @classmethod
+    def from_dense(cls, mask: np.ndarray) -> 'CompactMask':
+        """Compact form of a full-frame [H, W] mask."""
+        mask = np.asarray(mask, dtype=bool)
+        return cls.from_crop(mask, 0, 0, mask.shape)
+
+    @classmethod
+    def from_rle(cls, rle: Dict[str, Any]) -> 'CompactMask':
+        """Compact form of an uncompressed COCO RLE, without a full-frame decode."""
+        h, w = rle['size']
+        counts = np.asarray(rle['counts'], dtype=np.int64)
+        ends = np.cumsum(counts)
+        # Odd runs are foreground
+        starts, lengths = (ends - counts)[1::2], counts[1::2]
+        starts, lengths = starts[lengths > 0], lengths[lengths > 0]
+        if starts.size == 0:
+            return cls((h, w), (0, 0, 0, 0), np.zeros(0, dtype=np.uint8), 0)
+
+        # Flat column-major indices of all foreground pixels
+        run_offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        index = run_offsets + np.arange(lengths.sum())
+        rows, cols = index % h, index // h
+
+        x0, y0 = cols.min(), rows.min()
+        crop = np.zeros((rows.max() - y0 + 1, cols.max() - x0 + 1), dtype=bool)
+        crop[rows - y0, cols - x0] = True
+        return cls((h, w), (x0, y0, cols.max() + 1, rows.max() + 1),
+                   np.packbits(crop, axis=None), index.size)
+
+    @property
+    def crop_shape(self) -> Tuple[int, int]:
+        x0, y0, x1, y1 = self.bbox
+        return y1 - y0, x1 - x0
+
+    @property
+    def nbytes(self) -> int:
+        return self.bits.nbytes
+
+    def crop(self) -> np.ndarray:
+        """Decode the [y1 - y0, x1 - x0] boolean crop."""
+        h, w = self.crop_shape
+        return np.unpackbits(self.bits, count=h * w).reshape(h, w).astype(bool)
+
+    def to_dense(self) -> np.ndarray:
+        """Decode the full-frame [H, W] boolean mask."""
+        mask = np.zeros(self.shape, dtype=bool)
+        x0, y0, x1, y1 = self.bbox
+        mask[y0:y1, x0:x1] = self.crop()
+        return mask
+
+    def to_rle(self) -> Dict[str, Any]:
+        """Uncompressed COCO RLE of the full-frame mask (decodes only the bbox columns)."""
+        h, w = self.shape
+        if self.area == 0:
+            return {'size': [h, w], 'counts': [h * w]}
+
+        # Column-major runs over full-height columns x0..x1; the columns
+        # before and after are background
+        x0, y0, x1, y1 = self.bbox
+        columns = np.zeros((x1 - x0, h), dtype=bool)
+        columns[:, y0:y1] = self.crop().T
+        flat = columns.ravel()
+        changes = np.flatnonzero(flat[1:] != flat[:-1]) + 1
+        counts = np.diff(np.concatenate([[0], changes, [flat.size]])).tolist()
+
+        if flat[0]:
+            counts.insert(0, x0 * h)
+        else:
+            counts[0] += x0 * h
+        if flat[-1]:
+            counts.append((w - x1) * h)
+        else:
+            counts[-1] += (w - x1) * h
+        return {'size': [h, w], 'counts': counts}
+
+    def __array__(self, dtype=None, copy=None):
+        mask = self.to_dense()
+        return mask if dtype is None else mask.astype(dtype)
+
+    def __repr__(self) -> str:
+        return f"CompactMask(shape={self.shape}, bbox={self.bbox}, area={self.area})"
+
+
+def as_compact(segmentation: Any) -> CompactMask:
+    """CompactMask from a CompactMask, an uncompressed RLE dict or a dense array."""
+    if isinstance(segmentation, CompactMask):
+        return segmentation
+    if isinstance(segmentation, dict):
+        return CompactMask.from_rle(segmentation)
+    return CompactMask.from_dense(segmentation)
+
+
+def _guided_filter(guide: np.ndarray, source: np.ndarray, radius: int, eps: float) -> np.ndarray:
+    """Edge-preserving guided filter (He et al.) of source steered by a grayscale guide."""
+    size = (2 * radius + 1, 2 * radius + 1)
+    box = lambda x: cv2.boxFilter(x, cv2.CV_32F, size, borderType=cv2.BORDER_REFLECT)
+    mean_guide, mean_source = box(guide), box(source)
+    variance = box(guide * guide) - mean_guide * mean_guide
+    covariance = box(guide * source) - mean_guide * mean_source
+    a = covariance / (variance + eps)
+    b = mean_source - a * mean_guide
+    return box(a) * guide + box(b)
+
+
+def upscale_mask(mask: CompactMask, guide: np.ndarray, eps: float = 1e-3) -> CompactMask:
+    """
+    Scale a mask up to the frame of guide, snapping its edges to the guide's.
+
+    Only the mask's padded bounding box is processed: the crop is
+    bilinearly resampled (pixel centers aligned) into a soft mask, refined
+    with a guided filter on the grayscale guide image and thresholded at 0.5.
+
+    Args:
+        mask: Mask in a lower resolution frame
+        guide: [H, W] or [H, W, C] uint8 image in the target frame
+        eps: Guided filter regularization (larger = smoother edges)
+
+    Returns:
+        CompactMask in the [H, W] frame of guide
+    """
+    height, width = guide.shape[:2]
+    if mask.area == 0:
+        return CompactMask((height, width), (0, 0, 0, 0), np.zeros(0, dtype=np.uint8), 0)
+
+    sx, sy = width / mask.shape[1], height / mask.shape[0]
+    radius = max(1, int(round(max(sx, sy))))
+
+    # Source window with a 1-pixel background margin inside the frame (edge
+    # replication then extends the mask across frame borders, not beyond
+    # the margin), and its footprint in the target frame
+    x0, y0, x1, y1 = mask.bbox
+    xa, ya = max(x0 - 1, 0), max(y0 - 1, 0)
+    xb, yb = min(x1 + 1, mask.shape[1]), min(y1 + 1, mask.shape[0])
+    src = np.zeros((yb - ya, xb - xa), dtype=np.float32)
+    src[y0 - ya:y1 - ya, x0 - xa:x1 - xa] = mask.crop()
+    X0 = max(0, int(np.floor(xa * sx)) - radius)
+    Y0 = max(0, int(np.floor(ya * sy)) - radius)
+    X1 = min(width, int(np.ceil(xb * sx)) + radius)
+    Y1 = min(height, int(np.ceil(yb * sy)) + radius)
+
+    # dst(X, Y) = src((X + X0 + 0.5) / sx - 0.5 - xa, ...)
+    inverse = np.array([[1 / sx, 0, (X0 + 0.5) / sx - 0.5 - xa],
+                        [0, 1 / sy, (Y0 + 0.5) / sy - 0.5 - ya]], dtype=np.float64)
+    soft = cv2.warpAffine(src, inverse, (X1 - X0, Y1 - Y0), flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP,
+                          borderMode=cv2.BORDER_REPLICATE)
+
+    window = guide[Y0:Y1, X0:X1]
+    if window.ndim == 3:
+        window = cv2.cvtColor(window[..., :3], cv2.COLOR_RGB2GRAY)
+    refined = _guided_filter(window.astype(np.float32) / 255.0, soft, radius, eps)
+    return CompactMask.from_crop(refined > 0.5, X0, Y0, (height, width))
+
+
+def paint_label_map(masks: Sequence[CompactMask], shape: Tuple[int, int]) -> np.ndarray:
+    """
+    Paint masks in order (later ones on top) into an int32 label map.
+
+    Returns:
+        [H, W] index of the topmost mask covering each pixel, -1 where none does
+    """
+    labels = np.full(shape, -1, dtype=np.int32)
+    for i, mask in enumerate(masks):
+        x0, y0, x1, y1 = mask.bbox
+        labels[y0:y1, x0:x1][mask.crop()] = i
+    return labels
+
+
+def label_statistics(labels: np.ndarray, num_labels: int,
+                     image: Optional[np.ndarray] = None,
+                     transparent: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    Per-label statistics of a label map in one np.bincount pass each.
+
+    Args:
+        labels: [H, W] label map from paint_label_map
+        num_labels: Number of labels (masks painted)
+        image: Optional [H, W, C] image for per-label mean colors
+        transparent: Optional [H, W] boolean map of transparent pixels
+
+    Returns:
+        Dict with 'area' [num_labels] and, if requested, 'transparent_area'
+        [num_labels] and 'mean_color' [num_labels, C] (zero for empty labels)
+    """
+    # Shift so unlabeled pixels (-1) land in bin 0
+    flat = labels.ravel() + 1
+    bins = num_labels + 1
+    area = np.bincount(flat, minlength=bins)[1:]
+    stats = {'area': area}
+
+    if transparent is not None:
+        stats['transparent_area'] = np.bincount(flat[transparent.ravel()], minlength=bins)[1:]
+
+    if image is not None:
+        pixels = image.reshape(flat.size, -1)
+        sums = np.stack([
+            np.bincount(flat, weights=pixels[:, c], minlength=bins)[1:]
+            for c in range(pixels.shape[1])
+        ], axis=1)
+        stats['mean_color'] = sums / np.maximum(area, 1)[:, np.newaxis]
+
+    return stats
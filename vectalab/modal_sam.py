@@ -50,7 +50,8 @@ if modal:
     @app.cls(image=sam_image, gpu="A10G", timeout=600)
     class ModalSAM:
         model_type: str = modal.parameter(default="vit_h")
-        kwargs_bytes: bytes = modal.parameter(default=b"")
+        # JSON-encoded SamAutomaticMaskGenerator arguments
+        generator_args: str = modal.parameter(default="{}")
 
         @modal.enter()
         def load_model(self):
@@ -58,15 +59,9 @@ if modal:
             from segment_anything import sam_model_registry, SamAutomaticMaskGenerator
             import requests
             import os
-            import pickle
+            import json
 
-            # Deserialize kwargs
-            kwargs = {}
-            if self.kwargs_bytes:
-                try:
-                    kwargs = pickle.loads(self.kwargs_bytes)
-                except Exception as e:
-                    print(f"Failed to deserialize kwargs: {e}")
+            kwargs = json.loads(self.generator_args)
 
             # Check for pre-downloaded checkpoint in /root/
             checkpoint_path = f"/root/sam_{self.model_type}.pth"
@@ -116,3 +111,16 @@ if modal:
             masks = self.mask_generator.generate(image_np)
             # Masks contain boolean arrays which are serializable
             return masks
+
+        @modal.method()
+        def generate_masks_batch(self, encoded_images):
+            """Masks of a batch of PNG/WebP-encoded RGB images, one list per image."""
+            import cv2
+
+            results = []
+            for data in encoded_images:
+                image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+                image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+                print(f"Generating masks for image shape: {image.shape}")
+                results.append(self.mask_generator.generate(image))
+            return results
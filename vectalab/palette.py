@@ -0,0 +1,501 @@
+"""
+Vectalab Palette Engine.
+
+Palette extraction and memory-bounded nearest-color mapping used by the
+palette reduction code (premium.reduce_to_clean_palette,
+quality.reduce_to_palette, sota.quantize_colors_kmeans, bayesian.ColorPalette).
+
+Extraction
+----------
+Clustering every pixel is wasteful: logos have a few thousand unique colors
+across millions of pixels. extract_palette clusters the *unique* colors
+weighted by their pixel counts, which gives the same objective as pixel
+k-means at a fraction of the cost:
+
+- 'kmeans': weighted k-means++ initialization + weighted Lloyd iterations,
+  optionally in LAB space
+- 'median_cut': weighted median cut with Wu-style variance-minimizing
+  splits (fast, deterministic)
+
+Inputs with very many unique colors (photos) are first binned to 6 (or
+fewer) bits per channel, keeping the weighted mean color of each bin.
+
+Mapping
+-------
+
+Broadcasting every pixel against every palette color needs
+n_pixels * n_colors * 3 temporaries (~18 GB for a 24 MP image and a 64-color
+palette). Instead, RGB images go through a quantized 3-D lookup table:
+
+1. The RGB cube is split into 2^bits cells per axis (32^3 by default).
+2. For each cell, the palette colors that can be nearest to *any* point in
+   the cell are found from their closest / farthest distances to the cell.
+3. Cells with a single candidate map straight through the table; pixels in
+   the remaining boundary cells are resolved exactly in fixed-size chunks.
+
+The result is identical to a brute-force argmin over squared distances
+(ties go to the lowest palette index), and peak memory is O(pixels) with a
+small constant. Other channel counts (e.g. RGBA) use the exact chunked path.
+
+Usage:
+    from vectalab.palette import extract_palette, map_to_palette
+
+    palette = extract_palette(image_rgb, n_colors=16)
+    reduced = map_to_palette(image_rgb, palette)
+"""
+
+from typing import Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+# Default LUT resolution: 2^5 = 32 cells per axis (cells of 8 levels)
+DEFAULT_LUT_BITS = 5
+
+# Max elements of a (chunk, n_colors) distance block in the exact path
+CHUNK_ELEMENTS = 1 << 22
+
+# Unique colors above which colors are binned before clustering
+MAX_CLUSTER_COLORS = 1 << 16
+
+PaletteLike = Union[np.ndarray, Sequence[Sequence[int]]]
+
+
+def _as_palette(palette: PaletteLike) -> np.ndarray:
+    palette = np.asarray(palette)
+    if palette.ndim != 2 or len(palette) == 0:
+        raise ValueError("Palette must be a non-empty (n_colors, channels) array")
+    return palette
+
+
+def nearest_palette_indices(pixels: np.ndarray, palette: PaletteLike) -> np.ndarray:
+    """
+    Exact nearest palette index for each pixel, in fixed-size chunks.
+
+    Args:
+        pixels: Array [N, C] of pixel values
+        palette: Array [K, C] of palette colors
+
+    Returns:
+        int32 array [N] of palette indices
+    """
+    palette = _as_palette(palette).astype(np.float64)
+    pixels = np.asarray(pixels).reshape(-1, palette.shape[1])
+
+    # ||x - p||^2 = ||x||^2 - 2 x.p + ||p||^2; ||x||^2 does not change the argmin.
+    # Values are integers well below 2^53, so float64 arithmetic is exact.
+    palette_t = -2.0 * palette.T
+    palette_sq = np.einsum('ij,ij->i', palette, palette)
+
+    result = np.empty(len(pixels), dtype=np.int32)
+    chunk = max(1, CHUNK_ELEMENTS // len(palette))
+
+    for start in range(0, len(pixels), chunk):
+        block = pixels[start:start + chunk].astype(np.float64)
+        distances = block @ palette_t
+        distances += palette_sq
+        result[start:start + chunk] = np.argmin(distances, axis=1)
+
+    return result
+
+
+class PaletteLUT:
+    """
+    Nearest-palette-color lookup table over the RGB cube.
+
+    Attributes:
+        palette: Palette colors [K, 3]
+        bits: Cells per axis = 2^bits
+        table: Palette index per cell, or -1 for boundary cells that need
+               exact refinement
+    """
+
+    def __init__(self, palette: PaletteLike, bits: int = DEFAULT_LUT_BITS):
+        palette = _as_palette(palette)
+        if palette.shape[1] != 3:
+            raise ValueError("PaletteLUT requires an RGB palette")
+
+        self.palette = palette
+        self.bits = bits
+        self.table = self._build_table()
+
+    def _build_table(self) -> np.ndarray:
+        shift = 8 - self.bits
+        n = 1 << self.bits
+
+        # Integer bounds [lo, hi] of every cell
+        axis_lo = np.arange(n, dtype=np.float64) * (1 << shift)
+        lo = np.stack(np.meshgrid(axis_lo, axis_lo, axis_lo, indexing='ij'), axis=-1).reshape(-1, 3)
+        hi = lo + ((1 << shift) - 1)
+
+        palette = self.palette.astype(np.float64)
+        table = np.empty(len(lo), dtype=np.int32)
+        chunk = max(1, CHUNK_ELEMENTS // (3 * len(palette)))
+
+        for start in range(0, len(lo), chunk):
+            cell_lo = lo[start:start + chunk, np.newaxis, :]
+            cell_hi = hi[start:start + chunk, np.newaxis, :]
+
+            # Closest and farthest squared distance from each color to each cell
+            below = cell_lo - palette
+            above = palette - cell_hi
+            min_sq = (np.maximum(np.maximum(below, above), 0) ** 2).sum(axis=2)
+            max_sq = (np.maximum(np.abs(below), np.abs(palette - cell_hi)) ** 2).sum(axis=2)
+
+            # A color can be nearest somewhere in the cell only if its closest
+            # distance does not exceed the best guaranteed (farthest) distance
+            bound = max_sq.min(axis=1, keepdims=True)
+            n_candidates = (min_sq <= bound).sum(axis=1)
+
+            indices = np.argmin(max_sq, axis=1).astype(np.int32)
+            indices[n_candidates > 1] = -1
+            table[start:start + chunk] = indices
+
+        return table
+
+    def indices(self, image: np.ndarray) -> np.ndarray:
+        """
+        Nearest palette index for every pixel.
+
+        Args:
+            image: RGB uint8 image [..., 3]
+
+        Returns:
+            int32 array of shape image.shape[:-1]
+        """
+        pixels = image.reshape(-1, 3)
+        shift = 8 - self.bits
+
+        cells = (pixels[:, 0].astype(np.int32) >> shift) << (2 * self.bits)
+        cells |= (pixels[:, 1].astype(np.int32) >> shift) << self.bits
+        cells |= pixels[:, 2].astype(np.int32) >> shift
+
+        result = self.table[cells]
+        del cells
+
+        # Exact refinement for pixels in boundary cells
+        boundary = np.flatnonzero(result < 0)
+        if len(boundary):
+            result[boundary] = nearest_palette_indices(pixels[boundary], self.palette)
+
+        return result.reshape(image.shape[:-1])
+
+    def apply(self, image: np.ndarray) -> np.ndarray:
+        """Replace every pixel by its nearest palette color (uint8)."""
+        palette = np.clip(self.palette, 0, 255).astype(np.uint8)
+        return palette[self.indices(image)]
+
+
+def palette_indices(image: np.ndarray, palette: PaletteLike, bits: int = DEFAULT_LUT_BITS) -> np.ndarray:
+    """
+    Nearest palette index for every pixel of an image.
+
+    RGB uint8 images with more pixels than LUT cells use a PaletteLUT;
+    anything else (small or RGBA images) uses the exact chunked search.
+    Either way peak memory is O(pixels).
+
+    Args:
+        image: Image [H, W, C]
+        palette: Palette colors [K, C]
+        bits: LUT resolution for RGB images
+
+    Returns:
+        int32 array [H, W] of palette indices
+    """
+    palette = _as_palette(palette)
+    channels = image.shape[-1]
+    if palette.shape[1] != channels:
+        raise ValueError(f"Palette has {palette.shape[1]} channels, image has {channels}")
+
+    n_pixels = image.size // channels
+    if channels == 3 and image.dtype == np.uint8 and n_pixels >= 1 << (3 * bits):
+        return PaletteLUT(palette, bits).indices(image)
+
+    return nearest_palette_indices(image.reshape(-1, channels), palette).reshape(image.shape[:-1])
+
+
+def map_to_palette(image: np.ndarray, palette: PaletteLike, bits: int = DEFAULT_LUT_BITS) -> np.ndarray:
+    """
+    Map every pixel of an image to its nearest palette color.
+
+    Args:
+        image: Image [H, W, C]
+        palette: Palette colors [K, C]
+        bits: LUT resolution for RGB images
+
+    Returns:
+        uint8 image [H, W, C] containing only palette colors
+    """
+    palette = _as_palette(palette)
+    indices = palette_indices(image, palette, bits)
+    return np.clip(palette, 0, 255).astype(np.uint8)[indices]
+
+
+# ============================================================================
+# PALETTE EXTRACTION
+# ============================================================================
+
+def weighted_unique_colors(image: np.ndarray, mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Unique colors of a uint8 image and their pixel counts.
+
+    Up to 4 channels are packed into one uint32 key per pixel, so this is a
+    1-D np.unique rather than a row-wise one.
+
+    Args:
+        image: uint8 image [H, W, C] (C <= 4)
+        mask: Optional boolean mask [H, W] of pixels to count
+
+    Returns:
+        Tuple of (colors [U, C] uint8, counts [U] int64)
+    """
+    channels = image.shape[-1]
+    pixels = image.reshape(-1, channels)
+    if mask is not None:
+        pixels = pixels[np.asarray(mask, dtype=bool).ravel()]
+
+    if pixels.dtype != np.uint8 or channels > 4:
+        colors, counts = np.unique(pixels, axis=0, return_counts=True)
+        return colors, counts.astype(np.int64)
+
+    keys = np.zeros(len(pixels), dtype=np.uint32)
+    for c in range(channels):
+        keys |= pixels[:, c].astype(np.uint32) << (8 * (channels - 1 - c))
+
+    unique, counts = np.unique(keys, return_counts=True)
+    shifts = 8 * (channels - 1 - np.arange(channels, dtype=np.uint32))
+    colors = ((unique[:, np.newaxis] >> shifts) & 0xFF).astype(np.uint8)
+    return colors, counts.astype(np.int64)
+
+
+def _bin_colors(colors: np.ndarray, weights: np.ndarray, shift: int = 2) -> Tuple[np.ndarray, np.ndarray]:
+    """Merge colors that share their top (8 - shift) bits into their weighted mean."""
+    binned = colors.astype(np.int64) >> shift
+    keys = np.zeros(len(colors), dtype=np.int64)
+    for c in range(colors.shape[1]):
+        keys = (keys << (8 - shift)) | binned[:, c]
+
+    _, inverse = np.unique(keys, return_inverse=True)
+    inverse = inverse.ravel()
+    bin_weights = np.bincount(inverse, weights=weights).astype(np.float64)
+    means = np.stack(
+        [np.bincount(inverse, weights=weights * colors[:, c]) for c in range(colors.shape[1])],
+        axis=1,
+    ) / bin_weights[:, np.newaxis]
+    return means, bin_weights
+
+
+def _kmeans_plus_plus(points: np.ndarray, weights: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    """Weighted k-means++ seeding: P(x) proportional to w(x) * D(x)^2."""
+    centers = np.empty((k, points.shape[1]), dtype=np.float64)
+    centers[0] = points[rng.choice(len(points), p=weights / weights.sum())]
+    closest = ((points - centers[0]) ** 2).sum(axis=1)
+
+    for i in range(1, k):
+        scores = weights * closest
+        total = scores.sum()
+        if total <= 0:
+            centers[i:] = centers[0]
+            break
+        centers[i] = points[rng.choice(len(points), p=scores / total)]
+        closest = np.minimum(closest, ((points - centers[i]) ** 2).sum(axis=1))
+
+    return centers
+
+
+def weighted_kmeans(
+    points: np.ndarray,
+    weights: np.ndarray,
+    n_clusters: int,
+    max_iter: int = 100,
+    tol: float = 1e-3,
+    n_init: int = 3,
+    seed: int = 42,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    K-means on a weighted point set (e.g. unique colors weighted by count).
+
+    Args:
+        points: Points [N, D]
+        weights: Non-negative weights [N]
+        n_clusters: Number of clusters
+        max_iter: Maximum Lloyd iterations per run
+        tol: Stop when no center moves more than this
+        n_init: Number of k-means++ restarts (best weighted inertia wins)
+        seed: Random seed
+
+    Returns:
+        Tuple of (centers [K, D], labels [N])
+    """
+    points = np.asarray(points, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    n_clusters = min(n_clusters, len(points))
+    rng = np.random.default_rng(seed)
+
+    best = None
+    for _ in range(n_init):
+        centers = _kmeans_plus_plus(points, weights, n_clusters, rng)
+
+        for _ in range(max_iter):
+            labels = nearest_palette_indices(points, centers)
+            cluster_weights = np.bincount(labels, weights=weights, minlength=n_clusters)
+            sums = np.stack(
+                [np.bincount(labels, weights=weights * points[:, d], minlength=n_clusters)
+                 for d in range(points.shape[1])],
+                axis=1,
+            )
+
+            new_centers = centers.copy()
+            filled = cluster_weights > 0
+            new_centers[filled] = sums[filled] / cluster_weights[filled, np.newaxis]
+
+            # Re-seed empty clusters at the worst-represented point
+            if not filled.all():
+                errors = weights * ((points - new_centers[labels]) ** 2).sum(axis=1)
+                for i in np.flatnonzero(~filled):
+                    worst = int(np.argmax(errors))
+                    new_centers[i] = points[worst]
+                    errors[worst] = 0
+
+            shift = np.sqrt(((new_centers - centers) ** 2).sum(axis=1)).max()
+            centers = new_centers
+            if shift <= tol:
+                break
+
+        labels = nearest_palette_indices(points, centers)
+        inertia = float((weights * ((points - centers[labels]) ** 2).sum(axis=1)).sum())
+        if best is None or inertia < best[0]:
+            best = (inertia, centers, labels)
+
+    return best[1], best[2]
+
+
+def weighted_median_cut(points: np.ndarray, weights: np.ndarray, n_colors: int) -> np.ndarray:
+    """
+    Weighted median cut with variance-minimizing splits.
+
+    Repeatedly splits the box with the largest weighted squared error along
+    its widest channel. The cut position is the one that minimizes the summed
+    squared error of the two halves (Wu's criterion) rather than the plain
+    weighted median, so a large flat region is not split in two while a
+    smaller, distinct color gets merged into it.
+
+    Args:
+        points: Points [N, D]
+        weights: Weights [N]
+        n_colors: Number of boxes / colors
+
+    Returns:
+        Weighted mean of each box [K, D]
+    """
+    points = np.asarray(points, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+
+    def sse(box):
+        w = weights[box]
+        mean = (points[box] * w[:, np.newaxis]).sum(axis=0) / w.sum()
+        return float((w * ((points[box] - mean) ** 2).sum(axis=1)).sum())
+
+    boxes = [np.arange(len(points))]
+    scores = [sse(boxes[0])]
+    while len(boxes) < n_colors:
+        i = int(np.argmax(scores))
+        if scores[i] <= 0:
+            break
+
+        box = boxes[i]
+        box_points = points[box]
+        channel = int(np.argmax(box_points.max(axis=0) - box_points.min(axis=0)))
+        order = box[np.argsort(box_points[:, channel], kind='stable')]
+
+        # Squared error of every prefix / suffix split in one pass:
+        # SSE = sum(w * x^2) - sum(w * x)^2 / sum(w), summed over channels
+        w = weights[order]
+        wx = points[order] * w[:, np.newaxis]
+        wxx = (points[order] ** 2 * w[:, np.newaxis]).sum(axis=1)
+        cw, cwx, cwxx = np.cumsum(w), np.cumsum(wx, axis=0), np.cumsum(wxx)
+        left = cwxx[:-1] - (cwx[:-1] ** 2).sum(axis=1) / cw[:-1]
+        rw, rwx = cw[-1] - cw[:-1], cwx[-1] - cwx[:-1]
+        right = (cwxx[-1] - cwxx[:-1]) - (rwx ** 2).sum(axis=1) / np.maximum(rw, 1e-12)
+
+        # Only cut between distinct values of the split channel
+        values = points[order, channel]
+        cost = np.where(values[1:] > values[:-1], left + right, np.inf)
+        split = int(np.argmin(cost)) + 1
+
+        boxes[i:i + 1] = [order[:split], order[split:]]
+        scores[i:i + 1] = [sse(order[:split]), sse(order[split:])]
+
+    return np.stack([
+        (points[box] * weights[box, np.newaxis]).sum(axis=0) / weights[box].sum()
+        for box in boxes
+    ])
+
+
+def _rgb_to_lab(colors: np.ndarray) -> np.ndarray:
+    import cv2
+    rgb = (np.asarray(colors, dtype=np.float32) / 255.0).reshape(1, -1, 3)
+    return cv2.cvtColor(rgb, cv2.COLOR_RGB2LAB).reshape(-1, 3).astype(np.float64)
+
+
+def _lab_to_rgb(colors: np.ndarray) -> np.ndarray:
+    import cv2
+    lab = np.asarray(colors, dtype=np.float32).reshape(1, -1, 3)
+    return cv2.cvtColor(lab, cv2.COLOR_LAB2RGB).reshape(-1, 3).astype(np.float64) * 255.0
+
+
+def extract_palette(
+    image: np.ndarray,
+    n_colors: int = 16,
+    method: str = 'kmeans',
+    color_space: str = 'rgb',
+    mask: Optional[np.ndarray] = None,
+    n_init: int = 3,
+    seed: int = 42,
+) -> np.ndarray:
+    """
+    Extract a palette by clustering unique colors weighted by pixel count.
+
+    Args:
+        image: uint8 image [H, W, C] (RGB, or RGBA with color_space='rgb')
+        n_colors: Palette size
+        method: 'kmeans' (weighted k-means++) or 'median_cut' (fast)
+        color_space: 'rgb' or 'lab' (clustering space; RGB images only)
+        mask: Optional boolean mask [H, W] of pixels to consider
+        n_init: k-means restarts
+        seed: Random seed (results are deterministic for a given seed)
+
+    Returns:
+        Palette [K, C] as float64 in the image's channel order (K <= n_colors)
+    """
+    colors, counts = weighted_unique_colors(image, mask)
+
+    # Fewer unique colors than requested: the palette is exact
+    if len(colors) <= n_colors:
+        return colors.astype(np.float64)
+
+    points = colors.astype(np.float64)
+    weights = counts.astype(np.float64)
+    shift = 2
+    while len(points) > MAX_CLUSTER_COLORS and shift < 8:
+        points, weights = _bin_colors(colors, counts.astype(np.float64), shift)
+        shift += 1
+
+    use_lab = color_space == 'lab'
+    if use_lab:
+        if points.shape[1] != 3:
+            raise ValueError("LAB clustering requires an RGB image")
+        points = _rgb_to_lab(points)
+    elif color_space != 'rgb':
+        raise ValueError(f"Unknown color space: {color_space}")
+
+    if method == 'kmeans':
+        centers, _ = weighted_kmeans(points, weights, n_colors, n_init=n_init, seed=seed)
+    elif method == 'median_cut':
+        centers = weighted_median_cut(points, weights, n_colors)
+    else:
+        raise ValueError(f"Unknown palette method: {method}")
+
+    if use_lab:
+        centers = _lab_to_rgb(centers)
+
+    return np.clip(centers, 0, 255)
@@ -9,12 +9,19 @@ Metrics included:
 1. LPIPS (Learned Perceptual Image Patch Similarity)
 2. DISTS (Deep Image Structure and Texture Similarity)
 3. GMSD (Gradient Magnitude Similarity Deviation)
+
+Every metric has a batch variant (``calculate_lpips_batch`` etc.) that scores
+a list or stack of image pairs with one forward pass per batch. With
+``tile_size``, large images are split into tiles and scored by the
+area-weighted mean of the tile scores, which only approximates the
+whole-image score.
 """
 
 import numpy as np
 import torch
 import logging
-from typing import Optional, Union
+from collections import defaultdict
+from typing import Callable, List, Optional, Sequence, Tuple, Union
 from PIL import Image
 
 # Configure logging
@@ -24,14 +31,29 @@ logger = logging.getLogger(__name__)
 _LPIPS_MODEL = None
 _DISTS_MODEL = None
 _GMSD_MODEL = None
+_DEVICE = None
+
+# Batching defaults
+DEFAULT_BATCH_SIZE = 8
+# Memory cap: maximum pixels per image tensor in a single forward pass (pairs
+# larger than this are still scored whole, one per pass, unless tiled)
+DEFAULT_MAX_BATCH_PIXELS = 4 * 1024 * 1024
+
+ImageLike = Union[np.ndarray, Image.Image]
 
 def get_device():
-    """Get the best available device."""
+    """Get the best available device (detected once per process)."""
+    global _DEVICE
+    if _DEVICE is not None:
+        return _DEVICE
+
     if torch.cuda.is_available():
-        return 'cuda'
+        _DEVICE = 'cuda'
     elif torch.backends.mps.is_available():
-        return 'mps'
-    return 'cpu'
+        _DEVICE = 'mps'
+    else:
+        _DEVICE = 'cpu'
+    return _DEVICE
 
 def get_lpips_model(net: str = 'alex'):
     """
@@ -128,51 +150,231 @@ def preprocess_for_piq(img: Union[np.ndarray, Image.Image]) -> torch.Tensor:
     
     raise ValueError(f"Unsupported image type: {type(img)}")
 
-def calculate_dists(img1: Union[np.ndarray, Image.Image], 
-                   img2: Union[np.ndarray, Image.Image]) -> float:
+def get_dists_model():
     """
-    Calculate DISTS (Deep Image Structure and Texture Similarity).
-    Lower is better (0.0 means identical).
+    Get or initialize the DISTS model.
+
+    Returns:
+        piq DISTS instance (per-sample scores) or None if piq is missing.
     """
     global _DISTS_MODEL
+    if _DISTS_MODEL is not None:
+        return _DISTS_MODEL
+
     try:
         import piq
-        
-        if _DISTS_MODEL is None:
-            _DISTS_MODEL = piq.DISTS()
-            _DISTS_MODEL.to(get_device())
-            _DISTS_MODEL.eval()
-            
-        t1 = preprocess_for_piq(img1).to(get_device())
-        t2 = preprocess_for_piq(img2).to(get_device())
-        
-        with torch.no_grad():
-            score = _DISTS_MODEL(t1, t2)
-            
-        return float(score.item())
+        model = piq.DISTS(reduction='none')
+        model.to(get_device())
+        model.eval()
+        _DISTS_MODEL = model
+        return _DISTS_MODEL
     except ImportError:
         logger.warning("piq package not found. Install with 'pip install piq'.")
         return None
+
+# ============================================================================
+# BATCHING
+# ============================================================================
+
+def _to_rgb_array(img: ImageLike) -> np.ndarray:
+    """Convert an image to an RGB uint8 array (same conversions as the PIL path)."""
+    if isinstance(img, Image.Image):
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        return np.asarray(img)
+
+    if isinstance(img, np.ndarray):
+        if img.dtype != np.uint8:
+            # Assuming float 0-1
+            img = (img * 255).astype(np.uint8)
+        if img.ndim == 2:
+            return np.repeat(img[:, :, None], 3, axis=2)
+        if img.shape[2] == 4:
+            return img[:, :, :3]
+        return img
+
+    raise ValueError(f"Unsupported image type: {type(img)}")
+
+def _as_image_list(images: Union[ImageLike, Sequence[ImageLike]]) -> List[np.ndarray]:
+    """Accept a single image, a list of images or an (N, H, W, C) stack."""
+    if isinstance(images, Image.Image):
+        return [_to_rgb_array(images)]
+    if isinstance(images, np.ndarray) and images.ndim in (2, 3):
+        return [_to_rgb_array(images)]
+    return [_to_rgb_array(img) for img in images]
+
+def _as_pairs(refs, outs) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+    """Normalize inputs to equal-length lists; a single reference is broadcast."""
+    ref_list = _as_image_list(refs)
+    out_list = _as_image_list(outs)
+
+    if len(ref_list) == 1 and len(out_list) > 1:
+        ref_list = ref_list * len(out_list)
+    if len(ref_list) != len(out_list):
+        raise ValueError(f"Got {len(ref_list)} references for {len(out_list)} images")
+
+    for ref, out in zip(ref_list, out_list):
+        if ref.shape != out.shape:
+            raise ValueError(f"Image size mismatch: {ref.shape} vs {out.shape}")
+
+    return ref_list, out_list
+
+def _tile_origins(length: int, tile: int) -> List[Tuple[int, int]]:
+    """
+    Tile start offsets and the extent each tile adds to the coverage; the
+    last tile is shifted back so all tiles are full size.
+    """
+    if length <= tile:
+        return [(0, length)]
+    starts = list(range(0, length - tile, tile))
+    return [(start, tile) for start in starts] + [(length - tile, length - len(starts) * tile)]
+
+def _split_tiles(h: int, w: int, tile_size: int) -> List[Tuple[slice, slice, int]]:
+    """
+    Split an (h, w) image into equally sized tiles.
+
+    Returns:
+        (rows, cols, weight) per tile; weight is the number of pixels not
+        covered by an earlier tile, so overlapping strips count once
+    """
+    th, tw = min(tile_size, h), min(tile_size, w)
+    return [
+        (slice(y, y + th), slice(x, x + tw), dy * dx)
+        for y, dy in _tile_origins(h, th)
+        for x, dx in _tile_origins(w, tw)
+    ]
+
+def _to_batch_tensor(images: Sequence[np.ndarray], normalize: bool) -> torch.Tensor:
+    """Stack RGB uint8 arrays into one NCHW float tensor in [0, 1] (or [-1, 1])."""
+    batch = torch.from_numpy(np.stack(images)).permute(0, 3, 1, 2).contiguous().float().div(255)
+    if normalize:
+        batch = batch.sub(0.5).div(0.5)
+    return batch
+
+def _run_batched(
+    refs,
+    outs,
+    forward: Callable[[torch.Tensor, torch.Tensor], torch.Tensor],
+    device: Union[str, torch.device],
+    normalize: bool,
+    batch_size: int,
+    tile_size: Optional[int],
+    max_batch_pixels: int,
+) -> List[float]:
+    """
+    Score image pairs with one forward pass per batch.
+
+    Pairs are grouped by (tile) size so each pass gets a single NCHW tensor,
+    and a pass holds at most max_batch_pixels pixels per tensor (or one
+    larger pair). With tile_size, the score of a pair is the mean of its
+    tile scores weighted by the area each tile adds; this approximates the
+    whole-image score (for GMSD, a mean of per-tile deviations is not the
+    global deviation).
+    """
+    ref_list, out_list = _as_pairs(refs, outs)
+
+    # Expand pairs into work items (pair index, ref crop, out crop)
+    groups = defaultdict(list)
+    for idx, (ref, out) in enumerate(zip(ref_list, out_list)):
+        h, w = ref.shape[:2]
+        if tile_size is None:
+            groups[ref.shape].append((idx, ref, out, 1))
+        else:
+            for ys, xs, weight in _split_tiles(h, w, tile_size):
+                ref_tile, out_tile = ref[ys, xs], out[ys, xs]
+                groups[ref_tile.shape].append((idx, ref_tile, out_tile, weight))
+
+    sums = np.zeros(len(ref_list))
+    weights = np.zeros(len(ref_list))
+
+    with torch.inference_mode():
+        for shape, items in groups.items():
+            per_pass = max(1, min(batch_size, max_batch_pixels // (shape[0] * shape[1])))
+            for start in range(0, len(items), per_pass):
+                chunk = items[start:start + per_pass]
+                t1 = _to_batch_tensor([item[1] for item in chunk], normalize).to(device)
+                t2 = _to_batch_tensor([item[2] for item in chunk], normalize).to(device)
+
+                scores = forward(t1, t2).reshape(len(chunk), -1).mean(dim=1)
+                for (idx, _, _, weight), score in zip(chunk, scores.float().cpu().numpy()):
+                    sums[idx] += score * weight
+                    weights[idx] += weight
+
+    return [float(total / weight) for total, weight in zip(sums, weights)]
+
+def calculate_lpips_batch(refs: Union[ImageLike, Sequence[ImageLike]],
+                          outs: Union[ImageLike, Sequence[ImageLike]],
+                          net: str = 'alex',
+                          batch_size: int = DEFAULT_BATCH_SIZE,
+                          tile_size: Optional[int] = None,
+                          max_batch_pixels: int = DEFAULT_MAX_BATCH_PIXELS) -> Optional[List[float]]:
+    """
+    Calculate LPIPS distances for many image pairs.
+
+    Args:
+        refs: Reference images (list, (N, H, W, C) stack, or one image
+              broadcast against all outs)
+        outs: Distorted/vectorized images (list or stack)
+        net: Backbone network ('alex', 'vgg', 'squeeze')
+        batch_size: Maximum pairs per forward pass
+        tile_size: Split images into tiles of this size and score the
+                   area-weighted mean of the tiles, an approximation of the
+                   whole-image score (None = whole images)
+        max_batch_pixels: Memory cap on pixels per tensor in one forward pass
+
+    Returns:
+        List of LPIPS distances or None if model unavailable.
+    """
+    model = get_lpips_model(net)
+    if model is None:
+        return None
+
+    try:
+        device = next(model.parameters()).device
+        return _run_batched(refs, outs, model, device, True,
+                            batch_size, tile_size, max_batch_pixels)
+    except Exception as e:
+        logger.error(f"Error calculating LPIPS: {e}")
+        return None
+
+def calculate_dists_batch(refs: Union[ImageLike, Sequence[ImageLike]],
+                          outs: Union[ImageLike, Sequence[ImageLike]],
+                          batch_size: int = DEFAULT_BATCH_SIZE,
+                          tile_size: Optional[int] = None,
+                          max_batch_pixels: int = DEFAULT_MAX_BATCH_PIXELS) -> Optional[List[float]]:
+    """
+    Calculate DISTS for many image pairs.
+
+    See calculate_lpips_batch for arguments.
+    """
+    try:
+        model = get_dists_model()
+        if model is None:
+            return None
+        return _run_batched(refs, outs, model, get_device(), False,
+                            batch_size, tile_size, max_batch_pixels)
     except Exception as e:
         logger.error(f"Error calculating DISTS: {e}")
         return None
 
-def calculate_gmsd(img1: Union[np.ndarray, Image.Image], 
-                  img2: Union[np.ndarray, Image.Image]) -> float:
+def calculate_gmsd_batch(refs: Union[ImageLike, Sequence[ImageLike]],
+                         outs: Union[ImageLike, Sequence[ImageLike]],
+                         batch_size: int = DEFAULT_BATCH_SIZE,
+                         tile_size: Optional[int] = None,
+                         max_batch_pixels: int = DEFAULT_MAX_BATCH_PIXELS) -> Optional[List[float]]:
     """
-    Calculate GMSD (Gradient Magnitude Similarity Deviation).
-    Lower is better (0.0 means identical).
+    Calculate GMSD for many image pairs.
+
+    See calculate_lpips_batch for arguments.
     """
     try:
         import piq
-        
-        t1 = preprocess_for_piq(img1).to(get_device())
-        t2 = preprocess_for_piq(img2).to(get_device())
-        
-        with torch.no_grad():
-            score = piq.gmsd(t1, t2)
-            
-        return float(score.item())
+
+        def forward(t1, t2):
+            return piq.gmsd(t1, t2, reduction='none')
+
+        return _run_batched(refs, outs, forward, get_device(), False,
+                            batch_size, tile_size, max_batch_pixels)
     except ImportError:
         logger.warning("piq package not found. Install with 'pip install piq'.")
         return None
@@ -180,9 +382,40 @@ def calculate_gmsd(img1: Union[np.ndarray, Image.Image],
         logger.error(f"Error calculating GMSD: {e}")
         return None
 
+# ============================================================================
+# SINGLE PAIR
+# ============================================================================
+
+def calculate_dists(img1: Union[np.ndarray, Image.Image], 
+                   img2: Union[np.ndarray, Image.Image],
+                   tile_size: Optional[int] = None) -> float:
+    """
+    Calculate DISTS (Deep Image Structure and Texture Similarity).
+    Lower is better (0.0 means identical).
+
+    The whole image is scored in one pass unless tile_size is given (see
+    calculate_lpips_batch; tiled scores are an approximation).
+    """
+    scores = calculate_dists_batch([img1], [img2], tile_size=tile_size)
+    return None if scores is None else scores[0]
+
+def calculate_gmsd(img1: Union[np.ndarray, Image.Image], 
+                  img2: Union[np.ndarray, Image.Image],
+                  tile_size: Optional[int] = None) -> float:
+    """
+    Calculate GMSD (Gradient Magnitude Similarity Deviation).
+    Lower is better (0.0 means identical).
+
+    The whole image is scored in one pass unless tile_size is given (see
+    calculate_lpips_batch; tiled scores are an approximation).
+    """
+    scores = calculate_gmsd_batch([img1], [img2], tile_size=tile_size)
+    return None if scores is None else scores[0]
+
 def calculate_lpips(img1: Union[np.ndarray, Image.Image], 
                    img2: Union[np.ndarray, Image.Image],
-                   net: str = 'alex') -> float:
+                   net: str = 'alex',
+                   tile_size: Optional[int] = None) -> float:
     """
     Calculate LPIPS distance between two images.
     Lower is better (0.0 means identical).
@@ -191,29 +424,11 @@ def calculate_lpips(img1: Union[np.ndarray, Image.Image],
         img1: First image (Reference)
         img2: Second image (Distorted/Vectorized)
         net: Backbone network ('alex', 'vgg', 'squeeze')
+        tile_size: Score tiles of this size instead of the whole image
+            (an approximation; see calculate_lpips_batch)
         
     Returns:
         LPIPS distance (float) or None if model unavailable.
     """
-    model = get_lpips_model(net)
-    if model is None:
-        return None
-        
-    try:
-        # Preprocess images
-        t1 = preprocess_for_lpips(img1)
-        t2 = preprocess_for_lpips(img2)
-        
-        # Move tensors to same device as model
-        device = next(model.parameters()).device
-        t1 = t1.to(device)
-        t2 = t2.to(device)
-        
-        # Compute distance
-        with torch.no_grad():
-            dist = model(t1, t2)
-            
-        return float(dist.item())
-    except Exception as e:
-        logger.error(f"Error calculating LPIPS: {e}")
-        return None
+    scores = calculate_lpips_batch([img1], [img2], net=net, tile_size=tile_size)
+    return None if scores is None else scores[0]
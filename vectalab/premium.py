@@ -26,27 +26,12 @@ Usage:
 import numpy as np
 import cv2
 import re
-from PIL import Image
 from pathlib import Path
 from typing import Tuple, Dict, Any, Optional, List
 from collections import Counter
-import tempfile
-import os
 import xml.etree.ElementTree as ET
 
-# Try imports
-try:
-    import vtracer
-    VTRACER_AVAILABLE = True
-except ImportError:
-    VTRACER_AVAILABLE = False
-
-try:
-    import cairosvg
-    from io import BytesIO
-    CAIROSVG_AVAILABLE = True
-except ImportError:
-    CAIROSVG_AVAILABLE = False
+from vectalab.render import render_svg_to_array
 
 try:
     from skimage.metrics import structural_similarity as ssim
@@ -54,6 +39,10 @@ try:
 except ImportError:
     SKIMAGE_AVAILABLE = False
 
+from vectalab.vtrace import trace_array, VTRACER_AVAILABLE
+from vectalab.context import ImageContext
+from vectalab.palette import extract_palette, map_to_palette
+
 # Import 80/20 optimizations
 try:
     from vectalab.optimizations import (
@@ -96,21 +85,6 @@ COLOR_SNAP_THRESHOLD = 15
 # HELPER FUNCTIONS
 # ============================================================================
 
-def render_svg_to_array(svg_content: str, width: int, height: int) -> np.ndarray:
-    """Render SVG to numpy array."""
-    if not CAIROSVG_AVAILABLE:
-        raise ImportError("cairosvg required for rendering")
-    
-    png_data = cairosvg.svg2png(
-        bytestring=svg_content.encode('utf-8'),
-        output_width=width,
-        output_height=height
-    )
-    
-    img = Image.open(BytesIO(png_data)).convert('RGB')
-    return np.array(img)
-
-
 def compute_ssim(original: np.ndarray, rendered: np.ndarray) -> float:
     """Compute SSIM between two images."""
     if SKIMAGE_AVAILABLE:
@@ -245,6 +219,10 @@ def extract_dominant_colors(image: np.ndarray, n_colors: int = 16) -> List[Tuple
     """
     Extract dominant colors from image using K-means clustering.
     
+    Clusters the unique colors weighted by pixel count (see
+    vectalab.palette.extract_palette), so cost scales with the number of
+    distinct colors rather than the number of pixels.
+    
     Args:
         image: RGB image
         n_colors: Number of colors to extract
@@ -252,13 +230,7 @@ def extract_dominant_colors(image: np.ndarray, n_colors: int = 16) -> List[Tuple
     Returns:
         List of RGB color tuples
     """
-    pixels = image.reshape(-1, 3).astype(np.float32)
-    
-    # K-means clustering
-    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 200, 0.1)
-    _, labels, centers = cv2.kmeans(
-        pixels, n_colors, None, criteria, 10, cv2.KMEANS_PP_CENTERS
-    )
+    centers = np.round(extract_palette(image, n_colors))
     
     # Convert to int tuples
     colors = [tuple(int(c) for c in center) for center in centers]
@@ -271,7 +243,7 @@ def snap_colors_to_palette(
     palette: List[Tuple[int, int, int]],
 ) -> np.ndarray:
     """
-    Snap image colors to nearest palette color using FAST vectorized operations.
+    Snap image colors to nearest palette color (memory-bounded, see vectalab.palette).
     
     Args:
         image: RGB image
@@ -280,26 +252,9 @@ def snap_colors_to_palette(
     Returns:
         Image with colors snapped to palette
     """
-    h, w = image.shape[:2]
-    
-    # Convert palette to numpy array
-    palette_arr = np.array(palette, dtype=np.float32)
-    
-    # Reshape image to (h*w, 3) for efficient distance calculation
-    pixels = image.reshape(-1, 3).astype(np.float32)
-    
-    # Calculate distances using broadcasting: (n_pixels, 1, 3) - (1, n_colors, 3)
-    # This computes all pairwise distances at once
-    diff = pixels[:, np.newaxis, :] - palette_arr[np.newaxis, :, :]
-    distances = np.sqrt(np.sum(diff ** 2, axis=2))  # (n_pixels, n_colors)
-    
-    # Find nearest palette color for each pixel
-    nearest_idx = np.argmin(distances, axis=1)
-    
-    # Map to palette colors
-    result = palette_arr[nearest_idx].astype(np.uint8)
-    
-    return result.reshape(h, w, 3)
+    # Nearest-color lookup table: O(pixels) memory instead of an
+    # (n_pixels, n_colors, 3) distance tensor
+    return map_to_palette(image, np.array(palette, dtype=np.int32))
 
 
 def snap_color_to_standard(rgb: Tuple[int, int, int]) -> Tuple[int, int, int]:
@@ -461,6 +416,7 @@ def vectorize_premium(
     use_lab_metrics: bool = True,
     verbose: bool = True,
     vtracer_args: Optional[Dict[str, Any]] = None,
+    image_context: Optional[ImageContext] = None,
 ) -> Tuple[str, Dict[str, Any]]:
     """
     Premium quality vectorization with SOTA techniques.
@@ -489,6 +445,7 @@ def vectorize_premium(
         use_lab_metrics: Use LAB color space for quality metrics
         verbose: Print progress
         vtracer_args: Optional dictionary of low-level vtracer arguments to override defaults
+        image_context: Already decoded input (loaded from input_path if None)
         
     Returns:
         Tuple of (output_path, metrics_dict)
@@ -497,20 +454,9 @@ def vectorize_premium(
         raise ImportError("vtracer required")
     
     # Load image with transparency support
-    image = cv2.imread(input_path, cv2.IMREAD_UNCHANGED)
-    if image is None:
-        raise ValueError(f"Could not load image: {input_path}")
-    
-    # Handle alpha channel
-    alpha_channel = None
-    if image.ndim == 3 and image.shape[2] == 4:
-        alpha_channel = image[:, :, 3]
-        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGRA2RGB)
-    elif image.ndim == 3 and image.shape[2] == 3:
-        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-    else:
-        # Grayscale
-        image_rgb = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
+    image_context = ImageContext.resolve(input_path, image_context)
+    image_rgb = image_context.rgb
+    alpha_channel = image_context.alpha
         
     h, w = image_rgb.shape[:2]
     
@@ -533,8 +479,8 @@ def vectorize_premium(
         print(f"\n2️⃣  Color palette optimization...")
     
     # Analyze original colors
-    pixels = image_rgb.reshape(-1, 3)
-    unique_colors = len(np.unique(pixels, axis=0))
+    histogram = image_context.histogram
+    unique_colors = histogram.unique_count
     
     if verbose:
         print(f"   Original colors: {unique_colors:,}")
@@ -542,8 +488,7 @@ def vectorize_premium(
     # Determine palette size
     if n_colors is None:
         # Auto-detect based on image
-        color_counts = Counter(map(tuple, pixels))
-        top_10_coverage = sum(c for _, c in color_counts.most_common(10)) / len(pixels)
+        top_10_coverage = histogram.top_k_coverage(10)
         
         if top_10_coverage > 0.95:
             n_colors = 8
@@ -603,45 +548,13 @@ def vectorize_premium(
         if verbose:
             print(f"   Custom settings: {vtracer_args}")
     
-    # Save reduced image
-    with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp:
-        tmp_path = tmp.name
-        if alpha_channel is not None:
-            # Re-attach alpha channel
-            bgr = cv2.cvtColor(reduced, cv2.COLOR_RGB2BGR)
-            bgra = np.dstack((bgr, alpha_channel))
-            cv2.imwrite(tmp_path, bgra)
-        else:
-            cv2.imwrite(tmp_path, cv2.cvtColor(reduced, cv2.COLOR_RGB2BGR))
+    # Single-pass vectorization (FAST), traced in memory
+    best_svg = trace_array(reduced, alpha=alpha_channel, **settings)
+    best_settings = settings
     
-    try:
-        # Single-pass vectorization (FAST)
-        with tempfile.NamedTemporaryFile(suffix='.svg', delete=False) as tmp_svg:
-            tmp_svg_path = tmp_svg.name
-        
-        try:
-            vtracer.convert_image_to_svg_py(tmp_path, tmp_svg_path, **settings)
-            
-            with open(tmp_svg_path, 'r') as f:
-                best_svg = f.read()
-            
-            best_settings = settings
-            
-            if verbose:
-                path_count = count_svg_paths(best_svg)
-                print(f"   ✓ Generated {path_count} paths")
-                
-        finally:
-            try:
-                os.remove(tmp_svg_path)
-            except:
-                pass
-                    
-    finally:
-        try:
-            os.remove(tmp_path)
-        except:
-            pass
+    if verbose:
+        path_count = count_svg_paths(best_svg)
+        print(f"   ✓ Generated {path_count} paths")
     
     if best_svg is None:
         raise RuntimeError("Vectorization failed")
@@ -749,6 +662,7 @@ def vectorize_logo_premium(
     precision: int = 2,
     detect_shapes: bool = True,
     verbose: bool = True,
+    image_context: Optional[ImageContext] = None,
 ) -> Tuple[str, Dict[str, Any]]:
     """
     Premium logo vectorization - optimized for text and graphics.
@@ -773,6 +687,7 @@ def vectorize_logo_premium(
         detect_shapes=detect_shapes,
         use_lab_metrics=True,
         verbose=verbose,
+        image_context=image_context,
     )
 
 
@@ -783,6 +698,7 @@ def vectorize_photo_premium(
     use_svgo: bool = True,
     precision: int = 3,
     verbose: bool = True,
+    image_context: Optional[ImageContext] = None,
 ) -> Tuple[str, Dict[str, Any]]:
     """
     Premium photo vectorization - optimized for complex images.
@@ -812,6 +728,7 @@ def vectorize_photo_premium(
         use_lab_metrics=True,
         verbose=verbose,
         vtracer_args=vtracer_args,
+        image_context=image_context,
     )
 
 
@@ -18,32 +18,26 @@ import cv2
 from PIL import Image
 from pathlib import Path
 from typing import Tuple, Dict, Any, Optional
-import tempfile
+from functools import cached_property
 import os
 import xml.etree.ElementTree as ET
 import re
 
-# Try imports
-try:
-    import vtracer
-    VTRACER_AVAILABLE = True
-except ImportError:
-    VTRACER_AVAILABLE = False
-
-try:
-    import cairosvg
-    from io import BytesIO
-    CAIROSVG_AVAILABLE = True
-except ImportError:
-    CAIROSVG_AVAILABLE = False
+from vectalab.render import render_svg_to_array
 
 try:
     from skimage.metrics import structural_similarity as ssim
     from skimage import color as skimage_color
+    from scipy.ndimage import uniform_filter
     SKIMAGE_AVAILABLE = True
 except ImportError:
     SKIMAGE_AVAILABLE = False
 
+from vectalab.vtrace import trace_array
+from vectalab.colors import ColorHistogram
+from vectalab.context import ImageContext
+from vectalab.palette import extract_palette, map_to_palette
+
 try:
     from vectalab.perceptual import calculate_lpips, calculate_dists, calculate_gmsd
     LPIPS_AVAILABLE = True
@@ -91,21 +85,6 @@ def analyze_svg_content(svg_content: str) -> Dict[str, Any]:
         }
 
 
-def render_svg_to_array(svg_content: str, width: int, height: int, mode: str = 'RGB') -> np.ndarray:
-    """Render SVG to numpy array."""
-    if not CAIROSVG_AVAILABLE:
-        raise ImportError("cairosvg required for rendering")
-    
-    png_data = cairosvg.svg2png(
-        bytestring=svg_content.encode('utf-8'),
-        output_width=width,
-        output_height=height
-    )
-    
-    img = Image.open(BytesIO(png_data)).convert(mode)
-    return np.array(img)
-
-
 def calculate_topology_score(img1: np.ndarray, img2: np.ndarray) -> float:
     """Calculate topology score based on connected components and holes."""
     try:
@@ -226,32 +205,275 @@ def analyze_path_types(svg_path: str) -> Dict[str, Any]:
         return {"total": 0, "curves": 0, "lines": 0, "curve_fraction": 0}
 
 
-def compute_edge_similarity(img1: np.ndarray, img2: np.ndarray) -> float:
-    """
-    Compute edge similarity using dilated Canny edges.
-    Returns IoU of edges (0.0 to 1.0).
+# SSIM constants (match skimage.metrics.structural_similarity defaults)
+_SSIM_WIN_SIZE = 7
+_SSIM_K1 = 0.01
+_SSIM_K2 = 0.03
+_SSIM_DATA_RANGE = 255
+
+
+def _to_gray(img: np.ndarray) -> np.ndarray:
+    """Convert RGB image to grayscale (pass-through for 2-D input)."""
+    if img.ndim == 3:
+        return cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
+    return img
+
+
+def _edge_mask(gray: np.ndarray) -> np.ndarray:
+    """Canny edges dilated by 1px (allows small misalignment)."""
+    edges = cv2.Canny(gray, 100, 200)
+    kernel = np.ones((3, 3), np.uint8)
+    return cv2.dilate(edges, kernel, iterations=1) > 0
+
+
+def _topology_stats(gray: np.ndarray) -> Tuple[int, int]:
+    """Count connected components and holes of the Otsu-binarized image."""
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    
+    # Find contours with hierarchy to detect holes
+    # RETR_CCOMP organizes into two levels: components and holes
+    contours, hierarchy = cv2.findContours(binary, cv2.RETR_CCOMP, cv2.CHAIN_APPROX_SIMPLE)
+    
+    if hierarchy is None:
+        return 0, 0
+    
+    # hierarchy[0] is an array of shape (N, 4): [Next, Previous, First_Child, Parent]
+    # No parent -> External contour (Component), otherwise Internal contour (Hole)
+    num_components = int(np.sum(hierarchy[0][:, 3] == -1))
+    num_holes = len(hierarchy[0]) - num_components
+    
+    return num_components, num_holes
+
+
+def _ssim_stats(img: np.ndarray) -> Dict[str, np.ndarray]:
+    """Local mean / variance of an image as used by SSIM (per channel)."""
+    x = img.astype(np.float64)
+    size = (_SSIM_WIN_SIZE, _SSIM_WIN_SIZE, 1) if x.ndim == 3 else _SSIM_WIN_SIZE
+    ux = uniform_filter(x, size=size)
+    uxx = uniform_filter(x * x, size=size)
+    np_ = _SSIM_WIN_SIZE ** 2
+    cov_norm = np_ / (np_ - 1)
+    return {
+        'x': x,
+        'size': size,
+        'ux': ux,
+        'vx': cov_norm * (uxx - ux * ux),
+        'cov_norm': cov_norm,
+    }
+
+
+def _ssim_from_stats(ref: Dict[str, np.ndarray], img: np.ndarray) -> float:
+    """SSIM of img against precomputed reference statistics."""
+    y = img.astype(np.float64)
+    size = ref['size']
+    cov_norm = ref['cov_norm']
+    ux, vx = ref['ux'], ref['vx']
+    
+    uy = uniform_filter(y, size=size)
+    uyy = uniform_filter(y * y, size=size)
+    uxy = uniform_filter(ref['x'] * y, size=size)
+    vy = cov_norm * (uyy - uy * uy)
+    vxy = cov_norm * (uxy - ux * uy)
+    
+    c1 = (_SSIM_K1 * _SSIM_DATA_RANGE) ** 2
+    c2 = (_SSIM_K2 * _SSIM_DATA_RANGE) ** 2
+    s = ((2 * ux * uy + c1) * (2 * vxy + c2)) / ((ux ** 2 + uy ** 2 + c1) * (vx + vy + c2))
+    
+    pad = (_SSIM_WIN_SIZE - 1) // 2
+    s = s[pad:-pad, pad:-pad]
+    if s.ndim == 3:
+        # Mean over channels of per-channel mean SSIM
+        return float(np.mean([s[..., c].mean(dtype=np.float64) for c in range(s.shape[2])]))
+    return float(s.mean(dtype=np.float64))
+
+
+class MetricContext:
     """
-    # Convert to grayscale
-    g1 = cv2.cvtColor(img1, cv2.COLOR_RGB2GRAY)
-    g2 = cv2.cvtColor(img2, cv2.COLOR_RGB2GRAY)
+    Reference-side features of an original image, computed once.
+    
+    Iterative pipelines score several renders against the same original.
+    MetricContext caches everything that depends only on the original
+    (grayscale, dilated Canny edges, LAB, topology stats, the blurred copy
+    and the SSIM local means/variances) so each render only pays for its
+    own side of every metric.
     
-    # Canny edge detection (auto thresholds could be better but fixed is standard)
-    e1 = cv2.Canny(g1, 100, 200)
-    e2 = cv2.Canny(g2, 100, 200)
+    Features are computed lazily on first use.
     
-    # Dilate to allow small misalignment (1px tolerance)
-    kernel = np.ones((3,3), np.uint8)
-    e1_d = cv2.dilate(e1, kernel, iterations=1)
-    e2_d = cv2.dilate(e2, kernel, iterations=1)
+    Usage:
+        context = MetricContext(image_rgb)
+        for svg in candidates:
+            metrics = context.score(render_svg_to_array(svg, w, h))
+    """
     
-    # Compute overlap (IoU)
-    intersection = np.logical_and(e1_d > 0, e2_d > 0)
-    union = np.logical_or(e1_d > 0, e2_d > 0)
+    def __init__(self, original: np.ndarray):
+        self.original = original
+        self.height, self.width = original.shape[:2]
+    
+    @cached_property
+    def gray(self) -> np.ndarray:
+        return _to_gray(self.original)
+    
+    @cached_property
+    def edges(self) -> np.ndarray:
+        return _edge_mask(self.gray)
+    
+    @cached_property
+    def lab(self) -> np.ndarray:
+        return skimage_color.rgb2lab(self.original)
+    
+    @cached_property
+    def topology(self) -> Tuple[int, int]:
+        return _topology_stats(self.gray)
+    
+    @cached_property
+    def blurred(self) -> np.ndarray:
+        return cv2.GaussianBlur(self.original, (0, 0), 1.5)
+    
+    @cached_property
+    def ssim_stats(self) -> Dict[str, np.ndarray]:
+        return _ssim_stats(self.original)
+    
+    @cached_property
+    def blurred_ssim_stats(self) -> Dict[str, np.ndarray]:
+        return _ssim_stats(self.blurred)
+    
+    def _ssim_supported(self) -> bool:
+        return min(self.height, self.width) >= _SSIM_WIN_SIZE
+    
+    def ssim(self, rendered: np.ndarray) -> float:
+        """SSIM between original and rendered (same as skimage defaults)."""
+        if not SKIMAGE_AVAILABLE:
+            return 0.0
+        if not self._ssim_supported():
+            return ssim(self.original, rendered, channel_axis=2, data_range=255)
+        return _ssim_from_stats(self.ssim_stats, rendered)
+    
+    def ssim_perceptual(self, rendered: np.ndarray) -> float:
+        """SSIM of Gaussian-blurred (sigma=1.5) original and rendered."""
+        if not SKIMAGE_AVAILABLE:
+            return 0.0
+        rend_blur = cv2.GaussianBlur(rendered, (0, 0), 1.5)
+        if not self._ssim_supported():
+            return ssim(self.blurred, rend_blur, channel_axis=2, data_range=255)
+        return _ssim_from_stats(self.blurred_ssim_stats, rend_blur)
     
-    if np.sum(union) == 0:
-        return 1.0 # No edges in either
+    def edge_similarity(self, rendered: np.ndarray) -> float:
+        """IoU of dilated Canny edges (0.0 to 1.0)."""
+        e1 = self.edges
+        e2 = _edge_mask(_to_gray(rendered))
+        
+        union = np.sum(np.logical_or(e1, e2))
+        if union == 0:
+            return 1.0  # No edges in either
         
-    return np.sum(intersection) / np.sum(union)
+        return np.sum(np.logical_and(e1, e2)) / union
+    
+    def color_accuracy(self, rendered: np.ndarray) -> float:
+        """Average Delta E (CIE76). Lower is better."""
+        if not SKIMAGE_AVAILABLE:
+            return 0.0
+        try:
+            diff = self.lab - skimage_color.rgb2lab(rendered)
+            delta_e = np.sqrt(np.sum(diff**2, axis=2))
+            return float(np.mean(delta_e))
+        except Exception:
+            return 0.0
+    
+    def topology_preservation(self, rendered: np.ndarray) -> float:
+        """Component/hole count agreement (0.0 to 1.0)."""
+        c1, h1 = self.topology
+        c2, h2 = _topology_stats(_to_gray(rendered))
+        
+        # Calculate score based on relative error
+        max_c = max(c1, c2)
+        max_h = max(h1, h2)
+        
+        score_c = 1.0
+        if max_c > 0:
+            score_c = 1.0 - (abs(c1 - c2) / max_c)
+        elif c1 != c2:
+            score_c = 0.0
+        
+        score_h = 1.0
+        if max_h > 0:
+            score_h = 1.0 - (abs(h1 - h2) / max_h)
+        elif h1 != h2:
+            score_h = 0.0
+        
+        # Average the scores
+        return (score_c + score_h) / 2.0
+    
+    def score(self, rendered: np.ndarray) -> Dict[str, Any]:
+        """
+        Compute detailed pixel-by-pixel quality metrics for a render.
+        
+        Returns:
+            Dictionary with SSIM, PSNR, MAE, and problem pixel analysis
+        """
+        original = self.original
+        
+        # SSIM + Perceptual SSIM (Blurred)
+        # Blur removes high-frequency noise/pixelation to compare structural shapes
+        # Sigma=1.5 approximates the "softness" of human vision / anti-aliasing
+        ssim_value = self.ssim(rendered)
+        ssim_perceptual = self.ssim_perceptual(rendered)
+        
+        # Pixel differences
+        diff = np.abs(original.astype(float) - rendered.astype(float))
+        mae = np.mean(diff)
+        max_error = np.max(diff)
+        
+        # PSNR
+        mse = np.mean(diff ** 2)
+        if mse > 0:
+            psnr = 10 * np.log10(255 ** 2 / mse)
+        else:
+            psnr = float('inf')
+        
+        # Problem pixel analysis
+        diff_gray = np.mean(diff, axis=2)
+        problem_pixels_50 = np.sum(diff_gray > 50)
+        problem_pixels_100 = np.sum(diff_gray > 100)
+        total_pixels = self.height * self.width
+        
+        edge_sim = self.edge_similarity(rendered)
+        delta_e = self.color_accuracy(rendered)
+        topology = self.topology_preservation(rendered)
+        
+        # LPIPS, DISTS, GMSD
+        lpips_score = None
+        dists_score = None
+        gmsd_score = None
+        
+        if LPIPS_AVAILABLE:
+            lpips_score = calculate_lpips(original, rendered)
+            dists_score = calculate_dists(original, rendered)
+            gmsd_score = calculate_gmsd(original, rendered)
+        
+        return {
+            "ssim": ssim_value,
+            "ssim_perceptual": ssim_perceptual,
+            "edge_similarity": edge_sim,
+            "delta_e": delta_e,
+            "topology_score": topology,
+            "lpips": lpips_score,
+            "dists": dists_score,
+            "gmsd": gmsd_score,
+            "psnr": psnr,
+            "mae": mae,
+            "max_error": max_error,
+            "problem_pixels_50": problem_pixels_50,
+            "problem_pixels_100": problem_pixels_100,
+            "problem_ratio": problem_pixels_50 / total_pixels,
+        }
+
+
+def compute_edge_similarity(img1: np.ndarray, img2: np.ndarray) -> float:
+    """
+    Compute edge similarity using dilated Canny edges.
+    Returns IoU of edges (0.0 to 1.0).
+    """
+    return MetricContext(img1).edge_similarity(img2)
 
 
 def compute_color_accuracy(img1: np.ndarray, img2: np.ndarray) -> float:
@@ -259,21 +481,7 @@ def compute_color_accuracy(img1: np.ndarray, img2: np.ndarray) -> float:
     Compute average Delta E (CIE76) color difference.
     Lower is better. < 2.3 is barely noticeable.
     """
-    if not SKIMAGE_AVAILABLE:
-        return 0.0
-        
-    # Convert to LAB
-    try:
-        lab1 = skimage_color.rgb2lab(img1)
-        lab2 = skimage_color.rgb2lab(img2)
-        
-        # Delta E (CIE76)
-        diff = lab1 - lab2
-        delta_e = np.sqrt(np.sum(diff**2, axis=2))
-        
-        return float(np.mean(delta_e))
-    except Exception:
-        return 0.0
+    return MetricContext(img1).color_accuracy(img2)
 
 
 def compute_topology_preservation(img1: np.ndarray, img2: np.ndarray) -> float:
@@ -283,131 +491,29 @@ def compute_topology_preservation(img1: np.ndarray, img2: np.ndarray) -> float:
     
     This is critical for logos (e.g. preserving the hole in 'A' or 'B').
     """
-    def get_topology_stats(img):
-        if len(img.shape) == 3:
-            gray = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
-        else:
-            gray = img
-            
-        _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        
-        # Find contours with hierarchy to detect holes
-        # RETR_CCOMP organizes into two levels: components and holes
-        contours, hierarchy = cv2.findContours(binary, cv2.RETR_CCOMP, cv2.CHAIN_APPROX_SIMPLE)
-        
-        if hierarchy is None:
-            return 0, 0
-            
-        num_components = 0
-        num_holes = 0
-        
-        # Iterate through hierarchy
-        # hierarchy[0] is an array of shape (N, 4)
-        # [Next, Previous, First_Child, Parent]
-        for i, h in enumerate(hierarchy[0]):
-            # h[3] is parent index
-            if h[3] == -1:
-                # No parent -> External contour (Component)
-                num_components += 1
-            else:
-                # Has parent -> Internal contour (Hole)
-                num_holes += 1
-                
-        return num_components, num_holes
-
-    c1, h1 = get_topology_stats(img1)
-    c2, h2 = get_topology_stats(img2)
-    
-    # Calculate score based on relative error
-    max_c = max(c1, c2)
-    max_h = max(h1, h2)
-    
-    score_c = 1.0
-    if max_c > 0:
-        score_c = 1.0 - (abs(c1 - c2) / max_c)
-    elif c1 != c2:
-        score_c = 0.0
-        
-    score_h = 1.0
-    if max_h > 0:
-        score_h = 1.0 - (abs(h1 - h2) / max_h)
-    elif h1 != h2:
-        score_h = 0.0
-    
-    # Average the scores
-    return (score_c + score_h) / 2.0
+    return MetricContext(img1).topology_preservation(img2)
 
 
-def compute_pixel_metrics(original: np.ndarray, rendered: np.ndarray) -> Dict[str, Any]:
+def compute_pixel_metrics(
+    original: np.ndarray,
+    rendered: np.ndarray,
+    context: Optional[MetricContext] = None,
+) -> Dict[str, Any]:
     """
     Compute detailed pixel-by-pixel quality metrics.
     
+    Args:
+        original: Original RGB image
+        rendered: Rendered RGB image
+        context: Optional MetricContext for `original` to reuse
+            reference-side features across calls
+    
     Returns:
         Dictionary with SSIM, PSNR, MAE, and problem pixel analysis
     """
-    # SSIM
-    if SKIMAGE_AVAILABLE:
-        ssim_value = ssim(original, rendered, channel_axis=2, data_range=255)
-        
-        # Perceptual SSIM (Blurred)
-        # Blur removes high-frequency noise/pixelation to compare structural shapes
-        # Sigma=1.5 approximates the "softness" of human vision / anti-aliasing
-        orig_blur = cv2.GaussianBlur(original, (0, 0), 1.5)
-        rend_blur = cv2.GaussianBlur(rendered, (0, 0), 1.5)
-        ssim_perceptual = ssim(orig_blur, rend_blur, channel_axis=2, data_range=255)
-    else:
-        ssim_value = 0.0
-        ssim_perceptual = 0.0
-    
-    # Pixel differences
-    diff = np.abs(original.astype(float) - rendered.astype(float))
-    mae = np.mean(diff)
-    max_error = np.max(diff)
-    
-    # PSNR
-    mse = np.mean(diff ** 2)
-    if mse > 0:
-        psnr = 10 * np.log10(255 ** 2 / mse)
-    else:
-        psnr = float('inf')
-    
-    # Problem pixel analysis
-    diff_gray = np.mean(diff, axis=2)
-    problem_pixels_50 = np.sum(diff_gray > 50)
-    problem_pixels_100 = np.sum(diff_gray > 100)
-    total_pixels = original.shape[0] * original.shape[1]
-    
-    # New Metrics
-    edge_sim = compute_edge_similarity(original, rendered)
-    delta_e = compute_color_accuracy(original, rendered)
-    topology = compute_topology_preservation(original, rendered)
-    
-    # LPIPS, DISTS, GMSD
-    lpips_score = None
-    dists_score = None
-    gmsd_score = None
-    
-    if LPIPS_AVAILABLE:
-        lpips_score = calculate_lpips(original, rendered)
-        dists_score = calculate_dists(original, rendered)
-        gmsd_score = calculate_gmsd(original, rendered)
-
-    return {
-        "ssim": ssim_value,
-        "ssim_perceptual": ssim_perceptual,
-        "edge_similarity": edge_sim,
-        "delta_e": delta_e,
-        "topology_score": topology,
-        "lpips": lpips_score,
-        "dists": dists_score,
-        "gmsd": gmsd_score,
-        "psnr": psnr,
-        "mae": mae,
-        "max_error": max_error,
-        "problem_pixels_50": problem_pixels_50,
-        "problem_pixels_100": problem_pixels_100,
-        "problem_ratio": problem_pixels_50 / total_pixels,
-    }
+    if context is None:
+        context = MetricContext(original)
+    return context.score(rendered)
 
 
 def save_difference_map(original: np.ndarray, rendered: np.ndarray, output_path: str):
@@ -572,22 +678,19 @@ LOGO_DETECTION = {
 # IMAGE ANALYSIS & LOGO DETECTION
 # ============================================================================
 
-def analyze_image(image_rgb: np.ndarray) -> Dict[str, Any]:
-    """Analyze image to detect if it's a logo."""
+def analyze_image(image_rgb: np.ndarray, histogram: Optional[ColorHistogram] = None) -> Dict[str, Any]:
+    """Analyze image to detect if it's a logo (reuses histogram if given)."""
     h, w = image_rgb.shape[:2]
     total_pixels = h * w
     pixels = image_rgb.reshape(-1, 3)
     
-    # Count unique colors
-    unique_colors = len(np.unique(pixels, axis=0))
-    
     # Color distribution
-    from collections import Counter
-    color_counts = Counter(map(tuple, pixels))
+    if histogram is None:
+        histogram = ColorHistogram.from_image(image_rgb)
+    unique_colors = histogram.unique_count
     
     # Top N coverage
-    top_10 = sum(c for _, c in color_counts.most_common(10))
-    top_10_coverage = top_10 / total_pixels
+    top_10_coverage = histogram.top_k_coverage(10)
     
     # Color variance
     color_variance = np.std(pixels, axis=0).mean()
@@ -614,7 +717,8 @@ def reduce_to_palette(image: np.ndarray, n_colors: int = 16) -> np.ndarray:
     Reduce image to fixed color palette using K-means clustering.
     
     Uses K-means clustering which provides better color representation
-    than Median Cut for logos and graphics.
+    than Median Cut for logos and graphics. Clustering runs on the unique
+    colors weighted by pixel count (see vectalab.palette).
     
     Args:
         image: RGB or RGBA image
@@ -623,34 +727,11 @@ def reduce_to_palette(image: np.ndarray, n_colors: int = 16) -> np.ndarray:
     Returns:
         Image with reduced color palette
     """
-    # Reshape to list of pixels
-    channels = image.shape[2]
-    pixels = image.reshape((-1, channels))
-    pixels = np.float32(pixels)
-
-    # Define criteria = ( type, max_iter, epsilon )
-    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 100, 0.2)
-    
-    # Apply KMeans
-    # Use KMEANS_PP_CENTERS for better initialization
     try:
-        _, labels, centers = cv2.kmeans(
-            pixels, 
-            n_colors, 
-            None, 
-            criteria, 
-            10, 
-            cv2.KMEANS_PP_CENTERS
-        )
-        
-        # Convert back to 8 bit values
-        centers = np.uint8(centers)
+        centers = np.round(extract_palette(image, n_colors)).astype(np.uint8)
 
-        # Map labels to center values
-        res = centers[labels.flatten()]
-        
-        # Reshape back to original image
-        return res.reshape(image.shape)
+        # Map every pixel to its nearest 8-bit center (memory-bounded LUT)
+        return map_to_palette(image, centers)
         
     except Exception as e:
         # Fallback to PIL if KMeans fails (e.g. memory issues)
@@ -737,10 +818,13 @@ def vectorize_with_settings(
     output_path: str,
     settings: Dict[str, Any],
     denoise_strength: str = "light",
+    image_context: Optional[ImageContext] = None,
 ) -> Tuple[str, int]:
     """
     Vectorize image with specific settings.
     
+    The image is decoded from image_path unless image_context is given.
+    
     Returns:
         Tuple of (svg_content, path_count)
     """
@@ -748,45 +832,24 @@ def vectorize_with_settings(
         raise ImportError("vtracer required")
     
     # Load and optionally denoise
-    image = cv2.imread(image_path)
-    image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    image_rgb = ImageContext.resolve(image_path, image_context).rgb
     
     if denoise_strength != "none":
         processed = adaptive_denoise(image_rgb, denoise_strength)
     else:
         processed = image_rgb
     
-    # Save processed image temporarily
-    with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp:
-        tmp_path = tmp.name
-        cv2.imwrite(tmp_path, cv2.cvtColor(processed, cv2.COLOR_RGB2BGR))
+    # Vectorize in memory
+    svg_content = trace_array(processed, **settings)
     
-    # Vectorize
-    with tempfile.NamedTemporaryFile(suffix='.svg', delete=False) as tmp_svg:
-        tmp_svg_path = tmp_svg.name
+    # Count paths
+    path_count = svg_content.count('<path')
     
-    try:
-        vtracer.convert_image_to_svg_py(tmp_path, tmp_svg_path, **settings)
-        
-        with open(tmp_svg_path, 'r') as f:
-            svg_content = f.read()
-        
-        # Count paths
-        path_count = svg_content.count('<path')
-        
-        # Write to output
-        with open(output_path, 'w') as f:
-            f.write(svg_content)
-        
-        return svg_content, path_count
-        
-    finally:
-        # Cleanup
-        for p in [tmp_path, tmp_svg_path]:
-            try:
-                os.remove(p)
-            except:
-                pass
+    # Write to output
+    with open(output_path, 'w') as f:
+        f.write(svg_content)
+    
+    return svg_content, path_count
 
 
 def vectorize_quality(
@@ -796,6 +859,7 @@ def vectorize_quality(
     max_problem_ratio: float = 0.005,  # Max 0.5% problem pixels
     max_iterations: int = 5,
     verbose: bool = True,
+    image_context: Optional[ImageContext] = None,
 ) -> Tuple[str, Dict[str, Any]]:
     """
     Quality-first vectorization with pixel verification.
@@ -810,16 +874,14 @@ def vectorize_quality(
         max_problem_ratio: Maximum ratio of problem pixels (>50 error)
         max_iterations: Maximum refinement iterations
         verbose: Print progress
+        image_context: Already decoded input (loaded from input_path if None)
         
     Returns:
         Tuple of (output_path, metrics_dict)
     """
-    # Load original image
-    image = cv2.imread(input_path)
-    if image is None:
-        raise ValueError(f"Could not load image: {input_path}")
-    
-    image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    # Load original image (decoded once for all iterations)
+    image_context = ImageContext.resolve(input_path, image_context)
+    image_rgb = image_context.rgb
     h, w = image_rgb.shape[:2]
     
     if verbose:
@@ -833,6 +895,9 @@ def vectorize_quality(
     best_result = None
     best_ssim = 0
     
+    # Reference-side metric features are computed once for all iterations
+    context = MetricContext(image_rgb)
+    
     for iteration in range(max_iterations):
         # Select settings based on iteration
         quality_idx = min(iteration, len(quality_levels) - 1)
@@ -858,7 +923,7 @@ def vectorize_quality(
         
         # Vectorize
         svg_content, path_count = vectorize_with_settings(
-            input_path, output_path, settings, denoise
+            input_path, output_path, settings, denoise, image_context=image_context
         )
         
         if verbose:
@@ -867,7 +932,7 @@ def vectorize_quality(
         # Render and compare
         try:
             rendered = render_svg_to_array(svg_content, w, h)
-            metrics = compute_pixel_metrics(image_rgb, rendered)
+            metrics = compute_pixel_metrics(image_rgb, rendered, context=context)
             
             if verbose:
                 print(f"  SSIM: {metrics['ssim']*100:.2f}%")
@@ -934,6 +999,7 @@ def vectorize_logo_hq(
     input_path: str,
     output_path: str,
     verbose: bool = True,
+    image_context: Optional[ImageContext] = None,
 ) -> Tuple[str, Dict[str, Any]]:
     """
     High-quality logo vectorization.
@@ -947,6 +1013,7 @@ def vectorize_logo_hq(
         max_problem_ratio=0.005,
         max_iterations=5,
         verbose=verbose,
+        image_context=image_context,
     )
 
 
@@ -954,6 +1021,7 @@ def vectorize_optimal(
     input_path: str,
     output_path: str,
     verbose: bool = True,
+    image_context: Optional[ImageContext] = None,
 ) -> Tuple[str, Dict[str, Any]]:
     """
     Vectorize using the optimal settings found through testing.
@@ -965,6 +1033,7 @@ def vectorize_optimal(
         input_path: Path to input image
         output_path: Path for output SVG
         verbose: Print progress
+        image_context: Already decoded input (loaded from input_path if None)
         
     Returns:
         Tuple of (output_path, metrics_dict)
@@ -973,11 +1042,7 @@ def vectorize_optimal(
         raise ImportError("vtracer required")
     
     # Load image
-    image = cv2.imread(input_path)
-    if image is None:
-        raise ValueError(f"Could not load image: {input_path}")
-    
-    image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    image_rgb = ImageContext.resolve(input_path, image_context).rgb
     h, w = image_rgb.shape[:2]
     
     if verbose:
@@ -992,39 +1057,30 @@ def vectorize_optimal(
         sigmaSpace=OPTIMAL_BILATERAL['sigmaSpace']
     )
     
-    # Save processed image
-    with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp:
-        tmp_path = tmp.name
-        cv2.imwrite(tmp_path, cv2.cvtColor(processed, cv2.COLOR_RGB2BGR))
-    
     # Vectorize with optimal settings
     settings = QUALITY_PRESETS["optimal"]
     
-    try:
-        vtracer.convert_image_to_svg_py(tmp_path, output_path, **settings)
-        
-        with open(output_path, 'r') as f:
-            svg_content = f.read()
-        
-        # Compute metrics
-        rendered = render_svg_to_array(svg_content, w, h)
-        metrics = compute_pixel_metrics(image_rgb, rendered)
-        
-        # Add file stats
-        metrics['file_size'] = len(svg_content.encode('utf-8'))
-        metrics['path_count'] = svg_content.count('<path')
-        
-        if verbose:
-            print(f"\nResult:")
-            print(f"  SSIM: {metrics['ssim']*100:.2f}%")
-            print(f"  File size: {metrics['file_size']:,} bytes ({metrics['file_size']/1024:.1f} KB)")
-            print(f"  Paths: {metrics['path_count']}")
-            print(f"  Problem pixels: {metrics['problem_pixels_50']:,}")
-        
-        return output_path, metrics
-        
-    finally:
-        os.remove(tmp_path)
+    svg_content = trace_array(processed, **settings)
+    
+    with open(output_path, 'w') as f:
+        f.write(svg_content)
+    
+    # Compute metrics
+    rendered = render_svg_to_array(svg_content, w, h)
+    metrics = compute_pixel_metrics(image_rgb, rendered)
+    
+    # Add file stats
+    metrics['file_size'] = len(svg_content.encode('utf-8'))
+    metrics['path_count'] = svg_content.count('<path')
+    
+    if verbose:
+        print(f"\nResult:")
+        print(f"  SSIM: {metrics['ssim']*100:.2f}%")
+        print(f"  File size: {metrics['file_size']:,} bytes ({metrics['file_size']/1024:.1f} KB)")
+        print(f"  Paths: {metrics['path_count']}")
+        print(f"  Problem pixels: {metrics['problem_pixels_50']:,}")
+    
+    return output_path, metrics
 
 
 def vectorize_logo_clean(
@@ -1033,6 +1089,7 @@ def vectorize_logo_clean(
     n_colors: int = None,
     quality_preset: str = "balanced",
     verbose: bool = True,
+    image_context: Optional[ImageContext] = None,
 ) -> Tuple[str, Dict[str, Any]]:
     """
     Vectorize logo with automatic palette reduction for clean output.
@@ -1048,6 +1105,7 @@ def vectorize_logo_clean(
         n_colors: Force specific palette size (auto-detect if None)
         quality_preset: Quality preset (clean, balanced, high, ultra)
         verbose: Print progress
+        image_context: Already decoded input (loaded from input_path if None)
         
     Returns:
         Tuple of (output_path, metrics_dict)
@@ -1056,19 +1114,8 @@ def vectorize_logo_clean(
         raise ImportError("vtracer required")
     
     # Load image with alpha if present
-    image = cv2.imread(input_path, cv2.IMREAD_UNCHANGED)
-    if image is None:
-        raise ValueError(f"Could not load image: {input_path}")
-    
-    # Handle channels
-    if len(image.shape) == 2:  # Grayscale
-        image_rgb = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
-    elif image.shape[2] == 3:  # BGR
-        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-    elif image.shape[2] == 4:  # BGRA
-        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGRA2RGBA)
-    else:
-        image_rgb = image
+    image_context = ImageContext.resolve(input_path, image_context)
+    image_rgb = image_context.rgba if image_context.has_alpha else image_context.rgb
         
     h, w = image_rgb.shape[:2]
     
@@ -1100,10 +1147,7 @@ def vectorize_logo_clean(
         binary = np.ones((h, w), dtype=np.uint8) * 255
         binary[image_rgb[:,:,3] > 10] = 0
         
-        # Save binary
-        with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp:
-            tmp_path = tmp.name
-            cv2.imwrite(tmp_path, binary)
+        trace_input = binary
             
         if quality_preset not in LOGO_PRESETS:
             quality_preset = "balanced"
@@ -1115,10 +1159,8 @@ def vectorize_logo_clean(
         analysis = {'is_logo': True} # Fake analysis
         
     else:
-        # Analyze image (use RGB for analysis to keep it simple, or update analyze_image)
-        # For now, just use RGB part for analysis if RGBA
-        analysis_img = image_rgb[:,:,:3] if image_rgb.shape[2] == 4 else image_rgb
-        analysis = analyze_image(analysis_img)
+        # Analyze image (RGB part only if RGBA; cached on the context)
+        analysis = image_context.analysis
         
         if verbose:
             print(f"Input: {input_path} ({w}x{h}) Channels: {image_rgb.shape[2]}")
@@ -1147,15 +1189,7 @@ def vectorize_logo_clean(
             actual_colors = len(np.unique(reduced.reshape(-1, reduced.shape[2]), axis=0))
             print(f"Reduced to: {actual_colors} colors")
         
-        # Save reduced image
-        with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp:
-            tmp_path = tmp.name
-            # Convert back to BGR/BGRA for saving
-            if reduced.shape[2] == 4:
-                save_img = cv2.cvtColor(reduced, cv2.COLOR_RGBA2BGRA)
-            else:
-                save_img = cv2.cvtColor(reduced, cv2.COLOR_RGB2BGR)
-            cv2.imwrite(tmp_path, save_img)
+        trace_input = reduced
         
         # Settings optimized for palette-reduced images
         if quality_preset not in LOGO_PRESETS:
@@ -1167,79 +1201,72 @@ def vectorize_logo_clean(
         if verbose:
             print(f"Using quality preset: {quality_preset}")
     
-    try:
-        vtracer.convert_image_to_svg_py(tmp_path, output_path, **settings)
-        
-        with open(output_path, 'r') as f:
-            svg_content = f.read()
-            
-        # Fix color for monochrome alpha
-        if is_monochrome_alpha and mono_color is not None:
-            hex_color = "#{:02x}{:02x}{:02x}".format(*mono_color)
-            svg_content = svg_content.replace('fill="#000000"', f'fill="{hex_color}"')
-            with open(output_path, 'w') as f:
-                f.write(svg_content)
-        
-        # Compute metrics against original
-        # Render SVG to array (RGB) - cairosvg handles transparency by default (white bg?)
-        # We need to be careful with comparison.
-        # If original has alpha, and rendered has alpha?
-        # render_svg_to_array returns RGB (from PIL convert('RGB')).
-        # So it flattens alpha to black/white.
-        
-        # For metrics, we should probably compare RGB versions.
-        # If we loaded RGBA, let's convert to RGB for metrics to match render_svg_to_array
-        if image_rgb.shape[2] == 4:
-             # Composite over white for fair comparison if render_svg_to_array does that?
-             # Actually render_svg_to_array uses PIL convert('RGB') which puts on black background usually?
-             # Let's check render_svg_to_array implementation.
-             pass
-
-        rendered = render_svg_to_array(svg_content, w, h)
-        
-        # Convert original to RGB for comparison
-        if image_rgb.shape[2] == 4:
-             # Simple drop alpha for now, or composite?
-             # PIL convert('RGB') drops alpha (black background).
-             # So we should do same to original to match.
-             pil_img = Image.fromarray(image_rgb)
-             image_rgb_comp = np.array(pil_img.convert('RGB'))
-             
-             pil_reduced = Image.fromarray(reduced)
-             reduced_comp = np.array(pil_reduced.convert('RGB'))
-        else:
-             image_rgb_comp = image_rgb
-             reduced_comp = reduced
+    svg_content = trace_array(trace_input, **settings)
+    
+    # Fix color for monochrome alpha
+    if is_monochrome_alpha and mono_color is not None:
+        hex_color = "#{:02x}{:02x}{:02x}".format(*mono_color)
+        svg_content = svg_content.replace('fill="#000000"', f'fill="{hex_color}"')
+    
+    with open(output_path, 'w') as f:
+        f.write(svg_content)
+    
+    # Compute metrics against original
+    # Render SVG to array (RGB) - cairosvg handles transparency by default (white bg?)
+    # We need to be careful with comparison.
+    # If original has alpha, and rendered has alpha?
+    # render_svg_to_array returns RGB (from PIL convert('RGB')).
+    # So it flattens alpha to black/white.
+    
+    # For metrics, we should probably compare RGB versions.
+    # If we loaded RGBA, let's convert to RGB for metrics to match render_svg_to_array
+    if image_rgb.shape[2] == 4:
+         # Composite over white for fair comparison if render_svg_to_array does that?
+         # Actually render_svg_to_array uses PIL convert('RGB') which puts on black background usually?
+         # Let's check render_svg_to_array implementation.
+         pass
 
-        metrics = compute_pixel_metrics(image_rgb_comp, rendered)
-        
-        # Also compute vs reduced image
-        metrics_vs_reduced = compute_pixel_metrics(reduced_comp, rendered)
-        
-        # Analyze SVG complexity
-        svg_analysis = analyze_svg_content(svg_content)
-        
-        # Add file stats
-        metrics['file_size'] = len(svg_content.encode('utf-8'))
-        metrics['path_count'] = svg_analysis['path_count']
-        metrics['total_segments'] = svg_analysis['total_segments']
-        metrics['palette_size'] = n_colors
-        metrics['is_logo'] = analysis['is_logo']
-        metrics['ssim_vs_reduced'] = metrics_vs_reduced['ssim']
-        
-        if verbose:
-            print(f"\nResult:")
-            print(f"  SSIM vs original: {metrics['ssim']*100:.2f}%")
-            print(f"  Perceptual SSIM:  {metrics['ssim_perceptual']*100:.2f}%")
-            print(f"  SSIM vs reduced:  {metrics['ssim_vs_reduced']*100:.2f}%")
-            print(f"  File size: {metrics['file_size']:,} bytes ({metrics['file_size']/1024:.1f} KB)")
-            print(f"  Paths: {metrics['path_count']}")
-            print(f"  Segments: {metrics['total_segments']}")
-        
-        return output_path, metrics
-        
-    finally:
-        os.remove(tmp_path)
+    rendered = render_svg_to_array(svg_content, w, h)
+    
+    # Convert original to RGB for comparison
+    if image_rgb.shape[2] == 4:
+         # Simple drop alpha for now, or composite?
+         # PIL convert('RGB') drops alpha (black background).
+         # So we should do same to original to match.
+         image_rgb_comp = image_context.rgb
+         
+         pil_reduced = Image.fromarray(reduced)
+         reduced_comp = np.array(pil_reduced.convert('RGB'))
+    else:
+         image_rgb_comp = image_rgb
+         reduced_comp = reduced
+
+    metrics = compute_pixel_metrics(image_rgb_comp, rendered)
+    
+    # Also compute vs reduced image
+    metrics_vs_reduced = compute_pixel_metrics(reduced_comp, rendered)
+    
+    # Analyze SVG complexity
+    svg_analysis = analyze_svg_content(svg_content)
+    
+    # Add file stats
+    metrics['file_size'] = len(svg_content.encode('utf-8'))
+    metrics['path_count'] = svg_analysis['path_count']
+    metrics['total_segments'] = svg_analysis['total_segments']
+    metrics['palette_size'] = n_colors
+    metrics['is_logo'] = analysis['is_logo']
+    metrics['ssim_vs_reduced'] = metrics_vs_reduced['ssim']
+    
+    if verbose:
+        print(f"\nResult:")
+        print(f"  SSIM vs original: {metrics['ssim']*100:.2f}%")
+        print(f"  Perceptual SSIM:  {metrics['ssim_perceptual']*100:.2f}%")
+        print(f"  SSIM vs reduced:  {metrics['ssim_vs_reduced']*100:.2f}%")
+        print(f"  File size: {metrics['file_size']:,} bytes ({metrics['file_size']/1024:.1f} KB)")
+        print(f"  Paths: {metrics['path_count']}")
+        print(f"  Segments: {metrics['total_segments']}")
+    
+    return output_path, metrics
 
 
 def compare_and_visualize(
@@ -1247,6 +1274,7 @@ def compare_and_visualize(
     svg_path: str,
     output_dir: str = None,
     verbose: bool = True,
+    image_context: Optional[ImageContext] = None,
 ) -> Dict[str, Any]:
     """
     Compare original image with SVG and create visualizations.
@@ -1256,13 +1284,13 @@ def compare_and_visualize(
         svg_path: Path to SVG file
         output_dir: Directory for output files (default: same as SVG)
         verbose: Print progress
+        image_context: Already decoded original (loaded from original_path if None)
         
     Returns:
         Dictionary with comparison metrics
     """
     # Load original
-    original = cv2.imread(original_path)
-    original_rgb = cv2.cvtColor(original, cv2.COLOR_BGR2RGB)
+    original_rgb = ImageContext.resolve(original_path, image_context).rgb
     h, w = original_rgb.shape[:2]
     
     # Load and render SVG
@@ -1312,13 +1340,18 @@ def compare_and_visualize(
     return metrics
 
 
-def calculate_full_metrics(input_path: str, output_path: str) -> Dict[str, Any]:
+def calculate_full_metrics(
+    input_path: str,
+    output_path: str,
+    image_context: Optional[ImageContext] = None,
+) -> Dict[str, Any]:
     """
     Calculate comprehensive metrics for the conversion.
     
     Args:
         input_path: Path to original raster image
         output_path: Path to generated SVG
+        image_context: Already decoded input (loaded from input_path if None)
         
     Returns:
         Dictionary containing SSIM, Topology, Edge Accuracy, Delta E,
@@ -1326,19 +1359,15 @@ def calculate_full_metrics(input_path: str, output_path: str) -> Dict[str, Any]:
     """
     try:
         # Load input
-        img_ref = cv2.imread(str(input_path), cv2.IMREAD_UNCHANGED)
-        if img_ref is None: 
-            return {"error": f"Could not load input image: {input_path}"}
+        if image_context is None:
+            try:
+                image_context = ImageContext.load(input_path)
+            except ValueError:
+                return {"error": f"Could not load input image: {input_path}"}
         
         # Handle alpha
-        has_alpha = False
-        if img_ref.ndim == 3 and img_ref.shape[2] == 4:
-            has_alpha = True
-            img_ref = cv2.cvtColor(img_ref, cv2.COLOR_BGRA2RGBA)
-        elif img_ref.ndim == 3 and img_ref.shape[2] == 3:
-            img_ref = cv2.cvtColor(img_ref, cv2.COLOR_BGR2RGB)
-        else:
-            img_ref = cv2.cvtColor(img_ref, cv2.COLOR_GRAY2RGB)
+        has_alpha = image_context.has_alpha
+        img_ref = image_context.rgba if has_alpha else image_context.rgb
         
         # Render output SVG
         h, w = img_ref.shape[:2]
@@ -0,0 +1,211 @@
+"""
+Vectalab SVG Rasterization.
+
+Single SVG → NumPy renderer shared by all pipelines and metrics code, backed
+by a bounded LRU cache. The same SVG string is typically rasterized several
+times per conversion (final metrics, "vs reduced" metrics, CLI metrics, the
+auto-mode LPIPS feedback loop); with the cache cairosvg only runs once per
+(content, size, mode, scale).
+
+Cached arrays are marked read-only so callers cannot corrupt each other's
+results. Use ``.copy()`` before modifying a render in place.
+
+Usage:
+    from vectalab.render import render_svg_to_array, render_cache_info
+
+    rendered = render_svg_to_array(svg_content, width, height)
+    print(render_cache_info())  # {'hits': ..., 'misses': ..., ...}
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+try:
+    import cairosvg
+    CAIROSVG_AVAILABLE = True
+except ImportError:
+    CAIROSVG_AVAILABLE = False
+
+
+# Default cache bounds: a 1024x1024 RGBA render is 4 MB
+DEFAULT_MAX_ENTRIES = 32
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class RenderCache:
+    """
+    Thread-safe LRU cache of rasterized SVGs.
+
+    Keys are (svg digest, width, height, mode, scale); values are read-only
+    NumPy arrays. Bounded both by entry count and total array bytes.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(svg_content: str, width: int, height: int, mode: str, scale: int) -> Tuple:
+        """Build a cache key from SVG content and render parameters."""
+        digest = hashlib.blake2b(svg_content.encode('utf-8'), digest_size=16).hexdigest()
+        return (digest, int(width), int(height), mode, int(scale))
+
+    def get(self, key: Tuple) -> Optional[np.ndarray]:
+        """Return cached array (and mark as recently used) or None."""
+        with self._lock:
+            array = self._entries.get(key)
+            if array is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return array
+
+    def put(self, key: Tuple, array: np.ndarray) -> np.ndarray:
+        """Store a read-only view of array, evicting least recently used entries."""
+        array.setflags(write=False)
+
+        with self._lock:
+            if key in self._entries:
+                return self._entries[key]
+
+            # Arrays larger than the whole budget are returned uncached
+            if self.max_entries <= 0 or array.nbytes > self.max_bytes:
+                return array
+
+            self._entries[key] = array
+            self._bytes += array.nbytes
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+        return array
+
+    def clear(self):
+        """Drop all entries and reset counters."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> Dict[str, Any]:
+        """Return cache statistics."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+            }
+
+
+# Process-level cache instance
+_RENDER_CACHE = RenderCache()
+
+
+def get_render_cache() -> RenderCache:
+    """Get the process-level render cache."""
+    return _RENDER_CACHE
+
+
+def render_cache_info() -> Dict[str, Any]:
+    """Return hit/miss counters and size of the process-level render cache."""
+    return _RENDER_CACHE.info()
+
+
+def clear_render_cache():
+    """Clear the process-level render cache."""
+    _RENDER_CACHE.clear()
+
+
+def _rasterize(svg_content: str, width: int, height: int, mode: str, scale: int) -> np.ndarray:
+    """Rasterize with cairosvg (no caching)."""
+    if not CAIROSVG_AVAILABLE:
+        raise ImportError("cairosvg required for rendering")
+
+    png_data = cairosvg.svg2png(
+        bytestring=svg_content.encode('utf-8'),
+        output_width=width * scale,
+        output_height=height * scale
+    )
+
+    rendered = np.array(Image.open(BytesIO(png_data)).convert(mode))
+
+    if scale > 1:
+        rendered = cv2.resize(rendered, (width, height), interpolation=cv2.INTER_AREA)
+
+    return rendered
+
+
+def render_svg_to_array(
+    svg_content: str,
+    width: int,
+    height: int,
+    mode: str = 'RGB',
+    scale: int = 1,
+    use_cache: bool = True,
+) -> np.ndarray:
+    """
+    Render SVG content to a NumPy array.
+
+    Args:
+        svg_content: SVG content string
+        width: Target width
+        height: Target height
+        mode: PIL mode of the result ('RGB', 'RGBA', 'L')
+        scale: Supersampling scale (render at higher res then downsample)
+        use_cache: Look up / store the result in the process-level LRU cache
+
+    Returns:
+        Read-only array [H, W, C] (or [H, W] for mode 'L')
+    """
+    if not use_cache:
+        return _rasterize(svg_content, width, height, mode, scale)
+
+    key = RenderCache.make_key(svg_content, width, height, mode, scale)
+    cached = _RENDER_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    return _RENDER_CACHE.put(key, _rasterize(svg_content, width, height, mode, scale))
+
+
+def render_svg_file_to_array(
+    svg_path: str,
+    width: int,
+    height: int,
+    mode: str = 'RGB',
+    scale: int = 1,
+) -> np.ndarray:
+    """
+    Render an SVG file to a NumPy array (cached by file content).
+
+    Args:
+        svg_path: Path to SVG file
+        width: Target width
+        height: Target height
+        mode: PIL mode of the result
+        scale: Supersampling scale
+
+    Returns:
+        Read-only array [H, W, C]
+    """
+    with open(svg_path, 'r', encoding='utf-8') as f:
+        svg_content = f.read()
+    return render_svg_to_array(svg_content, width, height, mode=mode, scale=scale)
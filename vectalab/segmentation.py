@@ -1,32 +1,210 @@
+import base64
+import gzip
+import hashlib
+import http.client
+import json
 import os
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
 import torch
 import numpy as np
 import cv2
 from segment_anything import sam_model_registry, SamAutomaticMaskGenerator
 
-class SAMSegmenter:
-    def __init__(self, model_type="vit_h", checkpoint_path=None, device="cpu", use_modal=False, **kwargs):
-        self.device = device
-        self.model_type = model_type
-        self.use_modal = use_modal
-        
-        if self.use_modal:
-            try:
-                from .modal_sam import app, ModalSAM
-                self.app = app
-                self.ModalSAM = ModalSAM
-                self.kwargs = kwargs
-                print("Initialized SAM with Modal backend.")
-                return
-            except ImportError:
-                print("Warning: Modal not found or import failed. Falling back to local execution.")
-                self.use_modal = False
+from .masks import CompactMask, as_compact
+
+# Default SamAutomaticMaskGenerator parameters (also used by modal_sam)
+DEFAULT_GENERATOR_ARGS = {
+    "points_per_side": 32,
+    "pred_iou_thresh": 0.86,
+    "stability_score_thresh": 0.92,
+    "crop_n_layers": 1,
+    "crop_n_points_downscale_factor": 2,
+    "min_mask_region_area": 100,
+}
+
+# Process-level pool of loaded SAM models keyed by (model_type, checkpoint, device)
+_MODEL_POOL = {}
+_MODEL_POOL_LOCK = threading.Lock()
+
+
+def get_sam_model(model_type, checkpoint_path, device):
+    """
+    Return the SAM model for (model_type, checkpoint_path, device), loading
+    it on first use. Segmenters share the returned module, so constructing
+    several of them only reads the multi-GB checkpoint once.
+    """
+    key = (model_type, os.path.abspath(checkpoint_path), str(device))
+    with _MODEL_POOL_LOCK:
+        sam = _MODEL_POOL.get(key)
+        if sam is None:
+            print(f"Loading SAM model ({model_type}) from {checkpoint_path} to {device}...")
+            sam = sam_model_registry[model_type](checkpoint=checkpoint_path)
+            sam.to(device=device)
+            _MODEL_POOL[key] = sam
+        return sam
+
+
+def clear_model_pool():
+    """Drop all pooled SAM models (frees their memory once unreferenced)."""
+    with _MODEL_POOL_LOCK:
+        _MODEL_POOL.clear()
+
+
+class MaskCache:
+    """
+    On-disk cache of SAM masks keyed by image digest and generator settings.
+
+    Each entry is one compressed .npz file: the compact segmentations
+    (bounding boxes and bit-packed crops), the remaining mask fields as JSON.
+    Entries are written atomically, and unreadable ones count as misses.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = str(cache_dir)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(image, model_type, generator_args):
+        """Digest of the image pixels, model type and generator arguments."""
+        image = np.ascontiguousarray(image)
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{image.shape}{image.dtype}".encode('utf-8'))
+        digest.update(image.tobytes())
+        settings = {'model_type': model_type, **generator_args}
+        digest.update(json.dumps(settings, sort_keys=True, default=str).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def get(self, key):
+        """Cached list of mask dicts, or None."""
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                shapes, bboxes, areas = data['shapes'], data['bboxes'], data['areas']
+                bits = np.split(data['bits'], np.cumsum(data['sizes'])[:-1])
+                fields = json.loads(str(data['fields']))
+        except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+            return None
+
+        return [
+            dict(f, segmentation=CompactMask(shape, bbox, mask_bits, area))
+            for f, shape, bbox, mask_bits, area in zip(fields, shapes, bboxes, bits, areas)
+        ]
+
+    def put(self, key, masks):
+        """Store masks (SAM mask dicts; 'segmentation' in any form as_compact accepts)."""
+        segmentations = [as_compact(m['segmentation']) for m in masks]
+        fields = [{k: v for k, v in m.items() if k != 'segmentation'} for m in masks]
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez_compressed(
+                    f,
+                    shapes=np.array([m.shape for m in segmentations], dtype=np.int64).reshape(-1, 2),
+                    bboxes=np.array([m.bbox for m in segmentations], dtype=np.int64).reshape(-1, 4),
+                    areas=np.array([m.area for m in segmentations], dtype=np.int64),
+                    sizes=np.array([m.bits.size for m in segmentations], dtype=np.int64),
+                    bits=np.concatenate([m.bits for m in segmentations] + [np.zeros(0, np.uint8)]),
+                    fields=np.array(json.dumps(fields, default=_json_default)),
+                )
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
 
+def _json_default(value):
+    """JSON encoding of the NumPy values found in SAM mask dicts."""
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def encode_image(image, image_format="png"):
+    """
+    Losslessly compress an RGB or RGBA uint8 image to PNG or WebP bytes
+    (WebP does not keep the color of fully transparent pixels).
+    """
+    extensions = {"png": ".png", "webp": ".webp"}
+    if image_format not in extensions:
+        raise ValueError(f"Unknown image format: {image_format}")
+    if image.ndim == 3 and image.shape[2] == 4:
+        image = cv2.cvtColor(image, cv2.COLOR_RGBA2BGRA)
+    elif image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+    # WebP quality above 100 selects lossless mode
+    params = [cv2.IMWRITE_WEBP_QUALITY, 101] if image_format == "webp" else [cv2.IMWRITE_PNG_COMPRESSION, 1]
+    ok, buffer = cv2.imencode(extensions[image_format], image, params)
+    if not ok:
+        raise ValueError(f"Could not encode image as {image_format}")
+    return buffer.tobytes()
+
+
+def decode_image(data):
+    """Inverse of encode_image."""
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+    if image is None:
+        raise ValueError("Could not decode image")
+    if image.ndim == 3 and image.shape[2] == 4:
+        return cv2.cvtColor(image, cv2.COLOR_BGRA2RGBA)
+    if image.ndim == 3:
+        return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    return image
+
+
+def masks_to_wire(masks):
+    """JSON-serializable copy of SAM mask dicts with RLE segmentations."""
+    wire = []
+    for m in masks:
+        segmentation = m['segmentation']
+        if not isinstance(segmentation, dict):
+            segmentation = as_compact(segmentation).to_rle()
+        wire.append(dict(m, segmentation=segmentation))
+    return json.loads(json.dumps(wire, default=_json_default))
+
+
+class SegmentationBackend:
+    """
+    Where SAM masks are generated.
+
+    segment_batch() takes a list of RGB images and returns, per image, a
+    list of SAM mask dicts whose 'segmentation' is an uncompressed RLE
+    dict, a dense array or a CompactMask. Backends hold their model or
+    connections until close(); they can be used as context managers.
+    """
+
+    # Distinguishes cached masks of backends that may run different models
+    model_id = None
+
+    def segment_batch(self, images, generator_args):
+        raise NotImplementedError
+
+    def close(self):
+        """Release the model session or connections."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class LocalBackend(SegmentationBackend):
+    """SAM in this process, on a model from the process-level pool."""
+
+    def __init__(self, model_type="vit_h", checkpoint_path=None, device="cpu"):
+        self.model_type = model_type
+        self.model_id = model_type
         self.checkpoint_path = checkpoint_path or self._get_default_checkpoint_path(model_type)
-        
-        if not os.path.exists(self.checkpoint_path):
-            print(f"Checkpoint not found at {self.checkpoint_path}. Downloading...")
-            self._download_checkpoint(model_type, self.checkpoint_path)
 
         # Validate device
         if device == 'cuda' and not torch.cuda.is_available():
@@ -35,29 +213,40 @@ class SAMSegmenter:
         elif device == 'mps' and not (hasattr(torch.backends, 'mps') and torch.backends.mps.is_available()):
             print("Warning: MPS requested but not available. Falling back to CPU.")
             device = 'cpu'
+        self.device = device
 
-        print(f"Loading SAM model ({model_type}) from {self.checkpoint_path} to {device}...")
-        self.sam = sam_model_registry[model_type](checkpoint=self.checkpoint_path)
-        self.sam.to(device=device)
-        
-        # Default parameters
-        generator_args = {
-            "points_per_side": 32,
-            "pred_iou_thresh": 0.86,
-            "stability_score_thresh": 0.92,
-            "crop_n_layers": 1,
-            "crop_n_points_downscale_factor": 2,
-            "min_mask_region_area": 100,
-        }
-        # Update with provided kwargs
-        generator_args.update(kwargs)
-        
-        print(f"Initializing Mask Generator with args: {generator_args}")
-        
-        self.mask_generator = SamAutomaticMaskGenerator(
-            model=self.sam,
-            **generator_args
-        )
+        # The model is loaded (or taken from the pool) on first use; one
+        # generator per distinct argument set. The lock serializes requests
+        # from server threads, as a generator keeps per-image state.
+        self.sam = None
+        self._generators = {}
+        self._lock = threading.Lock()
+
+    def get_generator(self, generator_args):
+        """SamAutomaticMaskGenerator for generator_args (RLE output)."""
+        key = json.dumps(generator_args, sort_keys=True, default=str)
+        generator = self._generators.get(key)
+        if generator is None:
+            if not os.path.exists(self.checkpoint_path):
+                print(f"Checkpoint not found at {self.checkpoint_path}. Downloading...")
+                self._download_checkpoint(self.model_type, self.checkpoint_path)
+
+            self.sam = get_sam_model(self.model_type, self.checkpoint_path, self.device)
+
+            print(f"Initializing Mask Generator with args: {generator_args}")
+
+            # RLE output avoids materializing every full-frame mask at once
+            generator = SamAutomaticMaskGenerator(
+                model=self.sam,
+                **{**generator_args, "output_mode": "uncompressed_rle"}
+            )
+            self._generators[key] = generator
+        return generator
+
+    def segment_batch(self, images, generator_args):
+        with self._lock:
+            generator = self.get_generator(generator_args)
+            return [generator.generate(image) for image in images]
 
     def _get_default_checkpoint_path(self, model_type):
         # Default to current directory or a cache directory
@@ -80,32 +269,222 @@ class SAMSegmenter:
             for chunk in response.iter_content(chunk_size=8192):
                 f.write(chunk)
 
+
+class ModalBackend(SegmentationBackend):
+    """
+    SAM on Modal. One app.run() session is kept open across calls (instead
+    of one per image), images are sent PNG-encoded and batches are fanned
+    out to concurrent containers with .map().
+    """
+
+    def __init__(self, model_type="vit_h", batch_size=4):
+        # Raises ImportError without modal
+        from .modal_sam import app, ModalSAM
+        self.app = app
+        self.ModalSAM = ModalSAM
+        self.model_type = model_type
+        self.model_id = model_type
+        self.batch_size = batch_size
+        self._session = None
+
+    def segment_batch(self, images, generator_args):
+        if self._session is None:
+            self._session = self.app.run()
+            self._session.__enter__()
+
+        # Masks come back as RLE rather than full boolean arrays
+        args = json.dumps({**generator_args, "output_mode": "uncompressed_rle"}, default=str)
+        model = self.ModalSAM(model_type=self.model_type, generator_args=args)
+        encoded = [encode_image(image) for image in images]
+        batches = [encoded[i:i + self.batch_size] for i in range(0, len(encoded), self.batch_size)]
+        return [masks for batch in model.generate_masks_batch.map(batches) for masks in batch]
+
+    def close(self):
+        if self._session is not None:
+            session, self._session = self._session, None
+            session.__exit__(None, None, None)
+
+
+class HTTPBackend(SegmentationBackend):
+    """
+    Client of a segmentation server (see segmentation_server).
+
+    POST {url}/segment with JSON {"generator_args": {...}, "images": [...]}
+    (base64 PNG/WebP); the response {"masks": [...]} holds one list of mask
+    dicts with RLE segmentations per image, gzip-compressed if the server
+    supports it. Connections are kept alive per worker thread, and up to
+    max_in_flight batches of batch_size images are sent concurrently.
+    """
+
+    def __init__(self, url, batch_size=4, max_in_flight=4, image_format="png", timeout=600.0):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported segmentation server URL: {url}")
+        self.url = url.rstrip('/')
+        self.model_id = self.url
+        self._scheme = parts.scheme
+        self._netloc = parts.netloc
+        self._path = parts.path.rstrip('/') + '/segment'
+        self.batch_size = batch_size
+        self.image_format = image_format
+        self.timeout = timeout
+
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight)
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+
+    def _connection(self):
+        """This thread's persistent connection."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            cls = http.client.HTTPSConnection if self._scheme == "https" else http.client.HTTPConnection
+            connection = cls(self._netloc, timeout=self.timeout)
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+
+    def _post(self, images, generator_args):
+        body = json.dumps({
+            'generator_args': generator_args,
+            'images': [base64.b64encode(encode_image(image, self.image_format)).decode('ascii')
+                       for image in images],
+        }, default=_json_default).encode('utf-8')
+        headers = {'Content-Type': 'application/json', 'Accept-Encoding': 'gzip'}
+
+        # A kept-alive connection may have been closed by the server; retry once
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                connection.request('POST', self._path, body, headers)
+                response = connection.getresponse()
+                data = response.read()
+                break
+            except (OSError, http.client.HTTPException) as e:
+                # The connection is left mid-request; the next call needs a new one
+                self._drop_connection()
+                stale = isinstance(e, (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError))
+                if attempt or not stale:
+                    raise
+
+        if response.getheader('Content-Encoding') == 'gzip':
+            data = gzip.decompress(data)
+        if response.status != 200:
+            raise RuntimeError(f"Segmentation server returned {response.status}: {data[:200].decode('utf-8', 'replace')}")
+        return json.loads(data)['masks']
+
+    def _drop_connection(self):
+        connection = self._local.connection
+        self._local.connection = None
+        connection.close()
+        with self._connections_lock:
+            self._connections.remove(connection)
+
+    def submit(self, images, generator_args):
+        """Send one batch without waiting; returns a Future of its mask lists."""
+        return self._executor.submit(self._post, images, generator_args)
+
+    def segment_batch(self, images, generator_args):
+        futures = [self.submit(images[i:i + self.batch_size], generator_args)
+                   for i in range(0, len(images), self.batch_size)]
+        return [masks for future in futures for masks in future.result()]
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        with self._connections_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+
+
+class SAMSegmenter:
+    def __init__(self, model_type="vit_h", checkpoint_path=None, device="cpu", use_modal=False,
+                 cache_dir=None, backend=None, **kwargs):
+        """
+        Args:
+            backend: SegmentationBackend, or the URL of a segmentation server
+                (HTTPBackend). Defaults to ModalBackend with use_modal, else
+                LocalBackend(model_type, checkpoint_path, device).
+            cache_dir: Optional directory of the on-disk mask cache
+            **kwargs: SamAutomaticMaskGenerator arguments
+        """
+        self.model_type = model_type
+        self.generator_args = {**DEFAULT_GENERATOR_ARGS, **kwargs}
+        
+        # Masks are cached on disk per (image, model, generator args) if a cache_dir is given
+        self.mask_cache = MaskCache(cache_dir) if cache_dir is not None else None
+        
+        if isinstance(backend, str):
+            backend = HTTPBackend(backend)
+        elif backend is None and use_modal:
+            try:
+                backend = ModalBackend(model_type)
+                print("Initialized SAM with Modal backend.")
+            except ImportError:
+                print("Warning: Modal not found or import failed. Falling back to local execution.")
+
+        if backend is None:
+            backend = LocalBackend(model_type, checkpoint_path, device)
+        self.backend = backend
+        self.use_modal = isinstance(backend, ModalBackend)
+        self.device = getattr(backend, 'device', device)
+
+    @property
+    def sam(self):
+        return getattr(self.backend, 'sam', None)
+
+    @property
+    def mask_generator(self):
+        """The local backend's mask generator for this segmenter's arguments."""
+        return self.backend.get_generator(self.generator_args)
+
     def segment(self, image):
         """
         Returns a list of masks.
         Each mask is a dict with keys: 'segmentation', 'area', 'bbox', 'predicted_iou', 'point_coords', 'stability_score', 'crop_box'
+        
+        'segmentation' is a masks.CompactMask (bounding box and bit-packed
+        crop); np.asarray() or .to_dense() decode the full-frame array.
+        
+        With a mask cache, masks of an already segmented image (same model
+        and generator args) are loaded from disk without running SAM.
         """
-        if self.use_modal:
-            print("Running segmentation on Modal...")
-            masks = None
-            try:
-                import pickle
-                kwargs_bytes = pickle.dumps(self.kwargs)
-                with self.app.run():
-                    # Pass kwargs as bytes
-                    model = self.ModalSAM(model_type=self.model_type, kwargs_bytes=kwargs_bytes)
-                    masks = model.generate_masks.remote(image)
-            except Exception as e:
-                print(f"Modal execution failed: {e}")
-                raise e
-            
-            if masks is None:
-                raise RuntimeError("Modal execution failed to return masks.")
-                
-            return masks
-
-        masks = self.mask_generator.generate(image)
-        # Sort by area (largest first) to handle layering if needed, 
-        # but for vectorization, we might want smallest first to draw on top.
-        # Let's return as is, the core logic can decide.
+        return self.segment_batch([image])[0]
+
+    def segment_batch(self, images):
+        """
+        Masks of several images (one list per image, as in segment()).
+
+        Cache misses are sent to the backend together, so remote backends
+        can batch them and keep several requests in flight.
+        """
+        results = [None] * len(images)
+        keys = [None] * len(images)
+        if self.mask_cache is not None:
+            model_id = self.backend.model_id or self.model_type
+            for i, image in enumerate(images):
+                keys[i] = self.mask_cache.make_key(image, model_id, self.generator_args)
+                results[i] = self.mask_cache.get(keys[i])
+            cached = sum(r is not None for r in results)
+            if cached:
+                print(f"Loaded cached masks for {cached}/{len(images)} images.")
+
+        missing = [i for i, r in enumerate(results) if r is None]
+        if missing:
+            generated = self.backend.segment_batch([images[i] for i in missing], self.generator_args)
+            for i, masks in zip(missing, generated):
+                results[i] = self._compact(masks)
+                if self.mask_cache is not None:
+                    self.mask_cache.put(keys[i], results[i])
+        return results
+
+    def close(self):
+        self.backend.close()
+
+    @staticmethod
+    def _compact(masks):
+        """Replace each mask's segmentation (RLE or dense array) by a CompactMask."""
+        for m in masks:
+            m['segmentation'] = as_compact(m['segmentation'])
         return masks
@@ -0,0 +1,200 @@
+"""
+Vectalab Segmentation Server.
+
+HTTP front end for a segmentation backend, speaking the protocol of
+``segmentation.HTTPBackend``:
+
+    POST /segment  {"generator_args": {...}, "images": ["<base64 PNG/WebP>", ...]}
+      -> {"masks": [[{..., "segmentation": {"size": [h, w], "counts": [...]}}, ...], ...]}
+    GET /health    -> {"status": "ok"}
+
+Connections are kept alive (HTTP/1.1), each connection is served by its
+own thread and responses are gzip-compressed when the client accepts it.
+Besides SAM (``LocalBackend``), it can serve ``ComponentsBackend``, which
+returns SAM-shaped masks of color connected components without a model,
+so the remote path can be tested and load-tested locally.
+
+Usage:
+    python -m vectalab.segmentation_server --backend components --port 8765
+
+    segmenter = SAMSegmenter(backend="http://127.0.0.1:8765")
+"""
+
+import argparse
+import base64
+import gzip
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+
+from .masks import CompactMask
+from .segmentation import LocalBackend, SegmentationBackend, decode_image, masks_to_wire
+
+# Responses smaller than this are sent uncompressed
+GZIP_MIN_BYTES = 1024
+
+
+class ComponentsBackend(SegmentationBackend):
+    """
+    Model-free stand-in for SAM: one mask per 8-connected component of
+    the color-quantized image.
+
+    Args:
+        levels: Quantization levels per channel
+        min_area: Smallest component returned (pixels)
+        delay: Seconds to sleep per image, to emulate model latency
+    """
+
+    model_id = "components"
+
+    def __init__(self, levels=4, min_area=16, delay=0.0):
+        self.levels = levels
+        self.min_area = min_area
+        self.delay = delay
+
+    def segment_batch(self, images, generator_args):
+        return [self._segment(image) for image in images]
+
+    def _segment(self, image):
+        if self.delay:
+            time.sleep(self.delay)
+
+        height, width = image.shape[:2]
+        pixels = image.reshape(height, width, -1)[..., :3].astype(np.int64)
+        quantized = pixels * self.levels // 256
+        codes = (quantized * self.levels ** np.arange(quantized.shape[2])).sum(axis=2)
+
+        masks = []
+        for code in np.unique(codes):
+            count, labels, stats, centroids = cv2.connectedComponentsWithStats(
+                (codes == code).astype(np.uint8), connectivity=8)
+            for label in range(1, count):
+                x, y, w, h, area = (int(v) for v in stats[label])
+                if area < self.min_area:
+                    continue
+                crop = labels[y:y + h, x:x + w] == label
+                masks.append({
+                    'segmentation': CompactMask.from_crop(crop, x, y, (height, width)).to_rle(),
+                    'area': area,
+                    'bbox': [x, y, w, h],
+                    'predicted_iou': 1.0,
+                    'point_coords': [[float(centroids[label][0]), float(centroids[label][1])]],
+                    'stability_score': 1.0,
+                    'crop_box': [0, 0, width, height],
+                })
+        return masks
+
+
+class SegmentationRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/health':
+            self._send_json(200, {'status': 'ok'})
+        else:
+            self._send_json(404, {'error': f"Unknown path: {self.path}"})
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/segment':
+            self._send_json(404, {'error': f"Unknown path: {self.path}"})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length))
+            images = [decode_image(base64.b64decode(data)) for data in request['images']]
+            generator_args = request.get('generator_args', {})
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(400, {'error': f"Bad request: {e}"})
+            return
+
+        try:
+            masks = self.server.backend.segment_batch(images, generator_args)
+        except Exception as e:
+            self._send_json(500, {'error': f"{type(e).__name__}: {e}"})
+            return
+        self._send_json(200, {'masks': [masks_to_wire(m) for m in masks]})
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        compress = len(body) >= GZIP_MIN_BYTES and 'gzip' in self.headers.get('Accept-Encoding', '')
+        if compress:
+            body = gzip.compress(body, compresslevel=6)
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        if compress:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class SegmentationServer(ThreadingHTTPServer):
+    """Threaded HTTP server answering segmentation requests with backend."""
+
+    daemon_threads = True
+
+    def __init__(self, backend, host="127.0.0.1", port=0, verbose=False):
+        super().__init__((host, port), SegmentationRequestHandler)
+        self.backend = backend
+        self.verbose = verbose
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_server(backend, host="127.0.0.1", port=0, verbose=False):
+    """
+    Serve backend from a daemon thread (port 0 picks a free port).
+
+    Returns:
+        The running SegmentationServer; its .url is the HTTPBackend URL and
+        .shutdown() stops it
+    """
+    server = SegmentationServer(backend, host, port, verbose)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve image segmentation over HTTP.")
+    parser.add_argument('--backend', choices=['sam', 'components'], default='sam')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--model-type', default='vit_b', help="SAM model type")
+    parser.add_argument('--checkpoint', default=None, help="SAM checkpoint path")
+    parser.add_argument('--device', default='cpu')
+    parser.add_argument('--delay', type=float, default=0.0,
+                        help="Components backend: seconds of emulated latency per image")
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    if args.backend == 'sam':
+        backend = LocalBackend(args.model_type, args.checkpoint, args.device)
+    else:
+        backend = ComponentsBackend(delay=args.delay)
+
+    server = SegmentationServer(backend, args.host, args.port, args.verbose)
+    print(f"Serving {args.backend} segmentation on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        backend.close()
+
+
+if __name__ == '__main__':
+    main()
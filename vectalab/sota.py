@@ -20,30 +20,16 @@ Usage:
 import numpy as np
 import cv2
 from PIL import Image
-from collections import Counter
 from pathlib import Path
 from typing import Tuple, Dict, Any, Optional, List
 import tempfile
-import os
 import re
 import xml.etree.ElementTree as ET
 import shutil
 import concurrent.futures
 import time
 
-# Try imports
-try:
-    import vtracer
-    VTRACER_AVAILABLE = True
-except ImportError:
-    VTRACER_AVAILABLE = False
-
-try:
-    import cairosvg
-    from io import BytesIO
-    CAIROSVG_AVAILABLE = True
-except ImportError:
-    CAIROSVG_AVAILABLE = False
+from vectalab.render import render_svg_to_array
 
 try:
     from skimage.metrics import structural_similarity as ssim
@@ -51,11 +37,11 @@ try:
 except ImportError:
     SKIMAGE_AVAILABLE = False
 
-try:
-    from sklearn.cluster import KMeans
-    SKLEARN_AVAILABLE = True
-except ImportError:
-    SKLEARN_AVAILABLE = False
+from vectalab.vtrace import trace_array, VTRACER_AVAILABLE
+from vectalab.quality import MetricContext
+from vectalab.colors import ColorHistogram
+from vectalab.context import ImageContext
+from vectalab.palette import extract_palette, map_to_palette
 
 
 # ============================================================================
@@ -66,12 +52,13 @@ class ImageAnalyzer:
     """Analyze image characteristics to determine optimal vectorization settings."""
     
     @staticmethod
-    def analyze(image: np.ndarray) -> Dict[str, Any]:
+    def analyze(image: np.ndarray, histogram: Optional[ColorHistogram] = None) -> Dict[str, Any]:
         """
         Analyze image and return characteristics.
         
         Args:
             image: RGB image as numpy array
+            histogram: Precomputed ColorHistogram of image (optional)
             
         Returns:
             Dictionary with image characteristics
@@ -79,16 +66,14 @@ class ImageAnalyzer:
         h, w = image.shape[:2]
         pixels = image.reshape(-1, 3)
         
-        # Count unique colors
-        unique_colors = len(np.unique(pixels, axis=0))
-        
         # Color distribution
-        color_counts = Counter(map(tuple, pixels))
-        total_pixels = len(pixels)
+        if histogram is None:
+            histogram = ColorHistogram.from_image(image)
+        unique_colors = histogram.unique_count
         
         # Coverage by top N colors
-        top_10_coverage = sum(c for _, c in color_counts.most_common(10)) / total_pixels
-        top_50_coverage = sum(c for _, c in color_counts.most_common(50)) / total_pixels
+        top_10_coverage = histogram.top_k_coverage(10)
+        top_50_coverage = histogram.top_k_coverage(50)
         
         # Color variance (indicates complexity)
         color_variance = np.std(pixels, axis=0).mean()
@@ -99,7 +84,7 @@ class ImageAnalyzer:
         edge_density = np.sum(edges > 0) / (h * w)
         
         # Dominant colors
-        dominant_colors = [color for color, _ in color_counts.most_common(20)]
+        dominant_colors = histogram.dominant(20)
         
         # Determine image type
         if color_variance < 40 and top_10_coverage > 0.85:
@@ -137,6 +122,9 @@ def quantize_colors_kmeans(image: np.ndarray, n_colors: int = 16) -> np.ndarray:
     """
     Reduce image colors using K-means clustering.
     
+    Clusters the unique colors weighted by pixel count and maps pixels
+    through a nearest-color lookup table (see vectalab.palette).
+    
     Args:
         image: RGB image
         n_colors: Target number of colors
@@ -144,19 +132,10 @@ def quantize_colors_kmeans(image: np.ndarray, n_colors: int = 16) -> np.ndarray:
     Returns:
         Quantized image
     """
-    if not SKLEARN_AVAILABLE:
-        return quantize_colors_simple(image, n_colors)
-    
-    h, w = image.shape[:2]
-    pixels = image.reshape(-1, 3).astype(np.float32)
-    
-    # K-means clustering
-    kmeans = KMeans(n_clusters=n_colors, random_state=42, n_init=10)
-    labels = kmeans.fit_predict(pixels)
-    centers = kmeans.cluster_centers_.astype(np.uint8)
+    centers = np.round(extract_palette(image, n_colors)).astype(np.uint8)
     
     # Reconstruct image
-    quantized = centers[labels].reshape(h, w, 3)
+    quantized = map_to_palette(image, centers)
     
     return quantized
 
@@ -487,28 +466,18 @@ def apply_scour_optimization(svg_content: str) -> str:
 # QUALITY MEASUREMENT
 # ============================================================================
 
-def render_svg_to_array(svg_content: str, width: int, height: int) -> np.ndarray:
-    """Render SVG to numpy array."""
-    if not CAIROSVG_AVAILABLE:
-        raise ImportError("cairosvg required for rendering")
-    
-    png_data = cairosvg.svg2png(
-        bytestring=svg_content.encode('utf-8'),
-        output_width=width,
-        output_height=height
-    )
-    
-    img = Image.open(BytesIO(png_data)).convert('RGB')
-    return np.array(img)
-
-
-def compute_quality_metrics(original: np.ndarray, svg_content: str) -> Dict[str, float]:
+def compute_quality_metrics(
+    original: np.ndarray,
+    svg_content: str,
+    context: Optional[MetricContext] = None,
+) -> Dict[str, float]:
     """
     Compute quality metrics between original and rendered SVG.
     
     Args:
         original: Original RGB image
         svg_content: SVG content string
+        context: Optional MetricContext for `original` to reuse across calls
         
     Returns:
         Dictionary with quality metrics
@@ -521,7 +490,9 @@ def compute_quality_metrics(original: np.ndarray, svg_content: str) -> Dict[str,
         return {"error": str(e)}
     
     # SSIM
-    if SKIMAGE_AVAILABLE:
+    if context is not None:
+        ssim_value = context.ssim(rendered)
+    elif SKIMAGE_AVAILABLE:
         ssim_value = ssim(original, rendered, channel_axis=2, data_range=255)
     else:
         ssim_value = 0.0
@@ -562,6 +533,7 @@ def vectorize_smart(
     max_file_size: int = 100_000,  # 100KB default
     max_iterations: int = 5,
     verbose: bool = True,
+    image_context: Optional[ImageContext] = None,
 ) -> Tuple[str, Dict[str, Any]]:
     """
     Smart vectorization with automatic optimization.
@@ -579,6 +551,7 @@ def vectorize_smart(
         max_file_size: Maximum file size in bytes
         max_iterations: Maximum optimization iterations
         verbose: Print progress
+        image_context: Already decoded input (loaded from input_path if None)
         
     Returns:
         Tuple of (output_path, metrics_dict)
@@ -587,18 +560,15 @@ def vectorize_smart(
         raise ImportError("vtracer required for vectorization")
     
     # Load image
-    image = cv2.imread(input_path)
-    if image is None:
-        raise ValueError(f"Could not load image: {input_path}")
-    
-    image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    image_context = ImageContext.resolve(input_path, image_context)
+    image_rgb = image_context.rgb
     h, w = image_rgb.shape[:2]
     
     if verbose:
         print(f"Input: {input_path} ({w}x{h})")
     
-    # Analyze image
-    analysis = ImageAnalyzer.analyze(image_rgb)
+    # Analyze image (reuses the context's color histogram)
+    analysis = ImageAnalyzer.analyze(image_rgb, histogram=image_context.histogram)
     
     if verbose:
         print(f"Image type: {analysis['image_type']} ({analysis['complexity']})")
@@ -609,17 +579,13 @@ def vectorize_smart(
     processed = preprocess_image(image_rgb, analysis)
     
     if verbose:
-        processed_colors = len(np.unique(processed.reshape(-1, 3), axis=0))
+        processed_colors = ColorHistogram.from_image(processed).unique_count
         print(f"After preprocessing: {processed_colors} colors")
     
-    # Save preprocessed image temporarily
-    with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp:
-        tmp_path = tmp.name
-        cv2.imwrite(tmp_path, cv2.cvtColor(processed, cv2.COLOR_RGB2BGR))
-    
     # Iterative optimization
     best_result = None
     best_score = -float('inf')
+    metric_context = MetricContext(image_rgb)
     
     quality_levels = ["compact", "balanced", "quality"]
     
@@ -632,15 +598,8 @@ def vectorize_smart(
         # Get adaptive settings
         settings = get_adaptive_vtracer_settings(analysis, quality)
         
-        # Vectorize
-        with tempfile.NamedTemporaryFile(suffix='.svg', delete=False) as tmp_svg:
-            tmp_svg_path = tmp_svg.name
-        
-        vtracer.convert_image_to_svg_py(tmp_path, tmp_svg_path, **settings)
-        
-        # Read and optimize SVG
-        with open(tmp_svg_path, 'r') as f:
-            svg_content = f.read()
+        # Vectorize (in memory)
+        svg_content = trace_array(processed, **settings)
         
         # Optimize SVG
         svg_content = optimize_svg_paths(svg_content)
@@ -648,7 +607,7 @@ def vectorize_smart(
         svg_content = apply_scour_optimization(svg_content)
         
         # Measure quality
-        metrics = compute_quality_metrics(image_rgb, svg_content)
+        metrics = compute_quality_metrics(image_rgb, svg_content, context=metric_context)
         
         if verbose:
             print(f"  SSIM: {metrics.get('ssim', 0):.4f}")
@@ -679,27 +638,14 @@ def vectorize_smart(
                 print(f"  ✅ Targets met!")
             break
         
-        # Cleanup temp SVG
-        try:
-            os.remove(tmp_svg_path)
-        except:
-            pass
-        
         # Adjust settings for next iteration if needed
         if ssim_val < target_ssim and iteration < max_iterations - 1:
             # Need more quality - will use higher quality preset next
             pass
         elif file_size > max_file_size and iteration < max_iterations - 1:
             # Need smaller size - try more aggressive quantization
-            n_colors = max(4, int(len(np.unique(processed.reshape(-1, 3), axis=0)) * 0.7))
+            n_colors = max(4, int(ColorHistogram.from_image(processed).unique_count * 0.7))
             processed = quantize_colors_median_cut(processed, n_colors)
-            cv2.imwrite(tmp_path, cv2.cvtColor(processed, cv2.COLOR_RGB2BGR))
-    
-    # Cleanup temp files
-    try:
-        os.remove(tmp_path)
-    except:
-        pass
     
     if best_result is None:
         raise RuntimeError("Vectorization failed")
@@ -729,6 +675,7 @@ def vectorize_logo(
     output_path: str,
     target_size_kb: int = 50,
     verbose: bool = True,
+    image_context: Optional[ImageContext] = None,
 ) -> Tuple[str, Dict[str, Any]]:
     """
     Optimized vectorization for logos.
@@ -751,6 +698,7 @@ def vectorize_logo(
         max_file_size=target_size_kb * 1024,
         max_iterations=5,
         verbose=verbose,
+        image_context=image_context,
     )
 
 
@@ -758,6 +706,7 @@ def vectorize_icon(
     input_path: str,
     output_path: str,
     verbose: bool = True,
+    image_context: Optional[ImageContext] = None,
 ) -> Tuple[str, Dict[str, Any]]:
     """
     Optimized vectorization for icons.
@@ -777,6 +726,7 @@ def vectorize_icon(
         max_file_size=100_000,
         max_iterations=4,
         verbose=verbose,
+        image_context=image_context,
     )
 
 
@@ -802,6 +752,7 @@ def vectorize_auto(
     target_ssim: float = 0.95,
     max_workers: int = 4,
     verbose: bool = True,
+    image_context: Optional[ImageContext] = None,
 ) -> Tuple[str, Dict[str, Any]]:
     """
     Auto mode: Run multiple strategies in parallel and pick the best one.
@@ -818,6 +769,8 @@ def vectorize_auto(
         target_ssim: Target SSIM quality
         max_workers: Number of parallel workers
         verbose: Print progress
+        image_context: Already decoded input (loaded from input_path if None),
+            shipped to every worker instead of each one decoding the file
         
     Returns:
         Tuple of (output_path, metrics_dict)
@@ -825,6 +778,8 @@ def vectorize_auto(
     from vectalab.quality import vectorize_logo_clean
     from vectalab.premium import vectorize_logo_premium, vectorize_photo_premium
     
+    image_context = ImageContext.resolve(input_path, image_context)
+    
     if verbose:
         print(f"🚀 Starting Auto Mode with {max_workers} workers...")
         
@@ -838,25 +793,25 @@ def vectorize_auto(
                 "name": "Logo Clean (Ultra)",
                 "func": vectorize_logo_clean,
                 "args": (input_path, str(temp_path / "logo_clean.svg")),
-                "kwargs": {"quality_preset": "ultra", "verbose": False}
+                "kwargs": {"quality_preset": "ultra", "verbose": False, "image_context": image_context}
             },
             {
                 "name": "Premium Logo",
                 "func": vectorize_logo_premium,
                 "args": (input_path, str(temp_path / "premium_logo.svg")),
-                "kwargs": {"precision": 2, "verbose": False}
+                "kwargs": {"precision": 2, "verbose": False, "image_context": image_context}
             },
             {
                 "name": "Premium Photo",
                 "func": vectorize_photo_premium,
                 "args": (input_path, str(temp_path / "premium_photo.svg")),
-                "kwargs": {"n_colors": 32, "verbose": False}
+                "kwargs": {"n_colors": 32, "verbose": False, "image_context": image_context}
             },
             {
                 "name": "Smart Adaptive",
                 "func": vectorize_smart,
                 "args": (input_path, str(temp_path / "smart.svg")),
-                "kwargs": {"target_ssim": target_ssim, "verbose": False}
+                "kwargs": {"target_ssim": target_ssim, "verbose": False, "image_context": image_context}
             }
         ]
         
@@ -1,48 +1,96 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
 import numpy as np
 import potrace
 import cv2
 
+from .masks import as_compact, label_statistics, paint_label_map
+
+# Fewer masks than this are traced in-process even with workers > 1
+# (starting a process pool costs more than tracing a handful of crops)
+PARALLEL_MIN_MASKS = 32
+
+
+def _trace_bitmap(bitmap_data, x0, y0, turdsize, alphamax, opticurve):
+    """Trace one cropped bitmap and shift the path back by (x0, y0)."""
+    bmp = potrace.Bitmap(bitmap_data)
+    path = bmp.trace(
+        turdsize=turdsize,
+        alphamax=alphamax,
+        opticurve=opticurve
+    )
+    
+    # Segments may share point objects, so shift each point once
+    shifted = set()
+    for curve in path:
+        for segment in curve._curve:
+            for point in (*segment.c, segment.vertex):
+                if id(point) not in shifted:
+                    shifted.add(id(point))
+                    point.x += x0
+                    point.y += y0
+    return path
+
+
 class Tracer:
-    def __init__(self, turdsize=2, alphamax=1, opticurve=True, **kwargs):
+    def __init__(self, turdsize=2, alphamax=1, opticurve=True, workers=1, margin=1, **kwargs):
+        """
+        Args:
+            workers: Processes tracing masks in parallel (1 traces in this
+                process; None uses the CPU count). A pool is only started for
+                PARALLEL_MIN_MASKS or more masks; on spawn platforms (macOS,
+                Windows) the calling script then needs an
+                ``if __name__ == '__main__'`` guard.
+            margin: Background pixels kept around each mask's bounding box
+        """
         self.turdsize = turdsize
         self.alphamax = alphamax
         self.opticurve = opticurve
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.margin = margin
 
     def trace(self, image, masks):
         """
         Converts masks to vector paths.
         Returns a list of dicts: {'path': <potrace path>, 'color': (r, g, b)}
+        
+        Each mask is traced on its bounding box (plus margin) only; with
+        workers > 1, masks are distributed over a process pool (potracer is
+        pure Python) and the results keep the mask order. Colors are the mean of each
+        mask's visible pixels (see masks.label_statistics).
         """
-        paths = []
         # Sort masks by area, largest first, so smaller details are drawn on top?
         # Actually, in SVG, later elements are drawn on top.
         # So we should draw largest first (background) and then smaller details.
         sorted_masks = sorted(masks, key=lambda x: x['area'], reverse=True)
-
-        for mask_data in sorted_masks:
-            mask = mask_data['segmentation']
-            
-            # Convert boolean mask to uint8 for potrace (0 and 1)
-            # Potrace expects a 2D array where non-zero is foreground.
-            # However, potracer might expect a specific format.
-            # Usually it takes a numpy array.
-            
-            # Convert mask to inverted boolean for potrace
-            # Potrace (via potracer) treats False as Black (foreground) and True as White (background).
-            # We want to trace the 'True' regions of the mask, so we invert it to 'False'.
-            bitmap_data = ~mask.astype(bool)
-            
-            # Trace
-            bmp = potrace.Bitmap(bitmap_data)
-            path = bmp.trace(
-                turdsize=self.turdsize,
-                alphamax=self.alphamax,
-                opticurve=self.opticurve
-            )
-
-            
-            # Get average color of the segment
-            color = self._get_average_color(image, mask)
+        compacts = [as_compact(mask_data['segmentation']) for mask_data in sorted_masks]
+        
+        crops = [self._crop(compact) for compact in compacts]
+        trace = partial(_trace_bitmap, turdsize=self.turdsize, alphamax=self.alphamax,
+                        opticurve=self.opticurve)
+        
+        workers = min(self.workers, len(crops))
+        if workers > 1 and len(crops) >= PARALLEL_MIN_MASKS:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                traced = list(pool.map(trace, *zip(*crops)))
+        else:
+            traced = [trace(*crop) for crop in crops]
+        
+        # Mean color of each segment's visible pixels (smaller masks paint
+        # over larger ones), from one label map
+        labels = paint_label_map(compacts, image.shape[:2])
+        stats = label_statistics(labels, len(compacts), image=image)
+        
+        paths = []
+        for path, compact, visible_area, mean_color in zip(
+                traced, compacts, stats['area'], stats['mean_color']):
+            if visible_area > 0:
+                color = tuple(map(int, mean_color))
+            else:
+                # Fully covered by smaller masks: average over the whole mask
+                color = self._get_average_color(image, compact)
             
             paths.append({
                 'path': path,
@@ -51,10 +99,26 @@ class Tracer:
             
         return paths
 
+    def _crop(self, mask):
+        """Potrace bitmap of the mask's padded bounding box, and the box origin."""
+        height, width = mask.shape
+        x0, y0, x1, y1 = mask.bbox
+        cx0, cy0 = max(x0 - self.margin, 0), max(y0 - self.margin, 0)
+        cx1, cy1 = min(x1 + self.margin, width), min(y1 + self.margin, height)
+        
+        crop = np.zeros((cy1 - cy0, cx1 - cx0), dtype=bool)
+        crop[y0 - cy0:y1 - cy0, x0 - cx0:x1 - cx0] = mask.crop()
+        
+        # Potrace (via potracer) treats False as Black (foreground) and True as White (background).
+        # We want to trace the 'True' regions of the mask, so we invert it to 'False'.
+        return ~crop, cx0, cy0
+
     def _get_average_color(self, image, mask):
         # image is RGB
-        # mask is boolean
-        masked_pixels = image[mask]
+        # mask is boolean, or compact (only its bounding box is indexed)
+        mask = as_compact(mask)
+        x0, y0, x1, y1 = mask.bbox
+        masked_pixels = image[y0:y1, x0:x1][mask.crop()]
         if masked_pixels.size == 0:
             return (0, 0, 0)
         avg_color = np.mean(masked_pixels, axis=0)
@@ -0,0 +1,199 @@
+"""
+Vectalab vtracer Entry Point.
+
+Shared tracing helpers used by every vtracer-based pipeline (premium, quality,
+sota, hifi). Images are handed to vtracer's in-memory API and the SVG comes
+back as a string, so no temporary PNG/SVG files are written. The file-based
+``convert_image_to_svg_py`` is only used when the installed vtracer build does
+not provide the in-memory functions.
+
+Usage:
+    from vectalab.vtrace import trace_array
+
+    svg_content = trace_array(image_rgb, alpha=alpha_channel, **settings)
+"""
+
+import os
+import tempfile
+from typing import Any, Optional
+
+import cv2
+import numpy as np
+
+try:
+    import vtracer
+    VTRACER_AVAILABLE = True
+except ImportError:
+    VTRACER_AVAILABLE = False
+
+# In-memory APIs (vtracer >= 0.6)
+RAW_API_AVAILABLE = VTRACER_AVAILABLE and hasattr(vtracer, 'convert_raw_image_to_svg')
+PIXELS_API_AVAILABLE = VTRACER_AVAILABLE and hasattr(vtracer, 'convert_pixels_to_svg')
+
+# vtracer copies the input buffer element by element, so a small payload
+# matters more than encode speed. Level 1 is the sweet spot for flat logos.
+PNG_COMPRESSION = 1
+
+
+def _check_vtracer():
+    if not VTRACER_AVAILABLE:
+        raise ImportError("vtracer required for vectorization")
+
+
+def _to_bgr(image: np.ndarray, alpha: Optional[np.ndarray] = None) -> np.ndarray:
+    """Convert an RGB/RGBA/grayscale array (+ optional alpha) to OpenCV BGR(A) order."""
+    if image.ndim == 2:
+        bgr = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR) if alpha is not None else image
+    elif image.shape[2] == 4:
+        bgr = cv2.cvtColor(image, cv2.COLOR_RGBA2BGRA)
+        if alpha is not None:
+            bgr[:, :, 3] = alpha
+        return bgr
+    else:
+        bgr = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+
+    if alpha is not None:
+        bgr = np.dstack((bgr, alpha))
+    return bgr
+
+
+def _to_rgba(image: np.ndarray, alpha: Optional[np.ndarray] = None) -> np.ndarray:
+    """Convert an RGB/RGBA/grayscale array (+ optional alpha) to RGBA."""
+    if image.ndim == 2:
+        rgba = cv2.cvtColor(image, cv2.COLOR_GRAY2RGBA)
+    elif image.shape[2] == 4:
+        rgba = image.copy()
+    else:
+        rgba = cv2.cvtColor(image, cv2.COLOR_RGB2RGBA)
+
+    if alpha is not None:
+        rgba[:, :, 3] = alpha
+    return rgba
+
+
+def encode_png(image: np.ndarray, alpha: Optional[np.ndarray] = None) -> bytes:
+    """
+    Encode an image array to PNG bytes in memory.
+
+    Args:
+        image: RGB, RGBA or grayscale uint8 array
+        alpha: Optional alpha channel to attach
+
+    Returns:
+        PNG-encoded bytes
+    """
+    ok, buf = cv2.imencode(
+        '.png', _to_bgr(image, alpha), [cv2.IMWRITE_PNG_COMPRESSION, PNG_COMPRESSION]
+    )
+    if not ok:
+        raise RuntimeError("Failed to encode image for vtracer")
+    return buf.tobytes()
+
+
+def trace_bytes(img_bytes: bytes, img_format: Optional[str] = None, **settings: Any) -> str:
+    """
+    Trace an encoded image (PNG, JPEG, ...) held in memory.
+
+    Args:
+        img_bytes: Encoded image data
+        img_format: Format hint ('png', 'jpg', ...); guessed from content if None
+        **settings: vtracer settings
+
+    Returns:
+        SVG content string
+    """
+    _check_vtracer()
+
+    if RAW_API_AVAILABLE:
+        return vtracer.convert_raw_image_to_svg(img_bytes, img_format, **settings)
+
+    # Fallback: decode and go through the pixel or file path
+    image = cv2.imdecode(np.frombuffer(img_bytes, np.uint8), cv2.IMREAD_UNCHANGED)
+    if image is None:
+        raise ValueError("Could not decode image bytes")
+    if image.ndim == 3 and image.shape[2] == 4:
+        image = cv2.cvtColor(image, cv2.COLOR_BGRA2RGBA)
+    elif image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    return trace_array(image, **settings)
+
+
+def trace_array(image: np.ndarray, alpha: Optional[np.ndarray] = None, **settings: Any) -> str:
+    """
+    Trace an image array with vtracer and return the SVG as a string.
+
+    Uses vtracer's in-memory API when available and only falls back to
+    temporary files for vtracer builds without it.
+
+    Args:
+        image: RGB, RGBA or grayscale uint8 array
+        alpha: Optional alpha channel (H, W) to attach to an RGB image
+        **settings: vtracer settings (colormode, mode, filter_speckle, ...)
+
+    Returns:
+        SVG content string
+    """
+    _check_vtracer()
+
+    if image.dtype != np.uint8:
+        image = np.clip(image, 0, 255).astype(np.uint8)
+
+    if RAW_API_AVAILABLE:
+        return vtracer.convert_raw_image_to_svg(encode_png(image, alpha), 'png', **settings)
+
+    if PIXELS_API_AVAILABLE:
+        rgba = _to_rgba(image, alpha)
+        h, w = rgba.shape[:2]
+        pixels = list(map(tuple, rgba.reshape(-1, 4).tolist()))
+        return vtracer.convert_pixels_to_svg(pixels, (w, h), **settings)
+
+    return _trace_via_files(image, alpha, **settings)
+
+
+def trace_file(image_path: str, **settings: Any) -> str:
+    """
+    Trace an image file with vtracer and return the SVG as a string.
+
+    The file is read once and traced in memory; no SVG is written to disk.
+
+    Args:
+        image_path: Path to input image
+        **settings: vtracer settings
+
+    Returns:
+        SVG content string
+    """
+    _check_vtracer()
+
+    if RAW_API_AVAILABLE:
+        with open(image_path, 'rb') as f:
+            img_bytes = f.read()
+        return vtracer.convert_raw_image_to_svg(img_bytes, None, **settings)
+
+    with tempfile.NamedTemporaryFile(suffix='.svg', delete=False) as tmp_svg:
+        tmp_svg_path = tmp_svg.name
+
+    try:
+        vtracer.convert_image_to_svg_py(str(image_path), tmp_svg_path, **settings)
+        with open(tmp_svg_path, 'r') as f:
+            return f.read()
+    finally:
+        try:
+            os.remove(tmp_svg_path)
+        except OSError:
+            pass
+
+
+def _trace_via_files(image: np.ndarray, alpha: Optional[np.ndarray] = None, **settings: Any) -> str:
+    """Legacy path for vtracer builds without the in-memory API."""
+    with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp:
+        tmp_path = tmp.name
+        cv2.imwrite(tmp_path, _to_bgr(image, alpha))
+
+    try:
+        return trace_file(tmp_path, **settings)
+    finally:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass